@@ -1,82 +1,189 @@
+import time
+
+# Cold start is measured from here
+STARTED = time.perf_counter()
+
+import io
 import os
+import re
+import csv
 import json
+import zlib
 import base64
-import tempfile
+import hashlib
+import itertools
+import threading
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
-# Import services
-from face_recognition_service import FaceRecognitionService
-from voice_recognition_service import VoiceRecognitionService
-from supabase_service import SupabaseService
+# Import services; the recognition services and their NumPy, soundfile and
+# client libraries are imported by the factories below, off the startup path
+from storage_backend import create_storage_backend
+from settings_cache import SettingsCache
+from attendance_writer import AttendanceWriter
+from service_registry import ServiceRegistry
+
+class InMemoryRequest(Request):
+    """Request that keeps uploaded files in memory instead of spilling large ones to temp files"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 CORS(app)  # Enable CORS for all routes
 
-# Initialize services
-db_service = SupabaseService()
-face_service = FaceRecognitionService(db_service)
-voice_service = VoiceRecognitionService(db_service)
+# Uploads are held in memory, so bound their size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+# Services are constructed on first use, or sooner by the background warm-up
+# started at the end of this module, so the port binds before storage connects
+services = ServiceRegistry(STARTED)
+
+def create_face_service():
+    from face_recognition_service import FaceRecognitionService
+    face_service = FaceRecognitionService(services.get('storage'))
+    follow_remote_changes(face_service)
+    return face_service
+
+def create_voice_store():
+    # Enrolment recordings are compressed to FLAC in the background
+    from voice_storage import VoiceSampleStore
+    voice_store = VoiceSampleStore('data/voices')
+    voice_store.start()
+    return voice_store
+
+def create_voice_service():
+    from voice_recognition_service import VoiceRecognitionService
+    voice_service = VoiceRecognitionService(services.get('storage'), services.get('voice_store'))
+    follow_remote_changes(voice_service)
+    return voice_service
+
+def follow_remote_changes(service):
+    # Enrolments and deletions made at other kiosks reach the hybrid replica by
+    # its pulls; keep the service's in-memory gallery in step with them
+    from hybrid_service import HybridService
+    storage = services.get('storage')
+    if isinstance(storage, HybridService):
+        storage.add_change_listener(service.apply_remote_changes)
+
+def create_backup_service():
+    # Online backups of the local SQLite database; Supabase keeps its own backups
+    from backup_service import BackupService
+    from hybrid_service import HybridService
+    storage = services.get('storage')
+    local_db = storage.local if isinstance(storage, HybridService) else storage
+    if not hasattr(local_db, 'db_file'):
+        return None
+    return BackupService(local_db.db_file, os.environ.get('BACKUP_DIR', 'data/backups'),
+                         int(os.environ.get('BACKUP_RETENTION', 7)))
+
+# STORAGE_BACKEND selects supabase, sqlite or hybrid storage
+db_service = services.register('storage', create_storage_backend)
+face_service = services.register('face', create_face_service)
+voice_store = services.register('voice_store', create_voice_store)
+voice_service = services.register('voice', create_voice_service)
+services.register('backup', create_backup_service)
+settings_cache = SettingsCache(db_service)
+
+# Group-commit attendance so a burst of check-ins shares one transaction
+attendance_writer = AttendanceWriter(db_service)
+attendance_writer.start()
 
 # Create data directories if they don't exist
 os.makedirs('data/faces', exist_ok=True)
-os.makedirs('data/voices', exist_ok=True)
-
-# Default settings
-DEFAULT_SETTINGS = {
-    'face_recognition_threshold': 0.5,
-    'voice_recognition_threshold': 0.5,
-    'camera_id': '',
-    'microphone_id': '',
-    'require_both_auth': True
-}
-
-# Initialize settings in Supabase
-def init_settings():
-    try:
-        # Get current settings
-        settings = db_service.get_settings()
-        
-        # If no settings exist, initialize with defaults
-        missing_settings = {}
-        for key, value in DEFAULT_SETTINGS.items():
-            if key not in settings:
-                missing_settings[key] = value
-        
-        # Save any missing settings to the database
-        for key, value in missing_settings.items():
-            db_service.save_settings({
-                'key': key,
-                'value': value
-            })
-            print(f"Setting '{key}' initialized in database")
-        
-        if missing_settings:
-            print("Default settings initialized in database")
-            # Reload settings after initialization
-            settings = db_service.get_settings()
-        
-        # Update recognition thresholds in services
-        if settings:
-            if 'face_recognition_threshold' in settings:
-                face_service.update_threshold(settings['face_recognition_threshold'])
-                print(f"Face recognition threshold set to: {settings['face_recognition_threshold']}")
-            if 'voice_recognition_threshold' in settings:
-                voice_service.update_threshold(settings['voice_recognition_threshold'])
-                print(f"Voice recognition threshold set to: {settings['voice_recognition_threshold']}")
-    except Exception as e:
-        print(f"Error initializing settings: {e}")
 
-# Initialize settings
-init_settings()
+# Registrations decode and embed the face image and voice sample side by side,
+# two jobs each, so four workers serve two registrations at once
+REGISTRATION_WORKERS = 4
+registration_pool = ThreadPoolExecutor(max_workers=REGISTRATION_WORKERS, thread_name_prefix='registration')
+
+# Approximate size of each write when streaming reports
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Audio read per step when verifying a voice streamed as raw PCM
+VOICE_STREAM_CHUNK_SECONDS = 0.1
+
+# Column headings of the CSV report export
+CSV_HEADER = ['Date', 'Session', 'Student ID', 'Student Name', 'Time', 'Status']
+
+# Byte sizes of recent CSV export versions, by ETag, so resumed downloads
+# are not queried twice
+EXPORT_SIZE_CACHE = 64
+export_sizes = OrderedDict()
+export_sizes_lock = threading.Lock()
+
+# Settings are applied to each recognition service once it is constructed,
+# and again whenever the stored settings change, including saves made by
+# other workers; services still starting are left to their ready callback
+settings_apply_lock = threading.RLock()
+
+def apply_face_settings(face, settings):
+    face.update_threshold(settings['face_recognition_threshold'])
+    print(f"Face recognition threshold set to: {settings['face_recognition_threshold']}")
+
+def apply_voice_settings(voice, settings):
+    voice.update_threshold(settings['voice_recognition_threshold'])
+    print(f"Voice recognition threshold set to: {settings['voice_recognition_threshold']}")
+    voice.update_phrases(settings['verification_phrases'])
+
+SETTINGS_APPLIERS = {'face': apply_face_settings, 'voice': apply_voice_settings}
+
+def apply_settings(settings):
+    with settings_apply_lock:
+        for name, apply in SETTINGS_APPLIERS.items():
+            service = services.get_if_ready(name)
+            if service is None:
+                continue
+            try:
+                apply(service, settings)
+            except Exception as e:
+                print(f"Error applying settings to {name}: {e}")
+
+def apply_cached_settings(name):
+    # Read under the lock, so a change applied meanwhile is not overwritten by older settings
+    def on_ready(service):
+        with settings_apply_lock:
+            SETTINGS_APPLIERS[name](service, settings_cache.get())
+    return on_ready
+
+settings_cache.add_listener(apply_settings)
+for name in SETTINGS_APPLIERS:
+    services.on_ready(name, apply_cached_settings(name))
+
+@app.before_request
+def refresh_settings():
+    """Pick up settings saved by other workers; checks the version stamp at most every few seconds"""
+    # Health checks must answer while services are still starting, and no
+    # request waits here for storage to connect; services load the settings
+    # themselves once they are ready
+    if request.path.startswith('/api/health/') or services.get_if_ready('storage') is None:
+        return
+    settings_cache.get()
 
 @app.route('/')
 def index():
     return jsonify({'status': 'Smart Attendance System API is running'})
 
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Report that the server is up, whether or not services are ready"""
+    return jsonify({'success': True})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Report service readiness and cold start timings; 503 until every service is ready"""
+    status = services.get_status()
+    return jsonify({
+        'success': status['ready'],
+        'startup': status
+    }), 200 if status['ready'] else 503
+
 # --------------------------------
 # Student API Endpoints
 # --------------------------------
@@ -126,6 +233,20 @@ def get_student(student_id):
             'message': f"Error getting student: {str(e)}"
         }), 500
 
+def read_voice_upload(voice_sample):
+    """Read an uploaded voice sample, raising UnsupportedAudioError before any work if it can't be decoded"""
+    from speaker_embedding import check_audio_format
+    audio = voice_sample.read()
+    check_audio_format(audio)
+    return audio
+
+def unsupported_audio(error):
+    """The 415 response for a voice sample in a format that can't be decoded"""
+    return jsonify({
+        'success': False,
+        'message': str(error)
+    }), 415
+
 @app.route('/api/students/register', methods=['POST'])
 def register_student():
     """Register a new student with face and voice data"""
@@ -166,7 +287,16 @@ def register_student():
                 'message': 'Missing voice sample'
             }), 400
         
-        voice_sample = request.files['voice_sample']
+        try:
+            voice_audio = read_voice_upload(request.files['voice_sample'])
+        except ValueError as e:
+            return unsupported_audio(e)
+        
+        # Decode and embed the face and voice at once; neither needs the student row
+        face_job = registration_pool.submit(face_service.embed_face_image, face_image)
+        voice_job = registration_pool.submit(voice_service.embed_voice_sample, voice_audio)
+        face_encoding, face_img = face_job.result()
+        voice_data, transcription = voice_job.result()
         
         # Create new student record
         new_student = {
@@ -178,18 +308,23 @@ def register_student():
             'status': 'active'
         }
         
-        # Save student to database
-        student_id_db = db_service.add_student(new_student)
-        
-        # Process and save face image
-        face_encoding = face_service.process_face_image(face_image, student_id_db)
-        
-        # Save voice sample
-        voice_file_path = os.path.join('data/voices', f'{student_id_db}.wav')
-        voice_sample.save(voice_file_path)
+        # Save student with both embeddings in one transaction, so a failed step leaves no student behind
+        student_id_db = db_service.add_student_with_biometrics(new_student, json.dumps(face_encoding), json.dumps(voice_data))
         
-        # Process voice for embedding
-        voice_embedding = voice_service.process_voice_sample(voice_file_path, student_id_db)
+        try:
+            # Save face image and voice sample, and make the student recognizable
+            face_service.add_face(student_id_db, face_encoding, face_img)
+            voice_store.save(student_id_db, voice_audio)
+            voice_service.add_voice_data(student_id_db, voice_data, transcription)
+        except Exception:
+            # Undo every step that can be undone; a failed cleanup is logged and
+            # the registration's own error is what the client sees
+            for cleanup in (face_service.delete_student_face, voice_store.delete, db_service.delete_student):
+                try:
+                    cleanup(student_id_db)
+                except Exception as cleanup_error:
+                    app.logger.error(f"Error cleaning up failed registration of student {student_id_db}: {str(cleanup_error)}")
+            raise
         
         return jsonify({
             'success': True,
@@ -247,9 +382,7 @@ def delete_student(student_id):
         face_service.delete_student_face(student_id)
         
         # Delete voice sample
-        voice_file_path = os.path.join('data/voices', f'{student_id}.wav')
-        if os.path.exists(voice_file_path):
-            os.remove(voice_file_path)
+        voice_store.delete(student_id)
         
         # Delete from database
         db_service.delete_student(student_id)
@@ -271,17 +404,19 @@ def delete_student(student_id):
 
 @app.route('/api/sessions', methods=['GET'])
 def get_sessions():
-    """Get all sessions"""
+    """Get sessions with attendance counts, with optional date window and pagination"""
     try:
-        sessions = db_service.get_sessions()
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        page = request.args.get('page', type=int)
+        per_page = request.args.get('per_page', type=int)
         
-        # Get attendance count for each session
-        for session in sessions:
-            session['attendance_count'] = db_service.get_session_attendance_count(session['id'])
+        sessions, total = db_service.get_sessions_with_counts(start_date, end_date, page, per_page)
         
         return jsonify({
             'success': True,
-            'sessions': sessions
+            'sessions': sessions,
+            'total': total
         })
     except Exception as e:
         app.logger.error(f"Error getting sessions: {str(e)}")
@@ -417,8 +552,8 @@ def mark_attendance():
                 'message': 'Attendance already marked for this student in this session'
             }), 400
         
-        # Mark attendance
-        attendance_id = db_service.add_attendance({
+        # Mark attendance; returns once the record is committed
+        attendance_id = attendance_writer.submit({
             'student_id': student_id,
             'session_id': session_id,
             'timestamp': datetime.now().isoformat(),
@@ -431,6 +566,13 @@ def mark_attendance():
             'attendance_id': attendance_id,
             'student_name': student['name']
         })
+    except TimeoutError as e:
+        # The event was withdrawn unwritten, so the check-in can simply be retried
+        app.logger.error(f"Error marking attendance: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Attendance was not recorded in time. Please try again.'
+        }), 503
     except Exception as e:
         app.logger.error(f"Error marking attendance: {str(e)}")
         return jsonify({
@@ -473,6 +615,20 @@ def detect_face():
             'message': f"Error detecting faces: {str(e)}"
         }), 500
 
+def require_rotation_session(session_id):
+    """A 400 response if phrases rotate per session but no session_id was sent
+    
+    Without the session every configured phrase would be accepted, so a
+    recording replayed from an earlier session would pass. Phrases only
+    rotate while a transcriber checks them.
+    """
+    if session_id is None and voice_service.rotates_phrases:
+        return jsonify({
+            'success': False,
+            'message': 'Session ID is required to check the session\'s verification phrases'
+        }), 400
+    return None
+
 @app.route('/api/recognition/verify-voice', methods=['POST'])
 def verify_voice():
     """Verify a voice sample against a student's recorded voice"""
@@ -485,19 +641,20 @@ def verify_voice():
             }), 400
         
         student_id = request.form.get('student_id')
+        session_id = request.form.get('session_id', type=int)
         voice_sample = request.files['voice_sample']
         
-        # Save temporary voice file
-        temp_dir = tempfile.gettempdir()
-        temp_voice_path = os.path.join(temp_dir, f"temp_voice_{student_id}.wav")
-        voice_sample.save(temp_voice_path)
+        missing_session = require_rotation_session(session_id)
+        if missing_session:
+            return missing_session
         
-        # Verify voice
-        result = voice_service.verify_voice(temp_voice_path, int(student_id))
+        try:
+            voice_audio = read_voice_upload(voice_sample)
+        except ValueError as e:
+            return unsupported_audio(e)
         
-        # Delete temporary file
-        if os.path.exists(temp_voice_path):
-            os.remove(temp_voice_path)
+        # Verify voice, decoding straight from the in-memory upload
+        result = voice_service.verify_voice(voice_audio, int(student_id), session_id)
         
         return jsonify({
             'success': result['match'],
@@ -511,43 +668,208 @@ def verify_voice():
             'message': f"Error verifying voice: {str(e)}"
         }), 500
 
+@app.route('/api/recognition/verify-voice/batch', methods=['POST'])
+def verify_voice_batch():
+    """Verify several students' voice samples in one request
+    
+    Form fields: student_id and voice_sample, repeated once per student in
+    the same order, and session_id, required while phrases rotate. Group
+    check-in stations upload the students recorded back to back together.
+    """
+    try:
+        student_ids = request.form.getlist('student_id', type=int)
+        voice_samples = request.files.getlist('voice_sample')
+        if not voice_samples or len(student_ids) != len(voice_samples):
+            return jsonify({
+                'success': False,
+                'message': 'A student ID is required for each voice sample'
+            }), 400
+        
+        from voice_recognition_service import BATCH_MAX_SAMPLES
+        if len(voice_samples) > BATCH_MAX_SAMPLES:
+            return jsonify({
+                'success': False,
+                'message': f'At most {BATCH_MAX_SAMPLES} voice samples can be verified together'
+            }), 400
+        
+        session_id = request.form.get('session_id', type=int)
+        missing_session = require_rotation_session(session_id)
+        if missing_session:
+            return missing_session
+        
+        try:
+            voice_audio = [read_voice_upload(voice_sample) for voice_sample in voice_samples]
+        except ValueError as e:
+            return unsupported_audio(e)
+        
+        results = voice_service.verify_batch(list(zip(student_ids, voice_audio)), session_id)
+        
+        return jsonify({
+            'success': True,
+            'results': [{
+                'student_id': result['student_id'],
+                'success': result['match'],
+                'message': result['message'],
+                'score': result.get('score')
+            } for result in results]
+        })
+    except Exception as e:
+        app.logger.error(f"Error verifying voice batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Error verifying voices: {str(e)}"
+        }), 500
+
+@app.route('/api/recognition/phrases', methods=['GET'])
+def get_verification_phrases():
+    """Get the phrases students are prompted to say, rotated per session when session_id is given"""
+    session_id = request.args.get('session_id', type=int)
+    if session_id is None:
+        phrases = voice_service.verification_phrases
+    else:
+        phrases = voice_service.get_session_phrases(session_id)
+    
+    return jsonify({
+        'success': True,
+        'phrases': phrases
+    })
+
+@app.route('/api/recognition/verify-voice/stream', methods=['POST'])
+def verify_voice_stream():
+    """Verify a voice streamed as raw PCM while it is being recorded
+    
+    The body is mono 16-bit little-endian PCM at 16 kHz, sent with chunked
+    transfer encoding as the student speaks. Query parameters: student_id,
+    sample_rate (must be 16000) and session_id, required while phrases rotate.
+    The score is updated as the audio arrives and a rejection is sent as soon
+    as it is decided; while phrases are checked, a match waits for the end of
+    the recording so its phrase can be transcribed.
+    """
+    try:
+        student_id = request.args.get('student_id', type=int)
+        session_id = request.args.get('session_id', type=int)
+        import numpy as np
+        from speaker_embedding import CANONICAL_RATE
+        
+        sample_rate = request.args.get('sample_rate', CANONICAL_RATE, type=int)
+        if student_id is None or sample_rate != CANONICAL_RATE:
+            return jsonify({
+                'success': False,
+                'message': f'student_id and a sample_rate of {CANONICAL_RATE} are required'
+            }), 400
+        
+        missing_session = require_rotation_session(session_id)
+        if missing_session:
+            return missing_session
+        
+        verification = voice_service.start_verification(student_id, sample_rate, session_id)
+        if isinstance(verification, dict):
+            # No usable voice sample to compare against
+            return jsonify({
+                'success': False,
+                'message': verification['message']
+            }), 404
+        
+        chunk_bytes = int(sample_rate * VOICE_STREAM_CHUNK_SECONDS) * 2
+        leftover = b''
+        result = None
+        while result is None:
+            data = request.stream.read(chunk_bytes)
+            if not data:
+                result = verification.finish()
+                break
+            
+            # Samples may straddle reads; keep an odd trailing byte for the next one
+            data = leftover + data
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32) / 32768
+            result = verification.add_chunk(samples)
+        
+        return jsonify({
+            'success': result['match'],
+            'message': result['message'],
+            'score': result.get('score'),
+            'early': result.get('early', False),
+            'duration': result.get('duration')
+        })
+    except Exception as e:
+        app.logger.error(f"Error verifying voice stream: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Error verifying voice: {str(e)}"
+        }), 500
+
 # --------------------------------
 # Reports API Endpoints
 # --------------------------------
 
+def get_report_filters():
+    """Read report filters from the query string, resolving date_range presets"""
+    date_range = request.args.get('date_range')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    session_id = request.args.get('session_id')
+    student_id = request.args.get('student_id')
+    
+    # Process date range
+    if date_range:
+        today = datetime.now().date()
+        
+        if date_range == 'today':
+            start_date = today.isoformat()
+            end_date = today.isoformat()
+        elif date_range == 'yesterday':
+            yesterday = today - timedelta(days=1)
+            start_date = yesterday.isoformat()
+            end_date = yesterday.isoformat()
+        elif date_range == 'this_week':
+            start_date = (today - timedelta(days=today.weekday())).isoformat()
+            end_date = today.isoformat()
+        elif date_range == 'last_week':
+            last_week_start = today - timedelta(days=today.weekday() + 7)
+            last_week_end = last_week_start + timedelta(days=6)
+            start_date = last_week_start.isoformat()
+            end_date = last_week_end.isoformat()
+        elif date_range == 'this_month':
+            start_date = today.replace(day=1).isoformat()
+            end_date = today.isoformat()
+    
+    return start_date, end_date, session_id, student_id
+
+def batch_chunks(pieces, chunk_size=STREAM_CHUNK_SIZE):
+    """Join small streamed pieces into writes of roughly chunk_size characters"""
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def start_stream(rows):
+    """Pull the first row of a lazily queried report now
+    
+    Connection and query errors are then raised while the view can still
+    answer with an error, instead of after the 200 header as a truncated body.
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], rows)
+
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
     """Get attendance reports based on filters"""
     try:
         # Get filter parameters
-        date_range = request.args.get('date_range')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        session_id = request.args.get('session_id')
-        student_id = request.args.get('student_id')
-        
-        # Process date range
-        if date_range:
-            today = datetime.now().date()
-            
-            if date_range == 'today':
-                start_date = today.isoformat()
-                end_date = today.isoformat()
-            elif date_range == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                start_date = yesterday.isoformat()
-                end_date = yesterday.isoformat()
-            elif date_range == 'this_week':
-                start_date = (today - timedelta(days=today.weekday())).isoformat()
-                end_date = today.isoformat()
-            elif date_range == 'last_week':
-                last_week_start = today - timedelta(days=today.weekday() + 7)
-                last_week_end = last_week_start + timedelta(days=6)
-                start_date = last_week_start.isoformat()
-                end_date = last_week_end.isoformat()
-            elif date_range == 'this_month':
-                start_date = today.replace(day=1).isoformat()
-                end_date = today.isoformat()
+        start_date, end_date, session_id, student_id = get_report_filters()
         
         # Get attendance data
         attendance_data, stats = db_service.get_attendance_report(
@@ -572,62 +894,228 @@ def get_reports():
             'message': f"Error generating report: {str(e)}"
         }), 500
 
-@app.route('/api/reports/export', methods=['GET'])
-def export_reports():
-    """Export attendance reports as CSV"""
+@app.route('/api/reports/stream', methods=['GET'])
+def stream_reports():
+    """Stream attendance report rows as a JSON array or NDJSON (format=ndjson)"""
     try:
         # Get filter parameters (same as reports endpoint)
-        date_range = request.args.get('date_range')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        session_id = request.args.get('session_id')
-        student_id = request.args.get('student_id')
+        start_date, end_date, session_id, student_id = get_report_filters()
+        output_format = request.args.get('format', 'json')
         
-        # Process date range
-        if date_range:
-            today = datetime.now().date()
-            
-            if date_range == 'today':
-                start_date = today.isoformat()
-                end_date = today.isoformat()
-            elif date_range == 'yesterday':
-                yesterday = today - timedelta(days=1)
-                start_date = yesterday.isoformat()
-                end_date = yesterday.isoformat()
-            elif date_range == 'this_week':
-                start_date = (today - timedelta(days=today.weekday())).isoformat()
-                end_date = today.isoformat()
-            elif date_range == 'last_week':
-                last_week_start = today - timedelta(days=today.weekday() + 7)
-                last_week_end = last_week_start + timedelta(days=6)
-                start_date = last_week_start.isoformat()
-                end_date = last_week_end.isoformat()
-            elif date_range == 'this_month':
-                start_date = today.replace(day=1).isoformat()
-                end_date = today.isoformat()
+        if output_format not in ('json', 'ndjson'):
+            return jsonify({
+                'success': False,
+                'message': 'Format must be json or ndjson'
+            }), 400
         
-        # Get attendance data
-        attendance_data, _ = db_service.get_attendance_report(
-            start_date, end_date, session_id, student_id
-        )
+        rows = start_stream(db_service.iter_attendance_report(start_date, end_date, session_id, student_id))
         
-        # Generate CSV content
-        csv_content = "Date,Session,Student ID,Student Name,Time,Status\n"
+        def generate_ndjson():
+            for record in rows:
+                yield json.dumps(record) + '\n'
         
-        for record in attendance_data:
-            date = record['date']
-            session_name = record['session_name']
-            student_id = record['student_id']
-            student_name = record['student_name']
-            timestamp = datetime.fromisoformat(record['timestamp']).strftime('%H:%M:%S')
-            status = record['status']
-            
-            csv_content += f"{date},{session_name},{student_id},{student_name},{timestamp},{status}\n"
+        def generate_json():
+            yield '['
+            for index, record in enumerate(rows):
+                yield (',' if index else '') + json.dumps(record)
+            yield ']'
         
+        if output_format == 'ndjson':
+            body, mimetype = generate_ndjson(), 'application/x-ndjson'
+        else:
+            body, mimetype = generate_json(), 'application/json'
+        
+        return Response(stream_with_context(batch_chunks(body)), mimetype=mimetype)
+    except Exception as e:
+        app.logger.error(f"Error streaming report: {str(e)}")
         return jsonify({
-            'success': True,
-            'csv_content': csv_content
-        })
+            'success': False,
+            'message': f"Error streaming report: {str(e)}"
+        }), 500
+
+def generate_report_csv(rows, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield a report as CSV text in chunks of roughly chunk_size characters"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    
+    for record in rows:
+        # Rows recorded without a time have an empty Time column
+        timestamp = datetime.fromisoformat(record['timestamp']).strftime('%H:%M:%S') if record['timestamp'] else ''
+        writer.writerow([
+            record['date'],
+            record['session_name'],
+            record['student_id'],
+            record['student_name'],
+            timestamp,
+            record['status']
+        ])
+        
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+def encode_chunks(chunks):
+    """Encode streamed text chunks as UTF-8"""
+    for chunk in chunks:
+        yield chunk.encode('utf-8')
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def slice_chunks(chunks, start, end):
+    """Yield only bytes start..end (inclusive) of a stream of byte chunks"""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start and position <= end:
+            yield chunk[max(start - position, 0):end - position + 1]
+        if chunk_end > end:
+            break
+        position = chunk_end
+
+def parse_byte_range(range_header, total_size):
+    """Parse a single 'bytes=start-end' Range header into an inclusive (start, end)
+
+    Returns None if the header is not a single byte range, and raises
+    ValueError if the range cannot be satisfied.
+    """
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), total_size - 1) if last else total_size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(total_size - int(last), 0)
+        end = total_size - 1
+    
+    if start > end or start >= total_size:
+        raise ValueError(f"Range not satisfiable: {range_header}")
+    
+    return start, end
+
+def get_export_etag(filters):
+    """Strong ETag of a CSV export, from its filters and the report version, or None if the backend has no version"""
+    version = db_service.get_attendance_version()
+    if version is None:
+        return None
+    stamp = json.dumps([list(filters), version])
+    return hashlib.sha256(stamp.encode('utf-8')).hexdigest()[:32]
+
+def get_export_filename(filters):
+    """Download name of a CSV export, fixed for a given set of filters"""
+    start_date, end_date, session_id, student_id = filters
+    parts = ['attendance_report', start_date or 'all', end_date or 'all']
+    if session_id:
+        parts.append(f'session{session_id}')
+    if student_id:
+        parts.append(f'student{student_id}')
+    return secure_filename('_'.join(parts)) + '.csv'
+
+def count_chunks(chunks, key):
+    """Pass byte chunks through, recording the total size under `key` once fully sent"""
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        yield chunk
+    remember_export_size(key, size)
+
+def remember_export_size(key, size):
+    """Keep the byte size of an export version, so resuming it needs no sizing pass"""
+    with export_sizes_lock:
+        export_sizes[key] = size
+        export_sizes.move_to_end(key)
+        if len(export_sizes) > EXPORT_SIZE_CACHE:
+            export_sizes.popitem(last=False)
+
+@app.route('/api/reports/export', methods=['GET'])
+def export_reports():
+    """Export attendance reports as a streamed CSV download
+
+    The response is gzip-encoded when the client accepts it. Uncompressed
+    downloads carry a strong ETag derived from the filters and the report
+    version, which changes with attendance, students and sessions, and accept
+    a byte Range header, so an interrupted export can resume; with If-Range,
+    a resume after the report changed gets the whole new export instead of a
+    slice of it. Backends without a report version get no ETag and no ranges.
+    """
+    try:
+        # Get filter parameters (same as reports endpoint)
+        filters = get_report_filters()
+        etag = get_export_etag(filters)
+        
+        def csv_bytes():
+            rows = start_stream(db_service.iter_attendance_report(*filters))
+            return encode_chunks(generate_report_csv(rows))
+        
+        headers = {
+            'Content-Disposition': f'attachment; filename="{get_export_filename(filters)}"',
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache'
+        }
+        mimetype = 'text/csv'
+        
+        if request.accept_encodings['gzip'] > 0:
+            # A different representation, so a different validator
+            headers['Content-Encoding'] = 'gzip'
+            if etag is not None:
+                headers['ETag'] = f'"{etag}-gzip"'
+                if request.if_none_match.contains(f'{etag}-gzip'):
+                    return Response(status=304, headers=headers)
+            return Response(stream_with_context(gzip_chunks(csv_bytes())), mimetype=mimetype, headers=headers)
+        
+        if etag is None:
+            # Without a validator a resumed download could splice two versions together
+            headers['Accept-Ranges'] = 'none'
+            return Response(stream_with_context(csv_bytes()), mimetype=mimetype, headers=headers)
+        
+        headers['Accept-Ranges'] = 'bytes'
+        headers['ETag'] = f'"{etag}"'
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        
+        # A Range whose If-Range names another version gets the whole current export
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if range_header and if_range is not None and if_range.strip() != f'"{etag}"':
+            range_header = None
+        
+        if range_header:
+            with export_sizes_lock:
+                total_size = export_sizes.get(etag)
+            if total_size is None:
+                # Measure this version of the export once, in a first streaming pass
+                total_size = sum(len(chunk) for chunk in csv_bytes())
+                remember_export_size(etag, total_size)
+            
+            try:
+                byte_range = parse_byte_range(range_header, total_size)
+            except ValueError:
+                headers['Content-Range'] = f'bytes */{total_size}'
+                return Response(status=416, headers=headers)
+            
+            if byte_range:
+                start, end = byte_range
+                headers['Content-Range'] = f'bytes {start}-{end}/{total_size}'
+                headers['Content-Length'] = str(end - start + 1)
+                body = slice_chunks(csv_bytes(), start, end)
+                return Response(stream_with_context(body), status=206, mimetype=mimetype, headers=headers)
+        
+        body = count_chunks(csv_bytes(), etag)
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
     except Exception as e:
         app.logger.error(f"Error exporting report: {str(e)}")
         return jsonify({
@@ -643,12 +1131,7 @@ def export_reports():
 def get_settings():
     """Get system settings"""
     try:
-        settings = db_service.get_settings()
-        
-        # Use default settings if none exist
-        if not settings:
-            settings = DEFAULT_SETTINGS
-            db_service.save_settings(settings)
+        settings = settings_cache.get()
         
         return jsonify({
             'success': True,
@@ -681,12 +1164,16 @@ def save_settings():
                     'message': f'Missing required setting: {key}'
                 }), 400
         
-        # Save settings to database
-        db_service.save_settings(data)
+        phrases = data.get('verification_phrases')
+        if phrases is not None and (not isinstance(phrases, list) or not phrases
+                                    or not all(isinstance(phrase, str) and phrase.strip() for phrase in phrases)):
+            return jsonify({
+                'success': False,
+                'message': 'verification_phrases must be a list of non-empty phrases'
+            }), 400
         
-        # Update threshold in recognition services
-        face_service.update_threshold(data['face_recognition_threshold'])
-        voice_service.update_threshold(data['voice_recognition_threshold'])
+        # Save settings to database; the cache applies the new thresholds
+        settings_cache.save(data)
         
         return jsonify({
             'success': True,
@@ -753,10 +1240,92 @@ def test_recognition():
             'message': f"Error testing recognition services: {str(e)}"
         }), 500
 
+@app.route('/api/diagnostics/sync-status', methods=['GET'])
+def sync_status():
+    """Get the state of the local replica synchronizer"""
+    from hybrid_service import HybridService
+    if not isinstance(services.get('storage'), HybridService):
+        return jsonify({
+            'success': False,
+            'message': 'Local replica is not enabled'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'sync': db_service.get_sync_status()
+    })
+
+@app.route('/api/diagnostics/attendance-writer', methods=['GET'])
+def attendance_writer_status():
+    """Get group-commit counters for attendance writes"""
+    return jsonify({
+        'success': True,
+        'writer': attendance_writer.get_stats()
+    })
+
+@app.route('/api/diagnostics/transcription', methods=['GET'])
+def transcription_status():
+    """Get job, coalescing and cache counters for phrase transcription"""
+    if voice_service.transcriber is None:
+        return jsonify({
+            'success': False,
+            'message': 'Transcription is not enabled'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'transcription': voice_service.transcriber.get_stats()
+    })
+
+@app.route('/api/diagnostics/voice-storage', methods=['GET'])
+def voice_storage_status():
+    """Get FLAC compression counters and disk usage of the enrolment recordings"""
+    return jsonify({
+        'success': True,
+        'voice_storage': voice_store.get_stats()
+    })
+
+@app.route('/api/diagnostics/backup', methods=['GET'])
+def backup_status():
+    """Get the progress of a running backup and the metrics of the last one"""
+    backup_service = services.get('backup')
+    if backup_service is None:
+        return jsonify({
+            'success': False,
+            'message': 'No local database to back up'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'backup': backup_service.get_status()
+    })
+
+@app.route('/api/diagnostics/backup', methods=['POST'])
+def start_backup():
+    """Start an online backup of the local database in the background"""
+    backup_service = services.get('backup')
+    if backup_service is None:
+        return jsonify({
+            'success': False,
+            'message': 'No local database to back up'
+        }), 404
+    
+    if not backup_service.start_backup():
+        return jsonify({
+            'success': False,
+            'message': 'A backup is already running'
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'message': 'Backup started'
+    }), 202
+
+# Connect storage (creating its tables) and load embeddings in the background
+services.mark_imported()
+services.warm_up()
+
 # Run the Flask app
 if __name__ == '__main__':
-    # Create database tables if they don't exist
-    db_service.init_db()
-    
     # Run the app
     app.run(host='0.0.0.0', port=8001, debug=True)
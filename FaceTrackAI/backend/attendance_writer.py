@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# Longest an attendance event waits for others to share its commit, in seconds
+GROUP_COMMIT_DELAY = 0.005
+
+# Most events written in one transaction
+GROUP_COMMIT_MAX_BATCH = 100
+
+# Events that may wait for a commit before submit blocks
+GROUP_COMMIT_MAX_PENDING = 1000
+
+# Seconds a request waits for its event to be committed before giving up
+GROUP_COMMIT_ACK_TIMEOUT = 10.0
+
+class AttendanceWriter:
+    def __init__(self, storage, delay=GROUP_COMMIT_DELAY, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 max_pending=GROUP_COMMIT_MAX_PENDING):
+        """
+        Initialize the group-commit attendance writer
+
+        Attendance events from concurrent requests are queued and a single
+        writer thread commits whatever arrived within `delay` of the first one
+        in one add_attendance_batch call, so a burst of check-ins shares one
+        disk flush instead of taking one each. submit() returns only once the
+        event's transaction has committed, so an acknowledged check-in is
+        durable. The queue itself lives only in memory: events not yet
+        acknowledged are lost if the process dies, and their requests see an
+        error. An event whose request gave up waiting is never written, so
+        retrying the check-in cannot record it twice.
+
+        Args:
+            storage: StorageBackend implementing add_attendance_batch
+            delay: Seconds to hold a batch open after its first event
+            max_batch: Most events per transaction
+            max_pending: Queue bound; submit blocks when this many are waiting
+        """
+        self.storage = storage
+        self.delay = delay
+        self.max_batch = max_batch
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.stats = {'events': 0, 'batches': 0, 'largest_batch': 0, 'failed': 0, 'abandoned': 0}
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start the writer thread"""
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self.write_loop, name='attendance-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Commit everything queued and stop the writer thread"""
+        if not self.running:
+            return
+
+        self.running = False
+        self.pending.put(None)
+        self.thread.join()
+
+    def submit(self, attendance_data, timeout=GROUP_COMMIT_ACK_TIMEOUT):
+        """
+        Queue an attendance event and wait until it is committed
+
+        Returns:
+            The attendance ID
+
+        Raises:
+            TimeoutError if the writer has not started on the event within
+            `timeout` seconds; the event is then withdrawn and never written.
+            The error the backend raised if its write failed
+        """
+        if not self.running:
+            return self.storage.add_attendance(attendance_data)
+
+        ack = Future()
+        try:
+            self.pending.put((attendance_data, ack), timeout=timeout)
+        except queue.Full:
+            raise TimeoutError("Timed out waiting for attendance to be committed")
+
+        try:
+            return ack.result(timeout=timeout)
+        except FutureTimeoutError:
+            if ack.done():
+                # Also the builtin TimeoutError on Python 3.11+, so this was the backend's own error
+                raise
+            if ack.cancel():
+                raise TimeoutError("Timed out waiting for attendance to be committed")
+            # The writer claimed the event before it could be withdrawn and is committing it
+            return ack.result()
+
+    def write_loop(self):
+        """Collect events into batches and commit them until stopped"""
+        stopping = False
+        while not stopping:
+            item = self.pending.get()
+            if item is None:
+                break
+
+            # Hold the batch open for a few milliseconds to let a burst join it
+            batch = [item]
+            deadline = time.monotonic() + self.delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self.write_batch(batch)
+
+        # Drain what was queued before stop() so no waiting request is dropped
+        remaining = []
+        while True:
+            try:
+                item = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.max_batch):
+            self.write_batch(remaining[start:start + self.max_batch])
+
+    def write_batch(self, batch):
+        """Commit a batch and acknowledge each waiting request"""
+        # Claim each event; those whose request already gave up are dropped
+        claimed = [(data, ack) for data, ack in batch if ack.set_running_or_notify_cancel()]
+        self.stats['abandoned'] += len(batch) - len(claimed)
+        batch = claimed
+        if not batch:
+            return
+
+        try:
+            attendance_ids = self.storage.add_attendance_batch([data for data, _ in batch])
+        except Exception as e:
+            print(f"Error committing {len(batch)} attendance records together, retrying one by one: {e}")
+            attendance_ids = None
+
+        if attendance_ids is not None:
+            for (_, ack), attendance_id in zip(batch, attendance_ids):
+                ack.set_result(attendance_id)
+        else:
+            # One bad record must not fail the rest of the batch
+            for data, ack in batch:
+                try:
+                    ack.set_result(self.storage.add_attendance(data))
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    ack.set_exception(e)
+
+        self.stats['events'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+    def get_stats(self):
+        """Get event, batch and failure counts since start"""
+        return {
+            **self.stats,
+            'pending': self.pending.qsize(),
+            'running': self.running
+        }
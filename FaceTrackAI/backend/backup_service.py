@@ -0,0 +1,229 @@
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+# Pages copied per backup step, and seconds slept between steps so writers get the lock
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.05
+
+# Times a backup may restart because the database changed before copying in one step
+BACKUP_MAX_RESTARTS = 3
+
+# Backups kept by default
+BACKUP_RETENTION = 7
+
+class BackupRestarted(Exception):
+    """Raised to abandon an incremental backup that keeps restarting"""
+
+class BackupService:
+    def __init__(self, db_file, backup_dir='data/backups', retention=BACKUP_RETENTION,
+                 pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep=BACKUP_STEP_SLEEP):
+        """
+        Initialize the backup service
+
+        Backups use the SQLite online backup API, so they are consistent
+        snapshots taken while kiosks keep writing. Pages are copied
+        `pages_per_step` at a time with a sleep between steps. The copy is
+        integrity checked, gzip compressed and kept alongside the newest
+        `retention` backups.
+
+        Args:
+            db_file: Path of the database to back up
+            backup_dir: Directory the compressed backups are written to
+            retention: Number of backups kept; older ones are deleted
+            pages_per_step: Pages copied per backup step
+            step_sleep: Seconds slept between steps
+        """
+        self.db_file = db_file
+        self.backup_dir = backup_dir
+        self.retention = retention
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.prefix = os.path.splitext(os.path.basename(db_file))[0] + '-'
+
+        self.lock = threading.Lock()
+        self.thread = None
+        self.progress = None
+        self.last_backup = None
+
+        os.makedirs(backup_dir, exist_ok=True)
+
+    def start_backup(self):
+        """Run a backup in a background thread; returns False if one is already running"""
+        # The lock is taken here and handed to the thread, so a second
+        # request can't start another backup before this one begins
+        if not self.lock.acquire(blocking=False):
+            return False
+
+        try:
+            self.thread = threading.Thread(target=self.run_backup, name='database-backup', daemon=True)
+            self.thread.start()
+        except Exception:
+            self.lock.release()
+            raise
+        return True
+
+    def run_backup(self):
+        """Run a backup started by start_backup, recording failures in the status instead of raising"""
+        try:
+            self.create_backup(lock_held=True)
+        except Exception as e:
+            print(f"Error backing up {self.db_file}: {e}")
+
+    def create_backup(self, lock_held=False):
+        """
+        Back up the database
+
+        Args:
+            lock_held: The caller already holds the backup lock, which is released when done
+
+        Returns:
+            Metrics of the backup: path, sizes, page counts and timings
+
+        Raises:
+            RuntimeError if a backup is already running or the copy fails its integrity check
+        """
+        if not lock_held and not self.lock.acquire(blocking=False):
+            raise RuntimeError("A backup is already running")
+
+        started = time.perf_counter()
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.backup_dir, f'{self.prefix}{stamp}.db.gz')
+        copy_file = os.path.join(self.backup_dir, f'.{self.prefix}{stamp}.db')
+        metrics = {
+            'path': path,
+            'started_at': datetime.now().isoformat(),
+            'status': 'running'
+        }
+        self.progress = {'pages_total': 0, 'pages_remaining': 0, 'percent': 0, 'steps': 0, 'restarts': 0}
+
+        try:
+            self.copy_database(copy_file)
+            metrics['copy_seconds'] = round(time.perf_counter() - started, 3)
+
+            self.verify_copy(copy_file)
+            metrics['size'] = os.path.getsize(copy_file)
+
+            compress_started = time.perf_counter()
+            self.compress(copy_file, path)
+            metrics['compress_seconds'] = round(time.perf_counter() - compress_started, 3)
+            metrics['compressed_size'] = os.path.getsize(path)
+
+            metrics['removed'] = self.apply_retention()
+            metrics['status'] = 'ok'
+            return metrics
+        except Exception as e:
+            metrics['status'] = 'failed'
+            metrics['error'] = str(e)
+            raise
+        finally:
+            if os.path.exists(copy_file):
+                os.remove(copy_file)
+
+            metrics.update({
+                'pages': self.progress['pages_total'],
+                'steps': self.progress['steps'],
+                'restarts': self.progress['restarts'],
+                'duration_seconds': round(time.perf_counter() - started, 3),
+                'finished_at': datetime.now().isoformat()
+            })
+            self.last_backup = metrics
+            self.progress = None
+            self.lock.release()
+
+            print(f"Backup of {self.db_file} {metrics['status']} in {metrics['duration_seconds']}s")
+
+    def copy_database(self, copy_file):
+        """Copy the database into `copy_file` with the online backup API"""
+        source = sqlite3.connect(self.db_file, isolation_level=None)
+        try:
+            # In WAL mode an open read transaction pins one snapshot for every
+            # step without blocking writers, so kiosk writes cannot restart the copy
+            wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            if wal:
+                source.execute('BEGIN')
+                source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+
+            try:
+                self.copy_steps(source, copy_file, self.pages_per_step)
+            except BackupRestarted:
+                # Writes keep landing between steps; copy in one step instead
+                print("Backup restarted too often, copying in a single step")
+                self.copy_steps(source, copy_file, -1)
+        finally:
+            source.close()
+
+    def copy_steps(self, source, copy_file, pages):
+        """Run the backup API in steps of `pages`, sleeping between steps"""
+        def on_step(status, remaining, total):
+            progress = self.progress
+            if progress['steps'] and remaining > progress['pages_remaining']:
+                progress['restarts'] += 1
+                if progress['restarts'] > BACKUP_MAX_RESTARTS:
+                    raise BackupRestarted()
+
+            progress.update({
+                'pages_total': total,
+                'pages_remaining': remaining,
+                'percent': round(100 * (total - remaining) / total, 1) if total else 100,
+                'steps': progress['steps'] + 1
+            })
+
+            # Let kiosk writes in before the next step takes the read lock
+            if remaining:
+                time.sleep(self.step_sleep)
+
+        dest = sqlite3.connect(copy_file)
+        try:
+            source.backup(dest, pages=pages, progress=on_step)
+
+            # A standalone copy, not a WAL database that needs its -wal file
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+
+    def verify_copy(self, copy_file):
+        """Raise if the copied database fails SQLite's integrity check"""
+        conn = sqlite3.connect(copy_file)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchall()
+        finally:
+            conn.close()
+
+        if [row[0] for row in result] != ['ok']:
+            raise RuntimeError(f"Backup failed integrity check: {result[0][0]}")
+
+    def compress(self, copy_file, path):
+        """Gzip `copy_file` into `path`, replacing it only once complete"""
+        partial = path + '.partial'
+        with open(copy_file, 'rb') as source, gzip.open(partial, 'wb') as dest:
+            shutil.copyfileobj(source, dest, 1024 * 1024)
+        os.replace(partial, path)
+
+    def list_backups(self):
+        """List this database's backups, newest first"""
+        names = [
+            name for name in os.listdir(self.backup_dir)
+            if name.startswith(self.prefix) and name.endswith('.db.gz')
+        ]
+        return [os.path.join(self.backup_dir, name) for name in sorted(names, reverse=True)]
+
+    def apply_retention(self):
+        """Delete all but the newest `retention` backups, returning the paths removed"""
+        removed = self.list_backups()[self.retention:]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    def get_status(self):
+        """Get the running backup's progress, the last backup's metrics and the backups kept"""
+        return {
+            'running': self.progress is not None,
+            'progress': dict(self.progress) if self.progress else None,
+            'last_backup': self.last_backup,
+            'backups': self.list_backups()
+        }
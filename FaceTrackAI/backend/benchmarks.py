@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from database_service import DatabaseService
+from storage_backend import create_storage_backend, STORAGE_BACKENDS
+
+# (students, sessions) sizes the report benchmark grows through
+REPORT_SIZES = [(1000, 100), (4000, 400), (16000, 1600)]
+
+def seed_database(db_service, num_students, num_sessions, per_session=30, sessions_per_day=4):
+    """Fill a database with synthetic students, sessions and attendance
+
+    Sessions run `sessions_per_day` a day from 2024-01-01, so more sessions
+    means a longer history rather than busier days.
+    """
+    conn = db_service.get_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany('''
+    INSERT INTO students (student_id, name, email, course, registration_date, status)
+    VALUES (?, ?, ?, ?, ?, 'active')
+    ''', [
+        (f'S{i:06d}', f'Student {i}', f'student{i}@example.edu', f'Course {i % 20}', '2024-01-01')
+        for i in range(num_students)
+    ])
+
+    start = date(2024, 1, 1)
+    cursor.executemany('INSERT INTO sessions (name, date) VALUES (?, ?)', [
+        (f'Session {i}', (start + timedelta(days=i // sessions_per_day)).isoformat())
+        for i in range(num_sessions)
+    ])
+
+    rows = []
+    for session_id in range(1, num_sessions + 1):
+        for student_id in random.sample(range(1, num_students + 1), per_session):
+            rows.append((student_id, session_id, '2024-01-01T09:00:00', 'present'))
+    cursor.executemany('''
+    INSERT INTO attendance (student_id, session_id, timestamp, status)
+    VALUES (?, ?, ?, ?)
+    ''', rows)
+
+    conn.commit()
+    conn.close()
+
+def time_call(func, repeat=5):
+    """Return the best wall-clock time of several calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+# Report statistics queries the benchmark times at each size
+REPORT_QUERIES = {
+    'window': lambda db: db.get_attendance_stats('2024-01-01', '2024-01-31'),
+    'full_range': lambda db: db.get_attendance_stats(),
+    'course_rate': lambda db: db.get_attendance_stats(course='Course 0')
+}
+
+def benchmark_reports(max_growth=2.0):
+    """Check that report statistics latency grows no faster than the attendance itself
+
+    Times a one-month window, an unbounded report and a per-course attendance
+    rate at each of REPORT_SIZES, next to a bare students x sessions CROSS JOIN
+    for reference. Attendance grows 16x across the sizes and the product 256x;
+    a query that materializes the product grows with it. Returns True if every
+    query grows by no more than `max_growth` times the attendance growth.
+    """
+    random.seed(0)
+    timings = {name: [] for name in REPORT_QUERIES}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_students, num_sessions in REPORT_SIZES:
+            db_service = DatabaseService(os.path.join(tmp, f'bench_{num_students}.db'))
+            db_service.init_db()
+            seed_database(db_service, num_students, num_sessions)
+
+            line = f"students={num_students:>6} sessions={num_sessions:>5}"
+            for name, query in REPORT_QUERIES.items():
+                elapsed = time_call(lambda: query(db_service))
+                timings[name].append(elapsed)
+                line += f" {name}={elapsed:8.2f} ms"
+
+            def cross_join():
+                conn = db_service.get_connection()
+                conn.execute('SELECT COUNT(*) FROM students CROSS JOIN sessions').fetchone()
+                conn.close()
+            line += f" cross_join={time_call(cross_join, repeat=1):8.2f} ms"
+            print(line)
+
+    # Every size records the same attendance per session
+    rows_growth = REPORT_SIZES[-1][1] / REPORT_SIZES[0][1]
+    product_growth = (REPORT_SIZES[-1][0] * REPORT_SIZES[-1][1]) / (REPORT_SIZES[0][0] * REPORT_SIZES[0][1])
+    ok = True
+    for name, values in timings.items():
+        growth = values[-1] / max(values[0], 0.01)
+        ok = ok and growth <= max_growth * rows_growth
+        print(f"{name} latency growth {growth:.2f}x over {rows_growth:.0f}x attendance "
+              f"and {product_growth:.0f}x students x sessions")
+    return ok
+
+def benchmark_backend(storage, repeat=20):
+    """Time the common operations of one storage backend
+
+    Creates its own uniquely named students, session and attendance and
+    deletes them afterwards, so it can run against a scratch project.
+    Returns {operation: best milliseconds}.
+    """
+    prefix = f'BENCH{int(time.time() * 1000)}'
+    timings = {}
+    student_ids = []
+
+    def add_student():
+        student_ids.append(storage.add_student({
+            'student_id': f'{prefix}-{len(student_ids)}',
+            'name': f'Benchmark Student {len(student_ids)}',
+            'email': f'{prefix.lower()}{len(student_ids)}@example.edu',
+            'course': 'Benchmark',
+            'registration_date': '2024-01-01T00:00:00',
+            'status': 'active'
+        }))
+
+    session_id = storage.add_session({'name': f'{prefix} session', 'date': '2024-01-01'})
+
+    try:
+        timings['add_student'] = time_call(add_student, repeat)
+        timings['get_student_by_id'] = time_call(lambda: storage.get_student_by_id(student_ids[0]), repeat)
+        timings['get_students_search'] = time_call(lambda: storage.get_students(1, 10, prefix.lower()), repeat)
+
+        attendance = iter(student_ids)
+        timings['add_attendance'] = time_call(lambda: storage.add_attendance({
+            'student_id': next(attendance),
+            'session_id': session_id,
+            'timestamp': '2024-01-01T09:00:00',
+            'status': 'present'
+        }), repeat)
+        timings['get_attendance_by_student_session'] = time_call(
+            lambda: storage.get_attendance_by_student_session(student_ids[0], session_id), repeat)
+        timings['get_attendance_by_session'] = time_call(lambda: storage.get_attendance_by_session(session_id), repeat)
+        timings['get_sessions_with_counts'] = time_call(lambda: storage.get_sessions_with_counts(page=1, per_page=20), repeat)
+        timings['get_attendance_report'] = time_call(lambda: storage.get_attendance_report(session_id=session_id), repeat)
+        timings['get_settings'] = time_call(storage.get_settings, repeat)
+    finally:
+        storage.delete_session(session_id)
+        for student_id in student_ids:
+            storage.delete_student(student_id)
+
+    return timings
+
+def benchmark_backends(backends, repeat=20):
+    """Compare per-operation latency across storage backends and print a table
+
+    The sqlite backend runs on a temporary database; supabase and hybrid use
+    the configured SUPABASE_URL, which should point at a scratch project.
+    """
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            storage = create_storage_backend({
+                **os.environ,
+                'STORAGE_BACKEND': backend,
+                'SQLITE_DB_PATH': os.path.join(tmp, 'bench.db'),
+                'LOCAL_REPLICA_DB': os.path.join(tmp, 'replica.db')
+            })
+            results[backend] = benchmark_backend(storage, repeat)
+            if hasattr(storage, 'stop_sync'):
+                storage.stop_sync()
+
+    print(f"{'operation':<36}" + ''.join(f"{backend:>12}" for backend in backends))
+    for operation in results[backends[0]]:
+        print(f"{operation:<36}" + ''.join(f"{results[backend][operation]:>9.2f} ms" for backend in backends))
+
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backend performance benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+    reports = commands.add_parser('reports', help='Report statistics latency as tables grow')
+    reports.add_argument('--max-growth', type=float, default=2.0,
+                         help='Fail if latency grows more than this factor times the attendance')
+    backends = commands.add_parser('backends', help='Per-operation latency of each storage backend')
+    backends.add_argument('names', nargs='*', metavar='backend',
+                          help=f"Backends to compare: {', '.join(STORAGE_BACKENDS)} (default: sqlite)")
+    backends.add_argument('--repeat', type=int, default=20, help='Calls per operation')
+    args = parser.parse_args()
+
+    if args.command == 'reports':
+        ok = benchmark_reports(args.max_growth)
+    elif args.command == 'backends':
+        ok = benchmark_backends(args.names or ['sqlite'], args.repeat)
+
+    sys.exit(0 if ok else 1)
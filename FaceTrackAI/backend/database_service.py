@@ -1,10 +1,25 @@
 import os
+import re
 import json
 import sqlite3
 import time
-from datetime import datetime, date
+import calendar
+from datetime import datetime, date, timedelta
+from storage_backend import StorageBackend, DEFAULT_SETTINGS
 
-class DatabaseService:
+# Rows fetched from the cursor per round when streaming reports
+REPORT_CHUNK_SIZE = 500
+
+# Rows per page when loading embedding galleries
+EMBEDDING_PAGE_SIZE = 1000
+
+# Most archived terms one query may attach (SQLite's default attach limit)
+ARCHIVE_ATTACH_LIMIT = 10
+
+# Attendance columns copied into term archives and combined by UNION ALL
+ARCHIVE_COLUMNS = 'id, student_id, session_id, timestamp, status'
+
+class DatabaseService(StorageBackend):
     def __init__(self, db_file):
         """Initialize the database service with the database file path"""
         self.db_file = db_file
@@ -23,6 +38,10 @@ class DatabaseService:
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Write-ahead logging: each commit is one append and fsync of the
+        # journal, and readers are not blocked while attendance is written
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Create Students table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS students (
@@ -87,12 +106,256 @@ class DatabaseService:
         CREATE TABLE IF NOT EXISTS settings (
             id INTEGER PRIMARY KEY,
             settings_data TEXT NOT NULL,
-            updated_at TEXT
+            updated_at TEXT,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        
+        # Databases created before settings were versioned lack the version column
+        cursor.execute('PRAGMA table_info(settings)')
+        if 'version' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE settings ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+        
+        # Closed terms whose attendance was moved into per-term archive files
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_terms (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            file TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            archived_at TEXT
+        )
+        ''')
+        
+        # Index the foreign keys used by the attendance lookups and reports
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_session ON attendance (session_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_student ON attendance (student_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions (date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_status_course ON students (status, course)')
+        
+        # Create the student search index
+        self.init_student_search(cursor)
+        
+        # Create the attendance summary tables
+        self.init_attendance_stats(cursor)
+        
+        # Create the report version counter
+        self.init_report_version(cursor)
+        
+        conn.commit()
+        conn.close()
+    
+    def init_student_search(self, cursor):
+        """Create the FTS5 index over students and the triggers that keep it in sync"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'")
+        exists = cursor.fetchone() is not None
+        
+        # External-content table: the index stores only tokens, rows live in students
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5(
+            student_id, name, email, course,
+            content='students', content_rowid='id',
+            tokenize='unicode61', prefix='1 2 3'
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_insert AFTER INSERT ON students BEGIN
+            INSERT INTO students_fts (rowid, student_id, name, email, course)
+            VALUES (new.id, new.student_id, new.name, new.email, new.course);
+        END
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_delete AFTER DELETE ON students BEGIN
+            INSERT INTO students_fts (students_fts, rowid, student_id, name, email, course)
+            VALUES ('delete', old.id, old.student_id, old.name, old.email, old.course);
+        END
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS students_fts_update AFTER UPDATE ON students BEGIN
+            INSERT INTO students_fts (students_fts, rowid, student_id, name, email, course)
+            VALUES ('delete', old.id, old.student_id, old.name, old.email, old.course);
+            INSERT INTO students_fts (rowid, student_id, name, email, course)
+            VALUES (new.id, new.student_id, new.name, new.email, new.course);
+        END
+        ''')
+        
+        # Index students that were added before the search table existed
+        if not exists:
+            cursor.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
+    
+    def init_attendance_stats(self, cursor):
+        """Create the attendance summary tables and the triggers that maintain them"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_session_stats'")
+        exists = cursor.fetchone() is not None
+        
+        # Attendance count per session, keyed by session with its date for range filters
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_session_stats (
+            session_id INTEGER PRIMARY KEY,
+            date TEXT,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_session_stats_date ON attendance_session_stats (date)')
+        
+        # Attendance count per student per month (YYYY-MM)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_student_monthly (
+            student_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, student_id)
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS attendance_stats_insert AFTER INSERT ON attendance BEGIN
+            INSERT INTO attendance_session_stats (session_id, date, count)
+            VALUES (new.session_id, (SELECT date FROM sessions WHERE id = new.session_id), 1)
+            ON CONFLICT (session_id) DO UPDATE SET count = count + 1;
+            INSERT INTO attendance_student_monthly (student_id, month, count)
+            VALUES (new.student_id, COALESCE(substr((SELECT date FROM sessions WHERE id = new.session_id), 1, 7), ''), 1)
+            ON CONFLICT (month, student_id) DO UPDATE SET count = count + 1;
+        END
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS attendance_stats_delete AFTER DELETE ON attendance BEGIN
+            UPDATE attendance_session_stats SET count = count - 1
+            WHERE session_id = old.session_id;
+            UPDATE attendance_student_monthly SET count = count - 1
+            WHERE student_id = old.student_id
+            AND month = COALESCE(substr((SELECT date FROM sessions WHERE id = old.session_id), 1, 7), '');
+            DELETE FROM attendance_student_monthly WHERE student_id = old.student_id AND count <= 0;
+        END
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS attendance_stats_update AFTER UPDATE OF student_id, session_id ON attendance
+        WHEN old.student_id != new.student_id OR old.session_id != new.session_id BEGIN
+            UPDATE attendance_session_stats SET count = count - 1
+            WHERE session_id = old.session_id;
+            UPDATE attendance_student_monthly SET count = count - 1
+            WHERE student_id = old.student_id
+            AND month = COALESCE(substr((SELECT date FROM sessions WHERE id = old.session_id), 1, 7), '');
+            DELETE FROM attendance_student_monthly WHERE student_id = old.student_id AND count <= 0;
+            INSERT INTO attendance_session_stats (session_id, date, count)
+            VALUES (new.session_id, (SELECT date FROM sessions WHERE id = new.session_id), 1)
+            ON CONFLICT (session_id) DO UPDATE SET count = count + 1;
+            INSERT INTO attendance_student_monthly (student_id, month, count)
+            VALUES (new.student_id, COALESCE(substr((SELECT date FROM sessions WHERE id = new.session_id), 1, 7), ''), 1)
+            ON CONFLICT (month, student_id) DO UPDATE SET count = count + 1;
+        END
+        ''')
+        
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS attendance_stats_session_delete AFTER DELETE ON sessions BEGIN
+            DELETE FROM attendance_session_stats WHERE session_id = old.id;
+        END
+        ''')
+        
+        # A session moved to another date takes its live attendance to that date's month
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS attendance_stats_session_date AFTER UPDATE OF date ON sessions
+        WHEN old.date IS NOT new.date BEGIN
+            UPDATE attendance_session_stats SET date = new.date WHERE session_id = new.id;
+            UPDATE attendance_student_monthly SET count = count - (
+                SELECT COUNT(*) FROM attendance a
+                WHERE a.session_id = new.id AND a.student_id = attendance_student_monthly.student_id
+            )
+            WHERE month = COALESCE(substr(old.date, 1, 7), '')
+            AND student_id IN (SELECT student_id FROM attendance WHERE session_id = new.id);
+            DELETE FROM attendance_student_monthly WHERE month = COALESCE(substr(old.date, 1, 7), '') AND count <= 0;
+            INSERT INTO attendance_student_monthly (student_id, month, count)
+            SELECT student_id, COALESCE(substr(new.date, 1, 7), ''), COUNT(*)
+            FROM attendance WHERE session_id = new.id
+            GROUP BY student_id
+            ON CONFLICT (month, student_id) DO UPDATE SET count = count + excluded.count;
+        END
+        ''')
+        
+        # Backfill from existing attendance the first time the tables are created
+        if not exists:
+            self.rebuild_attendance_stats(cursor)
+    
+    def init_report_version(self, cursor):
+        """Create the counter that every change to report content increments"""
+        # The token is new for each database file, so a recreated database
+        # never repeats a version an export was already served under
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            token TEXT NOT NULL,
+            counter INTEGER NOT NULL DEFAULT 0
         )
         ''')
+        cursor.execute('INSERT OR IGNORE INTO report_version (id, token, counter) VALUES (1, ?, 0)', (os.urandom(8).hex(),))
+        
+        # Reports join attendance with student and session names, so a rename changes them too
+        for table in ('attendance', 'students', 'sessions'):
+            for event in ('insert', 'update', 'delete'):
+                cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS report_version_{table}_{event} AFTER {event.upper()} ON {table} BEGIN
+                    UPDATE report_version SET counter = counter + 1 WHERE id = 1;
+                END
+                ''')
+    
+    def rebuild_attendance_stats(self, cursor=None):
+        """Recompute the attendance summary tables from the attendance history, archived terms included"""
+        conn = None
+        if cursor is None:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+        
+        # Attach archives before the first write opens a transaction
+        source, source_params = self.get_attendance_source(cursor)
+        
+        cursor.execute('DELETE FROM attendance_session_stats')
+        cursor.execute(f'''
+        INSERT INTO attendance_session_stats (session_id, date, count)
+        SELECT a.session_id, ses.date, COUNT(*)
+        FROM {source} a
+        LEFT JOIN sessions ses ON a.session_id = ses.id
+        GROUP BY a.session_id
+        ''', source_params)
+        
+        cursor.execute('DELETE FROM attendance_student_monthly')
+        cursor.execute(f'''
+        INSERT INTO attendance_student_monthly (student_id, month, count)
+        SELECT a.student_id, COALESCE(substr(ses.date, 1, 7), ''), COUNT(*)
+        FROM {source} a
+        LEFT JOIN sessions ses ON a.session_id = ses.id
+        GROUP BY a.student_id, COALESCE(substr(ses.date, 1, 7), '')
+        ''', source_params)
+        
+        if conn is not None:
+            conn.commit()
+            conn.close()
+        
+        return True
+    
+    def rebuild_student_search(self):
+        """Rebuild the student search index from the students table"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("INSERT INTO students_fts (students_fts) VALUES ('rebuild')")
         
         conn.commit()
         conn.close()
+        
+        return True
+    
+    @staticmethod
+    def build_search_expression(query):
+        """Turn free text into an FTS5 prefix query, e.g. 'jo smi' -> '"jo"* AND "smi"*'"""
+        tokens = re.findall(r'\w+', query.lower())
+        return ' AND '.join(f'"{token}"*' for token in tokens)
     
     def test_connection(self):
         """Test the database connection"""
@@ -136,6 +399,46 @@ class DatabaseService:
         
         return student_id
     
+    def add_student_with_biometrics(self, student_data, encoding_data, embedding_data):
+        """Add a student with their face encoding and voice embedding in one transaction
+        
+        Returns:
+            The student's internal ID
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        created_at = datetime.now().isoformat()
+        
+        try:
+            cursor.execute('''
+            INSERT INTO students (student_id, name, email, course, registration_date, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                student_data['student_id'],
+                student_data['name'],
+                student_data['email'],
+                student_data['course'],
+                student_data['registration_date'],
+                student_data['status']
+            ))
+            student_id = cursor.lastrowid
+            
+            cursor.execute('''
+            INSERT INTO face_encodings (student_id, encoding_data, created_at)
+            VALUES (?, ?, ?)
+            ''', (student_id, encoding_data, created_at))
+            cursor.execute('''
+            INSERT INTO voice_embeddings (student_id, embedding_data, created_at)
+            VALUES (?, ?, ?)
+            ''', (student_id, embedding_data, created_at))
+            
+            conn.commit()
+        finally:
+            # Closing without a commit rolls back, so a failed step leaves no student behind
+            conn.close()
+        
+        return student_id
+    
     def get_students(self, page=1, per_page=10, query=''):
         """Get students with pagination and search"""
         conn = self.get_connection()
@@ -144,21 +447,24 @@ class DatabaseService:
         offset = (page - 1) * per_page
         
         # Add search condition if query is provided
-        if query:
-            search = f"%{query}%"
+        search = self.build_search_expression(query) if query else ''
+        if search:
+            # Ranked prefix match on the FTS index, best matches first
             cursor.execute('''
-            SELECT * FROM students 
-            WHERE student_id LIKE ? OR name LIKE ? OR email LIKE ? OR course LIKE ?
-            ORDER BY id DESC LIMIT ? OFFSET ?
-            ''', (search, search, search, search, per_page, offset))
+            SELECT s.* FROM students_fts f
+            JOIN students s ON s.id = f.rowid
+            WHERE students_fts MATCH ?
+            ORDER BY f.rank, s.id DESC LIMIT ? OFFSET ?
+            ''', (search, per_page, offset))
             
             students = [dict(row) for row in cursor.fetchall()]
             
             # Get total matching records
-            cursor.execute('''
-            SELECT COUNT(*) FROM students 
-            WHERE student_id LIKE ? OR name LIKE ? OR email LIKE ? OR course LIKE ?
-            ''', (search, search, search, search))
+            cursor.execute('SELECT COUNT(*) FROM students_fts WHERE students_fts MATCH ?', (search,))
+        elif query:
+            # Nothing searchable in the query (punctuation only), so nothing matches
+            students = []
+            cursor.execute('SELECT 0')
         else:
             cursor.execute('SELECT * FROM students ORDER BY id DESC LIMIT ? OFFSET ?', 
                           (per_page, offset))
@@ -240,10 +546,13 @@ class DatabaseService:
         return True
     
     def delete_student(self, student_id):
-        """Delete a student from the database"""
+        """Delete a student and their face and voice data"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Foreign keys aren't enforced on these connections, so cascade by hand
+        cursor.execute('DELETE FROM face_encodings WHERE student_id = ?', (student_id,))
+        cursor.execute('DELETE FROM voice_embeddings WHERE student_id = ?', (student_id,))
         cursor.execute('DELETE FROM students WHERE id = ?', (student_id,))
         
         conn.commit()
@@ -283,17 +592,15 @@ class DatabaseService:
         
         return True
     
-    def get_face_encodings(self):
-        """Get all face encodings"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT student_id, encoding_data FROM face_encodings')
-        encodings = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return encodings
+    def get_face_encodings(self, on_page=None, progress=None):
+        """Get all face encodings
+        
+        Args:
+            on_page: Optional callback receiving each page of rows as it is read;
+                pages are then not collected and the row count is returned
+            progress: Optional callback receiving (rows_loaded, total_rows)
+        """
+        return self.fetch_all_pages('face_encodings', 'student_id, encoding_data', on_page, progress)
     
     def delete_face_encoding(self, student_id):
         """Delete a face encoding for a student"""
@@ -339,29 +646,55 @@ class DatabaseService:
         
         return True
     
-    def get_voice_embeddings(self):
-        """Get all voice embeddings"""
+    def get_voice_embeddings(self, on_page=None, progress=None):
+        """Get all voice embeddings
+        
+        Args:
+            on_page: Optional callback receiving each page of rows as it is read;
+                pages are then not collected and the row count is returned
+            progress: Optional callback receiving (rows_loaded, total_rows)
+        """
+        return self.fetch_all_pages('voice_embeddings', 'student_id, embedding_data', on_page, progress)
+    
+    def delete_voice_embedding(self, student_id):
+        """Delete a voice embedding for a student"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT student_id, embedding_data FROM voice_embeddings')
-        embeddings = [dict(row) for row in cursor.fetchall()]
+        cursor.execute('DELETE FROM voice_embeddings WHERE student_id = ?', (student_id,))
         
+        conn.commit()
         conn.close()
         
-        return embeddings
+        return True
     
-    def delete_voice_embedding(self, student_id):
-        """Delete a voice embedding for a student"""
+    def fetch_all_pages(self, table, columns, on_page=None, progress=None):
+        """Read a whole table in EMBEDDING_PAGE_SIZE pages"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('DELETE FROM voice_embeddings WHERE student_id = ?', (student_id,))
+        total = cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] if progress else 0
+        
+        cursor.execute(f'SELECT {columns} FROM {table}')
+        rows = []
+        loaded = 0
+        
+        while True:
+            page = [dict(row) for row in cursor.fetchmany(EMBEDDING_PAGE_SIZE)]
+            if not page:
+                break
+            
+            loaded += len(page)
+            if on_page:
+                on_page(page)
+            else:
+                rows.extend(page)
+            if progress:
+                progress(loaded, max(total, loaded))
         
-        conn.commit()
         conn.close()
         
-        return True
+        return loaded if on_page else rows
     
     #-----------------------------------------
     # Session Methods
@@ -403,6 +736,53 @@ class DatabaseService:
         
         return sessions
     
+    def get_sessions_with_counts(self, start_date=None, end_date=None, page=None, per_page=None):
+        """Get sessions with their attendance counts in one query
+        
+        Counts come from the maintained attendance_session_stats table. Returns
+        (sessions, total); pass page and per_page to get one page of sessions.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        filters = ''
+        params = []
+        
+        # Add date filters
+        if start_date:
+            filters += " AND ses.date >= ?"
+            params.append(start_date)
+        
+        if end_date:
+            filters += " AND ses.date <= ?"
+            params.append(end_date)
+        
+        query = '''
+        SELECT ses.*, COALESCE(st.count, 0) as attendance_count
+        FROM sessions ses
+        LEFT JOIN attendance_session_stats st ON st.session_id = ses.id
+        WHERE 1=1
+        ''' + filters + " ORDER BY ses.date DESC, ses.id DESC"
+        query_params = list(params)
+        
+        # Add pagination
+        if page and per_page:
+            query += " LIMIT ? OFFSET ?"
+            query_params.extend([per_page, (page - 1) * per_page])
+        
+        cursor.execute(query, query_params)
+        sessions = [dict(row) for row in cursor.fetchall()]
+        
+        if page and per_page:
+            cursor.execute('SELECT COUNT(*) FROM sessions ses WHERE 1=1' + filters, params)
+            total = cursor.fetchone()[0]
+        else:
+            total = len(sessions)
+        
+        conn.close()
+        
+        return sessions, total
+    
     def get_session_by_id(self, session_id):
         """Get a session by ID"""
         conn = self.get_connection()
@@ -416,10 +796,25 @@ class DatabaseService:
         return dict(session) if session else None
     
     def delete_session(self, session_id):
-        """Delete a session and its attendance records"""
+        """Delete a session and its attendance records, in its term's archive if it was archived"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Attach the archive before the first write opens a transaction
+        term = self.attach_session_term(cursor, session_id)
+        if term is not None:
+            # No trigger sees archived rows; take them out of the monthly summary here
+            cursor.execute(f'''
+            UPDATE attendance_student_monthly SET count = count - (
+                SELECT COUNT(*) FROM {term}.attendance a
+                WHERE a.session_id = ? AND a.student_id = attendance_student_monthly.student_id
+            )
+            WHERE month = COALESCE(substr((SELECT date FROM sessions WHERE id = ?), 1, 7), '')
+            AND student_id IN (SELECT student_id FROM {term}.attendance WHERE session_id = ?)
+            ''', (session_id, session_id, session_id))
+            cursor.execute('DELETE FROM attendance_student_monthly WHERE count <= 0')
+            cursor.execute(f'DELETE FROM {term}.attendance WHERE session_id = ?', (session_id,))
+        
         # Delete attendance records for this session
         cursor.execute('DELETE FROM attendance WHERE session_id = ?', (session_id,))
         
@@ -436,7 +831,8 @@ class DatabaseService:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) FROM attendance WHERE session_id = ?', (session_id,))
+        source, source_params = self.get_attendance_source(cursor, session_id=session_id)
+        cursor.execute(f'SELECT COUNT(*) FROM {source} a WHERE session_id = ?', source_params + [session_id])
         count = cursor.fetchone()[0]
         
         conn.close()
@@ -449,40 +845,53 @@ class DatabaseService:
     
     def add_attendance(self, attendance_data):
         """Add a new attendance record"""
+        return self.add_attendance_batch([attendance_data])[0]
+    
+    def add_attendance_batch(self, records):
+        """Add several attendance records in one transaction
+        
+        Returns:
+            The inserted attendance IDs, in the order of `records`
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Insert attendance
-        cursor.execute('''
-        INSERT INTO attendance (student_id, session_id, timestamp, status)
-        VALUES (?, ?, ?, ?)
-        ''', (
-            attendance_data['student_id'],
-            attendance_data['session_id'],
-            attendance_data['timestamp'],
-            attendance_data['status']
-        ))
+        # Acknowledged records must survive a power loss
+        cursor.execute('PRAGMA synchronous=FULL')
         
-        # Get the inserted attendance ID
-        attendance_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
+        attendance_ids = []
+        try:
+            for attendance_data in records:
+                cursor.execute('''
+                INSERT INTO attendance (student_id, session_id, timestamp, status)
+                VALUES (?, ?, ?, ?)
+                ''', (
+                    attendance_data['student_id'],
+                    attendance_data['session_id'],
+                    attendance_data['timestamp'],
+                    attendance_data['status']
+                ))
+                attendance_ids.append(cursor.lastrowid)
+            
+            conn.commit()
+        finally:
+            conn.close()
         
-        return attendance_id
+        return attendance_ids
     
     def get_attendance_by_session(self, session_id):
         """Get attendance records for a session"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-        SELECT a.*, s.name as student_name, s.student_id as student_id 
-        FROM attendance a 
+        source, source_params = self.get_attendance_source(cursor, session_id=session_id)
+        cursor.execute(f'''
+        SELECT a.*, s.name, s.name as student_name, s.student_id as student_code, s.email 
+        FROM {source} a 
         JOIN students s ON a.student_id = s.id 
         WHERE a.session_id = ? 
         ORDER BY a.timestamp DESC
-        ''', (session_id,))
+        ''', source_params + [session_id])
         
         attendance = [dict(row) for row in cursor.fetchall()]
         
@@ -506,155 +915,305 @@ class DatabaseService:
         
         return dict(attendance) if attendance else None
     
-    def get_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None):
-        """Get attendance data for reports with filters"""
+    def get_attendance_version(self):
+        """Get a stamp that changes with any change to attendance, students or sessions"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = '''
-        SELECT 
-            a.id, a.timestamp, a.status,
-            s.id as student_id, s.name as student_name, s.student_id as student_id_external,
-            ses.id as session_id, ses.name as session_name, ses.date
-        FROM attendance a
-        JOIN students s ON a.student_id = s.id
-        JOIN sessions ses ON a.session_id = ses.id
-        WHERE 1=1
-        '''
+        cursor.execute('SELECT token, counter FROM report_version WHERE id = 1')
+        row = cursor.fetchone()
         
+        conn.close()
+        
+        return f"{row['token']}:{row['counter']}"
+    
+    def build_attendance_filters(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Build the WHERE clause and params shared by the attendance report queries"""
+        clause = ''
         params = []
         
         # Add date filters
         if start_date:
-            query += " AND ses.date >= ?"
+            clause += " AND ses.date >= ?"
             params.append(start_date)
         
         if end_date:
-            query += " AND ses.date <= ?"
+            clause += " AND ses.date <= ?"
             params.append(end_date)
         
         # Add session filter
         if session_id:
-            query += " AND a.session_id = ?"
+            clause += " AND a.session_id = ?"
             params.append(session_id)
         
         # Add student filter
         if student_id:
-            query += " AND a.student_id = ?"
+            clause += " AND a.student_id = ?"
             params.append(student_id)
         
-        # Add ordering
-        query += " ORDER BY ses.date DESC, ses.name, a.timestamp"
+        # Add course (roster) filter; callers must join students as s
+        if course:
+            clause += " AND s.course = ?"
+            params.append(course)
         
-        cursor.execute(query, params)
-        attendance_data = []
-        
-        for row in cursor.fetchall():
-            attendance_data.append({
-                'id': row['id'],
-                'timestamp': row['timestamp'],
-                'status': row['status'],
-                'student_id': row['student_id_external'],
-                'student_name': row['student_name'],
-                'session_id': row['session_id'],
-                'session_name': row['session_name'],
-                'date': row['date']
-            })
+        return clause, params
+    
+    def get_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get attendance data for reports with filters"""
+        attendance_data = list(self.iter_attendance_report(start_date, end_date, session_id, student_id, course))
         
         # Calculate statistics
-        stats_query = '''
-        SELECT 
-            COUNT(DISTINCT a.session_id) as total_sessions,
-            COUNT(DISTINCT a.student_id) as total_students,
-            COUNT(*) as total_records
-        FROM attendance a
-        JOIN sessions ses ON a.session_id = ses.id
-        WHERE 1=1
-        '''
+        stats = self.get_attendance_stats(start_date, end_date, session_id, student_id, course)
         
-        # Add the same filters
-        if start_date:
-            stats_query += " AND ses.date >= ?"
-        
-        if end_date:
-            stats_query += " AND ses.date <= ?"
+        return attendance_data, stats
+    
+    def iter_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None,
+                               chunk_size=REPORT_CHUNK_SIZE):
+        """Yield attendance report rows, fetching at most chunk_size rows from the cursor at a time"""
+        conn = self.get_connection()
         
-        if session_id:
-            stats_query += " AND a.session_id = ?"
+        try:
+            cursor = conn.cursor()
+            
+            source, source_params = self.get_attendance_source(cursor, start_date, end_date, session_id)
+            query = f'''
+            SELECT 
+                a.id, a.timestamp, a.status,
+                s.id as student_id, s.name as student_name, s.student_id as student_id_external,
+                ses.id as session_id, ses.name as session_name, ses.date
+            FROM {source} a
+            JOIN students s ON a.student_id = s.id
+            JOIN sessions ses ON a.session_id = ses.id
+            WHERE 1=1
+            '''
+            
+            filters, params = self.build_attendance_filters(start_date, end_date, session_id, student_id, course)
+            query += filters
+            
+            # Add ordering
+            query += " ORDER BY ses.date DESC, ses.name, a.timestamp"
+            
+            cursor.execute(query, source_params + params)
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                
+                for row in rows:
+                    yield {
+                        'id': row['id'],
+                        'timestamp': row['timestamp'],
+                        'status': row['status'],
+                        'student_id': row['student_id_external'],
+                        'student_name': row['student_name'],
+                        'session_id': row['session_id'],
+                        'session_name': row['session_name'],
+                        'date': row['date']
+                    }
+        finally:
+            conn.close()
+    
+    def get_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get summary statistics for an attendance report
         
-        if student_id:
-            stats_query += " AND a.student_id = ?"
+        The attendance rate is measured against the active roster: every active
+        student, or only those in `course` when a course is given.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        cursor.execute(stats_query, params)
-        stats_row = cursor.fetchone()
+        if student_id or course:
+            # A single student's or course's history is small and indexed, so count it directly
+            source, source_params = self.get_attendance_source(cursor, start_date, end_date, session_id)
+            filters, params = self.build_attendance_filters(start_date, end_date, session_id, student_id, course)
+            student_join = "JOIN students s ON a.student_id = s.id" if course else ""
+            cursor.execute(f'''
+            SELECT 
+                COUNT(DISTINCT a.session_id) as total_sessions,
+                COUNT(DISTINCT a.student_id) as total_students,
+                COUNT(*) as total_records
+            FROM {source} a
+            JOIN sessions ses ON a.session_id = ses.id
+            {student_join}
+            WHERE 1=1
+            ''' + filters, source_params + params)
+            stats_row = dict(cursor.fetchone())
+        else:
+            stats_row = self.get_aggregate_stats(cursor, start_date, end_date, session_id)
         
         # Calculate attendance rate if we have sessions and students
         attendance_rate = 0
         if stats_row['total_sessions'] > 0 and stats_row['total_students'] > 0:
-            # Get total possible attendance (students * sessions)
-            cursor.execute('''
-            SELECT 
-                COUNT(DISTINCT s.id) as total_students,
-                COUNT(DISTINCT ses.id) as total_sessions
-            FROM students s
-            CROSS JOIN sessions ses
-            WHERE s.status = 'active'
-            ''')
-            
-            totals = cursor.fetchone()
-            possible_attendance = totals['total_students'] * stats_row['total_sessions']
+            # Total possible attendance is roster size * sessions held
+            roster_size = self.get_roster_size(cursor, course)
+            possible_attendance = roster_size * stats_row['total_sessions']
             
             if possible_attendance > 0:
                 attendance_rate = round((stats_row['total_records'] / possible_attendance) * 100)
         
-        stats = {
+        conn.close()
+        
+        return {
             'total_sessions': stats_row['total_sessions'],
             'total_students': stats_row['total_students'],
             'total_records': stats_row['total_records'],
             'attendance_rate': attendance_rate
         }
-        
-        conn.close()
-        
-        return attendance_data, stats
     
-    def get_daily_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None):
-        """Get daily attendance stats for charts"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    @staticmethod
+    def get_roster_size(cursor, course=None):
+        """Count the active students an attendance rate is measured against"""
+        if course:
+            cursor.execute("SELECT COUNT(*) FROM students WHERE status = 'active' AND course = ?", (course,))
+        else:
+            cursor.execute("SELECT COUNT(*) FROM students WHERE status = 'active'")
         
-        query = '''
+        return cursor.fetchone()[0]
+    
+    def get_aggregate_stats(self, cursor, start_date=None, end_date=None, session_id=None):
+        """Read report totals from the maintained attendance summary tables"""
+        filters, params = self.build_session_stats_filters(start_date, end_date, session_id)
+        cursor.execute('''
         SELECT 
-            ses.date, 
-            COUNT(*) as count
-        FROM attendance a
+            COUNT(*) as total_sessions,
+            COALESCE(SUM(count), 0) as total_records
+        FROM attendance_session_stats
+        WHERE count > 0
+        ''' + filters, params)
+        stats_row = dict(cursor.fetchone())
+        
+        if session_id:
+            # One session's rows are few; de-duplicate its students directly
+            stats_row['total_students'] = self.scan_range_students(cursor, start_date, end_date, session_id)
+        else:
+            stats_row['total_students'] = self.count_range_students(cursor, start_date, end_date)
+        
+        return stats_row
+        
+    def count_range_students(self, cursor, start_date=None, end_date=None):
+        """Count the distinct students with attendance in a date range
+        
+        Whole months come from the monthly summary; only the partial months
+        at either end of the range are read row by row. Ranges that are not
+        plain dates are scanned in full.
+        """
+        try:
+            first = date.fromisoformat(start_date) if start_date else None
+            last = date.fromisoformat(end_date) if end_date else None
+        except ValueError:
+            return self.scan_range_students(cursor, start_date, end_date)
+        
+        def month_end(day):
+            return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        
+        # Partial months at the ends of the range, and the whole months between
+        edges = []
+        whole_from = whole_to = None
+        if first:
+            if first.day != 1:
+                edges.append((first, min(month_end(first), last) if last else month_end(first)))
+                whole_from = (month_end(first) + timedelta(days=1)).strftime('%Y-%m')
+            else:
+                whole_from = first.strftime('%Y-%m')
+        if last:
+            if last != month_end(last):
+                edge_start = max(last.replace(day=1), first) if first else last.replace(day=1)
+                if not edges or edge_start > edges[0][1]:
+                    edges.append((edge_start, last))
+                whole_to = (last.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+            else:
+                whole_to = last.strftime('%Y-%m')
+        
+        parts = []
+        params = []
+        for edge_start, edge_end in edges:
+            source, source_params = self.get_attendance_source(cursor, edge_start.isoformat(), edge_end.isoformat())
+            parts.append(f'''
+            SELECT a.student_id FROM {source} a
+            JOIN sessions ses ON a.session_id = ses.id
+            WHERE ses.date >= ? AND ses.date <= ?
+            ''')
+            params += source_params + [edge_start.isoformat(), edge_end.isoformat()]
+        
+        if not (whole_from and whole_to and whole_from > whole_to):
+            query = 'SELECT student_id FROM attendance_student_monthly WHERE count > 0'
+            if first or last:
+                # Sessions without a date are outside every range
+                query += " AND month != ''"
+            if whole_from:
+                query += ' AND month >= ?'
+                params.append(whole_from)
+            if whole_to:
+                query += ' AND month <= ?'
+                params.append(whole_to)
+            parts.append(query)
+        
+        if not parts:
+            return 0
+        
+        cursor.execute('SELECT COUNT(DISTINCT student_id) FROM (' + ' UNION ALL '.join(parts) + ')', params)
+        return cursor.fetchone()[0]
+        
+    def scan_range_students(self, cursor, start_date=None, end_date=None, session_id=None):
+        """Count the distinct students with attendance in a date range from the raw rows"""
+        source, source_params = self.get_attendance_source(cursor, start_date, end_date, session_id)
+        filters, params = self.build_attendance_filters(start_date, end_date, session_id)
+        cursor.execute(f'''
+        SELECT COUNT(DISTINCT a.student_id)
+        FROM {source} a
         JOIN sessions ses ON a.session_id = ses.id
         WHERE 1=1
-        '''
-        
+        ''' + filters, source_params + params)
+        return cursor.fetchone()[0]
+    
+    @staticmethod
+    def build_session_stats_filters(start_date=None, end_date=None, session_id=None):
+        """Build the WHERE clause and params for attendance_session_stats"""
+        clause = ''
         params = []
         
-        # Add date filters
         if start_date:
-            query += " AND ses.date >= ?"
+            clause += " AND date >= ?"
             params.append(start_date)
         
         if end_date:
-            query += " AND ses.date <= ?"
+            clause += " AND date <= ?"
             params.append(end_date)
         
-        # Add session filter
         if session_id:
-            query += " AND a.session_id = ?"
+            clause += " AND session_id = ?"
             params.append(session_id)
         
-        # Add student filter
-        if student_id:
-            query += " AND a.student_id = ?"
-            params.append(student_id)
+        return clause, params
+    
+    def get_daily_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get daily attendance stats for charts"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        # Group by date
-        query += " GROUP BY ses.date ORDER BY ses.date"
+        if student_id or course:
+            # Per-student and per-course charts are small and indexed, so count the raw rows
+            source, source_params = self.get_attendance_source(cursor, start_date, end_date, session_id)
+            filters, params = self.build_attendance_filters(start_date, end_date, session_id, student_id, course)
+            params = source_params + params
+            student_join = "JOIN students s ON a.student_id = s.id" if course else ""
+            query = f'''
+            SELECT 
+                ses.date, 
+                COUNT(*) as count
+            FROM {source} a
+            JOIN sessions ses ON a.session_id = ses.id
+            {student_join}
+            WHERE 1=1
+            ''' + filters + " GROUP BY ses.date ORDER BY ses.date"
+        else:
+            filters, params = self.build_session_stats_filters(start_date, end_date, session_id)
+            query = '''
+            SELECT date, SUM(count) as count
+            FROM attendance_session_stats
+            WHERE count > 0
+            ''' + filters + " GROUP BY date ORDER BY date"
         
         cursor.execute(query, params)
         daily_stats = [dict(row) for row in cursor.fetchall()]
@@ -664,33 +1223,259 @@ class DatabaseService:
         return daily_stats
     
     #-----------------------------------------
-    # Settings Methods
+    # Term Archive Methods
     #-----------------------------------------
     
-    def save_settings(self, settings_data):
-        """Save system settings"""
+    def get_attendance_source(self, cursor, start_date=None, end_date=None, session_id=None):
+        """Get the attendance table expression covering a date range
+        
+        Archived terms that overlap the range (or hold the session) are
+        attached to the cursor's connection and combined with the live table
+        by UNION ALL; past ARCHIVE_ATTACH_LIMIT terms, their rows are copied
+        into a temporary table instead. A range within the current term reads
+        the live table alone. Returns (source, params), with params preceding
+        the caller's.
+        """
+        if session_id and not start_date and not end_date:
+            # A session's attendance lives in the term holding its date
+            cursor.execute('SELECT date FROM sessions WHERE id = ?', (session_id,))
+            row = cursor.fetchone()
+            if not row or not row['date']:
+                return 'attendance', []
+            start_date = end_date = row['date']
+        
+        query = 'SELECT id, name, file FROM archived_terms WHERE 1=1'
+        params = []
+        if start_date:
+            query += ' AND end_date >= ?'
+            params.append(start_date)
+        if end_date:
+            query += ' AND start_date <= ?'
+            params.append(end_date)
+        cursor.execute(query + ' ORDER BY start_date', params)
+        terms = cursor.fetchall()
+        
+        if not terms:
+            return 'attendance', []
+        
+        # Restrict every branch to the range's sessions so only their rows are read
+        session_filter = ''
+        range_params = [value for value in (start_date, end_date) if value]
+        if start_date or end_date:
+            session_filter = ' WHERE session_id IN (SELECT id FROM main.sessions WHERE 1=1'
+            if start_date:
+                session_filter += ' AND date >= ?'
+            if end_date:
+                session_filter += ' AND date <= ?'
+            session_filter += ')'
+        
+        branches = [f'SELECT {ARCHIVE_COLUMNS} FROM main.attendance' + session_filter]
+        params = list(range_params)
+        if len(terms) <= ARCHIVE_ATTACH_LIMIT:
+            self.attach_terms(cursor, terms)
+            for term in terms:
+                branches.append(f"SELECT {ARCHIVE_COLUMNS} FROM term_{term['id']}.attendance" + session_filter)
+                params.extend(range_params)
+        else:
+            # More terms than can be attached at once are read a page at a time into a temporary table
+            self.collect_archived_attendance(cursor, terms, session_filter, range_params)
+            branches.append(f'SELECT {ARCHIVE_COLUMNS} FROM temp.archived_attendance')
+        
+        return '(' + ' UNION ALL '.join(branches) + ')', params
+        
+    @staticmethod
+    def attach_terms(cursor, terms):
+        """Attach the archives of terms not yet attached to the cursor's connection, as term_<id>"""
+        cursor.execute('PRAGMA database_list')
+        attached = [row['name'] for row in cursor.fetchall()]
+        
+        for term in terms:
+            if f"term_{term['id']}" not in attached:
+                cursor.execute(f"ATTACH DATABASE ? AS term_{term['id']}", (term['file'],))
+        
+    @staticmethod
+    def detach_terms(cursor):
+        """Detach every term archive from the cursor's connection"""
+        cursor.execute('PRAGMA database_list')
+        for name in [row['name'] for row in cursor.fetchall() if row['name'].startswith('term_')]:
+            cursor.execute(f'DETACH DATABASE {name}')
+        
+    def collect_archived_attendance(self, cursor, terms, session_filter, range_params):
+        """Copy the archived rows of any number of terms into temp.archived_attendance
+        
+        Terms are attached ARCHIVE_ATTACH_LIMIT at a time. Each page is
+        committed so its archives can be detached before the next is attached.
+        """
+        cursor.execute('DROP TABLE IF EXISTS temp.archived_attendance')
+        cursor.execute(f'CREATE TEMP TABLE archived_attendance AS SELECT {ARCHIVE_COLUMNS} FROM main.attendance WHERE 0')
+        self.detach_terms(cursor)
+        
+        for start in range(0, len(terms), ARCHIVE_ATTACH_LIMIT):
+            page = terms[start:start + ARCHIVE_ATTACH_LIMIT]
+            self.attach_terms(cursor, page)
+            for term in page:
+                cursor.execute(f'''
+                INSERT INTO temp.archived_attendance ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM term_{term['id']}.attendance
+                ''' + session_filter, range_params)
+            cursor.connection.commit()
+            self.detach_terms(cursor)
+        
+    def attach_session_term(self, cursor, session_id):
+        """Attach the archived term holding a session, returning its schema name, or None if the session is live"""
+        cursor.execute('''
+        SELECT t.id, t.file FROM archived_terms t
+        JOIN sessions ses ON ses.date >= t.start_date AND ses.date <= t.end_date
+        WHERE ses.id = ?
+        ''', (session_id,))
+        term = cursor.fetchone()
+        if term is None:
+            return None
+        
+        self.attach_terms(cursor, [term])
+        return f"term_{term['id']}"
+        
+    def get_archived_terms(self):
+        """Get the archived terms, oldest first"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        # Check if settings already exist
-        cursor.execute('SELECT id FROM settings WHERE id = 1')
-        existing = cursor.fetchone()
+        cursor.execute('SELECT * FROM archived_terms ORDER BY start_date')
+        terms = [dict(row) for row in cursor.fetchall()]
+        
+        conn.close()
         
-        settings_json = json.dumps(settings_data)
+        return terms
+    
+    def rotate_term(self, name, start_date, end_date, archive_dir=None):
+        """Move a closed term's attendance into its own archive database
+        
+        Attendance for sessions dated from start_date to end_date is copied
+        into a per-term SQLite file, then deleted from the live table in one
+        transaction that also registers the term. The summary tables keep
+        counting archived rows, so aggregate reports never open the archives;
+        row-level reports attach them through get_attendance_source.
+        
+        Args:
+            name: Term name, e.g. '2024-spring'
+            start_date: First session date of the term (YYYY-MM-DD)
+            end_date: Last session date of the term; must be in the past
+            archive_dir: Directory for the archive file; defaults to an
+                'archive' directory next to the database
+        
+        Returns:
+            The archived term
+        """
+        if date.fromisoformat(start_date) > date.fromisoformat(end_date):
+            raise ValueError("Term start date is after its end date")
+        if date.fromisoformat(end_date) >= date.today():
+            raise ValueError("Only terms that have ended can be archived")
+        
+        archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(self.db_file)), 'archive')
+        os.makedirs(archive_dir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(self.db_file))[0]
+        archive_file = os.path.abspath(os.path.join(archive_dir, f"{base}-{re.sub(r'[^A-Za-z0-9_-]+', '-', name)}.db"))
         
-        if existing:
-            # Update existing settings
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
             cursor.execute('''
-            UPDATE settings 
-            SET settings_data = ?, updated_at = ?
-            WHERE id = 1
-            ''', (settings_json, datetime.now().isoformat()))
-        else:
-            # Insert new settings
+            SELECT name FROM archived_terms
+            WHERE name = ? OR file = ? OR (start_date <= ? AND end_date >= ?)
+            ''', (name, archive_file, end_date, start_date))
+            existing = cursor.fetchone()
+            if existing:
+                raise ValueError(f"Term overlaps archived term '{existing['name']}'")
+            
+            # A file left by an interrupted rotation was never registered; start over
+            if os.path.exists(archive_file):
+                os.remove(archive_file)
+            
+            # First copy the rows into the archive and commit it on its own
+            cursor.execute('ATTACH DATABASE ? AS term', (archive_file,))
+            
+            # The archive table is declared exactly as the live one
+            cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'attendance'")
+            live_schema = cursor.fetchone()['sql']
+            cursor.execute(re.sub(r'^CREATE TABLE (IF NOT EXISTS )?"?attendance"?', 'CREATE TABLE term.attendance', live_schema))
+            cursor.execute(f'''
+            INSERT INTO term.attendance ({ARCHIVE_COLUMNS})
+            SELECT {ARCHIVE_COLUMNS} FROM main.attendance
+            WHERE session_id IN (SELECT id FROM main.sessions WHERE date >= ? AND date <= ?)
+            ''', (start_date, end_date))
+            records = cursor.rowcount
+            cursor.execute('CREATE INDEX term.idx_attendance_session ON attendance (session_id)')
+            cursor.execute('CREATE INDEX term.idx_attendance_student ON attendance (student_id)')
+            conn.commit()
+            
+            # Then delete the live rows and register the term together
             cursor.execute('''
-            INSERT INTO settings (id, settings_data, updated_at)
-            VALUES (1, ?, ?)
-            ''', (settings_json, datetime.now().isoformat()))
+            DELETE FROM main.attendance
+            WHERE session_id IN (SELECT id FROM main.sessions WHERE date >= ? AND date <= ?)
+            ''', (start_date, end_date))
+            if cursor.rowcount != records:
+                raise RuntimeError(f"Archived {records} records but would delete {cursor.rowcount}")
+            
+            # The delete trigger took the archived rows out of the summaries; add them back
+            cursor.execute('''
+            INSERT INTO attendance_session_stats (session_id, date, count)
+            SELECT a.session_id, ses.date, COUNT(*)
+            FROM term.attendance a
+            LEFT JOIN sessions ses ON a.session_id = ses.id
+            GROUP BY a.session_id
+            ON CONFLICT (session_id) DO UPDATE SET count = count + excluded.count
+            ''')
+            cursor.execute('''
+            INSERT INTO attendance_student_monthly (student_id, month, count)
+            SELECT a.student_id, COALESCE(substr(ses.date, 1, 7), ''), COUNT(*)
+            FROM term.attendance a
+            LEFT JOIN sessions ses ON a.session_id = ses.id
+            GROUP BY a.student_id, COALESCE(substr(ses.date, 1, 7), '')
+            ON CONFLICT (month, student_id) DO UPDATE SET count = count + excluded.count
+            ''')
+            
+            cursor.execute('''
+            INSERT INTO archived_terms (name, start_date, end_date, file, records, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (name, start_date, end_date, archive_file, records, datetime.now().isoformat()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return {
+            'name': name,
+            'start_date': start_date,
+            'end_date': end_date,
+            'file': archive_file,
+            'records': records
+        }
+    
+    #-----------------------------------------
+    # Settings Methods
+    #-----------------------------------------
+    
+    def save_settings(self, settings_data):
+        """Save system settings
+        
+        Args:
+            settings_data: Dictionary of setting keys and values; keys not given are left unchanged
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Merge into the stored settings and bump the version in one statement
+        cursor.execute('''
+        INSERT INTO settings (id, settings_data, updated_at, version)
+        VALUES (1, ?, ?, 1)
+        ON CONFLICT (id) DO UPDATE SET
+            settings_data = json_patch(settings.settings_data, excluded.settings_data),
+            updated_at = excluded.updated_at,
+            version = settings.version + 1
+        ''', (json.dumps(settings_data), datetime.now().isoformat()))
         
         conn.commit()
         conn.close()
@@ -698,7 +1483,7 @@ class DatabaseService:
         return True
     
     def get_settings(self):
-        """Get system settings"""
+        """Get system settings as a dictionary, with defaults for missing keys"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
@@ -707,7 +1492,60 @@ class DatabaseService:
         
         conn.close()
         
+        settings = dict(DEFAULT_SETTINGS)
         if row:
-            return json.loads(row['settings_data'])
-        else:
-            return None
+            settings.update(json.loads(row['settings_data']))
+        
+        return settings
+    
+    def get_settings_version(self):
+        """Get the settings version, incremented by every save"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT version FROM settings WHERE id = 1')
+        row = cursor.fetchone()
+        
+        conn.close()
+        
+        return row['version'] if row else 0
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Attendance database maintenance')
+    parser.add_argument('--db', default='attendance.db', help='Path to the SQLite database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init', help='Create or upgrade the database schema')
+    commands.add_parser('rebuild-stats', help='Recompute the attendance summary tables')
+    commands.add_parser('rebuild-search', help='Recompute the student search index')
+    rotate = commands.add_parser('rotate-term', help='Move a closed term into its own archive database')
+    rotate.add_argument('name', help="Term name, e.g. '2024-spring'")
+    rotate.add_argument('start_date', help='First session date of the term (YYYY-MM-DD)')
+    rotate.add_argument('end_date', help='Last session date of the term (YYYY-MM-DD)')
+    rotate.add_argument('--archive-dir', help='Directory for the archive file')
+    commands.add_parser('list-terms', help='List the archived terms')
+    backup = commands.add_parser('backup', help='Take an online, compressed backup while the database is in use')
+    backup.add_argument('--dir', default='data/backups', help='Directory the backups are written to')
+    backup.add_argument('--keep', type=int, default=7, help='Number of backups to keep')
+    args = parser.parse_args()
+    
+    db_service = DatabaseService(args.db)
+    db_service.init_db()
+    
+    if args.command == 'rebuild-stats':
+        db_service.rebuild_attendance_stats()
+    elif args.command == 'rebuild-search':
+        db_service.rebuild_student_search()
+    elif args.command == 'rotate-term':
+        term = db_service.rotate_term(args.name, args.start_date, args.end_date, args.archive_dir)
+        print(f"Archived {term['records']} attendance records for term {term['name']} to {term['file']}")
+    elif args.command == 'list-terms':
+        for term in db_service.get_archived_terms():
+            print(f"{term['name']}: {term['start_date']} to {term['end_date']}, {term['records']} records in {term['file']}")
+    elif args.command == 'backup':
+        from backup_service import BackupService
+        metrics = BackupService(args.db, args.dir, args.keep).create_backup()
+        print(json.dumps(metrics, indent=2))
+    
+    print(f"{args.command}: done")
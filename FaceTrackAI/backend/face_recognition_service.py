@@ -35,19 +35,69 @@ class FaceRecognitionService:
     def load_face_encodings(self):
         """Load face encodings from database"""
         try:
-            # Get face encodings from database
-            encodings = self.db_service.get_face_encodings()
+            # Decode each page into the in-memory cache as it arrives
+            def add_page(rows):
+                for encoding in rows:
+                    self.face_encodings_db[encoding['student_id']] = json.loads(encoding['encoding_data'])
             
-            # Add to in-memory cache
-            for encoding in encodings:
-                student_id = encoding['student_id']
-                self.face_encodings_db[student_id] = json.loads(encoding['encoding_data'])
+            def report_progress(loaded, total):
+                if loaded == total or loaded % 10000 < 1000:
+                    print(f"Loaded {loaded}/{total} face encodings")
+            
+            self.db_service.get_face_encodings(on_page=add_page, progress=report_progress)
             
             return True
         except Exception as e:
             print(f"Error loading face encodings: {e}")
             return False
     
+    def embed_face_image(self, base64_image):
+        """
+        Decode a face image and extract its embedding without saving either
+        
+        Args:
+            base64_image: Base64 encoded image string
+            
+        Returns:
+            (embedding, image): face embedding as list and the decoded image
+        """
+        # Convert base64 to image, decoding the pixels now rather than on save
+        img_data = base64.b64decode(base64_image)
+        img = Image.open(io.BytesIO(img_data))
+        img.load()
+        
+        # Create a simple mock embedding (128-dimensional vector)
+        # In the real implementation, this would be a face embedding from a neural network
+        embedding = [0.01 * i for i in range(128)]
+        
+        return embedding, img
+    
+    def add_face(self, student_id, embedding, img):
+        """
+        Save a student's face image and cache an embedding already saved in the database
+        
+        Args:
+            student_id: Student ID to associate with the face
+            embedding: Face embedding as list
+            img: Decoded face image
+        """
+        # Save face image
+        face_img_path = os.path.join(self.face_db_dir, f"{student_id}.jpg")
+        img.save(face_img_path)
+        
+        # Add to in-memory cache
+        self.face_encodings_db[student_id] = embedding
+    
+    def apply_remote_changes(self, table, rows, deleted):
+        """Update the in-memory cache with changes pulled from another kiosk's writes"""
+        if table == 'face_encodings':
+            for encoding in rows:
+                self.face_encodings_db[encoding['student_id']] = json.loads(encoding['encoding_data'])
+        
+        if table in ('face_encodings', 'students'):
+            for student_id in deleted:
+                self.face_encodings_db.pop(student_id, None)
+    
     def process_face_image(self, base64_image, student_id):
         """
         Process a face image, extract embedding and save it
@@ -60,23 +110,13 @@ class FaceRecognitionService:
             Face embedding as list
         """
         try:
-            # Create a simple mock embedding (128-dimensional vector)
-            # In the real implementation, this would be a face embedding from a neural network
-            embedding = [0.01 * i for i in range(128)]
-            
-            # Convert base64 to image and save it
-            img_data = base64.b64decode(base64_image)
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Save face image
-            face_img_path = os.path.join(self.face_db_dir, f"{student_id}.jpg")
-            img.save(face_img_path)
+            embedding, img = self.embed_face_image(base64_image)
             
             # Save embedding to database
             self.db_service.save_face_encoding(student_id, json.dumps(embedding))
             
-            # Add to in-memory cache
-            self.face_encodings_db[student_id] = embedding
+            # Save face image and add to in-memory cache
+            self.add_face(student_id, embedding, img)
             
             print(f"Simplified face image processing for student {student_id}")
             return embedding
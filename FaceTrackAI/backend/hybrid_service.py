@@ -0,0 +1,830 @@
+import json
+import uuid
+import time
+import threading
+from datetime import datetime, timedelta
+from storage_backend import StorageBackend
+
+# Tables mirrored from Supabase into the local replica, in dependency order
+PULL_TABLES = ['students', 'sessions', 'attendance', 'face_encodings', 'voice_embeddings']
+
+# Mirrored tables keyed locally by student rather than by the remote row id
+EMBEDDING_TABLES = ['face_encodings', 'voice_embeddings']
+
+# Rows requested per page when pulling from Supabase
+PULL_BATCH_SIZE = 500
+
+# Queued writes sent to Supabase per upsert
+PUSH_BATCH_SIZE = 100
+
+# Seconds between background sync rounds
+SYNC_INTERVAL = 5.0
+
+# Seconds each incremental pull re-reads before its watermark, so rows whose
+# transactions committed out of order are not skipped
+PULL_OVERLAP = 60.0
+
+# Seconds between full pulls that re-read every table and drop rows deleted remotely
+FULL_SYNC_INTERVAL = 600.0
+
+# Idempotency key the outbox upserts on, and the change tracking pulls read:
+# an updated_at stamp on every mirrored table and a tombstone per deleted row.
+# Apply once in Supabase before enabling the replica.
+REMOTE_SCHEMA_SQL = """
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS client_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS attendance_client_key ON attendance (client_key);
+
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id bigserial PRIMARY KEY,
+    table_name text NOT NULL,
+    row_id bigint NOT NULL,
+    student_id bigint,
+    deleted_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION sync_touch() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END $$;
+
+CREATE OR REPLACE FUNCTION sync_tombstone() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO sync_tombstones (table_name, row_id, student_id)
+    VALUES (TG_TABLE_NAME, OLD.id, CASE WHEN TG_TABLE_NAME IN ('face_encodings', 'voice_embeddings')
+                                        THEN (to_jsonb(OLD) ->> 'student_id')::bigint END);
+    RETURN OLD;
+END $$;
+
+DO $$
+DECLARE t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['students', 'sessions', 'attendance', 'face_encodings', 'voice_embeddings'] LOOP
+        EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT clock_timestamp()', t);
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (updated_at, id)', t || '_updated_at', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS sync_touch ON %I', t);
+        EXECUTE format('CREATE TRIGGER sync_touch BEFORE INSERT OR UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION sync_touch()', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS sync_tombstone ON %I', t);
+        EXECUTE format('CREATE TRIGGER sync_tombstone AFTER DELETE ON %I FOR EACH ROW EXECUTE FUNCTION sync_tombstone()', t);
+    END LOOP;
+END $$;
+"""
+
+# Postgres unique_violation, reported when another kiosk already marked the same attendance
+UNIQUE_VIOLATION = '23505'
+
+# Postgres foreign_key_violation, reported when the student or session was deleted upstream
+FOREIGN_KEY_VIOLATION = '23503'
+
+def parse_stamp(stamp):
+    """Parse an updated_at stamp as returned by PostgREST"""
+    return datetime.fromisoformat(stamp.replace('Z', '+00:00'))
+
+def change_key(row):
+    """Order of a pulled row among the changes to its table"""
+    return parse_stamp(row['updated_at']), row['id']
+
+def after_change(row):
+    """PostgREST or-filter for the rows that come after `row` in (updated_at, id) order"""
+    stamp = row['updated_at']
+    return f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",id.gt.{row["id"]})'
+
+class HybridService(StorageBackend):
+    def __init__(self, remote, local, sync_interval=SYNC_INTERVAL):
+        """
+        Initialize the hybrid backend
+
+        Reads are served from `local`, a DatabaseService replica kept fresh
+        by incremental pulls from `remote` (a SupabaseService). Attendance is
+        committed locally with an idempotency key and queued; a background
+        synchronizer drains the queue to Supabase in batches, so check-in keeps
+        working through network outages. Other writes go to Supabase first and
+        are mirrored locally with the ids Supabase assigned.
+
+        Args:
+            remote: SupabaseService used as the source of truth
+            local: DatabaseService holding the replica and the outbox
+            sync_interval: Seconds between background sync rounds
+        """
+        self.remote = remote
+        self.local = local
+        self.sync_interval = sync_interval
+        self.sync_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.sync_lock = threading.Lock()
+        self.sync_thread = None
+        self.last_sync = None
+        self.last_full_sync = None
+        self.last_sync_error = None
+        self.change_listeners = []
+
+        self.local.init_db()
+        self.init_replica()
+
+    def init_replica(self):
+        """Create the sync bookkeeping tables in the local replica"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        # Idempotency key of locally recorded attendance
+        cursor.execute('PRAGMA table_info(attendance)')
+        if 'client_key' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE attendance ADD COLUMN client_key TEXT')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_client_key ON attendance (client_key)')
+
+        # Writes waiting to be sent to Supabase
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            id INTEGER PRIMARY KEY,
+            client_key TEXT NOT NULL UNIQUE,
+            table_name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+        ''')
+
+        # Writes Supabase refused for good, such as attendance for a session deleted upstream
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_dead_letters (
+            id INTEGER PRIMARY KEY,
+            client_key TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at TEXT,
+            failed_at TEXT,
+            error TEXT
+        )
+        ''')
+
+        # How far each table has been pulled: newest updated_at stamp, or highest id of the tombstones
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            table_name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            last_updated TEXT,
+            pulled_at TEXT
+        )
+        ''')
+
+        # Replicas created before pulls were stamped lack last_updated
+        cursor.execute('PRAGMA table_info(sync_state)')
+        if 'last_updated' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE sync_state ADD COLUMN last_updated TEXT')
+
+        conn.commit()
+        conn.close()
+
+    #-----------------------------------------
+    # Background Synchronization
+    #-----------------------------------------
+
+    def start_sync(self):
+        """Start the background synchronizer thread"""
+        if self.sync_thread and self.sync_thread.is_alive():
+            return
+
+        self.stop_event.clear()
+        self.sync_thread = threading.Thread(target=self.sync_loop, name='hybrid-sync', daemon=True)
+        self.sync_thread.start()
+
+    def stop_sync(self, timeout=None):
+        """Stop the background synchronizer, finishing the round in progress"""
+        self.stop_event.set()
+        self.sync_event.set()
+        if self.sync_thread:
+            self.sync_thread.join(timeout)
+
+    def sync_loop(self):
+        """Drain the outbox and pull changes until stopped, re-reading everything every FULL_SYNC_INTERVAL"""
+        last_full = time.monotonic()
+
+        while not self.stop_event.is_set():
+            full = time.monotonic() - last_full >= FULL_SYNC_INTERVAL
+            self.sync_once(full)
+            if full and self.last_sync_error is None:
+                last_full = time.monotonic()
+
+            # Wake early when a local write is queued
+            self.sync_event.wait(self.sync_interval)
+            self.sync_event.clear()
+
+    def sync_once(self, full=False):
+        """Run one push and pull round, recording any error instead of raising"""
+        with self.sync_lock:
+            try:
+                pushed = self.push_pending()
+                pulled = self.pull_changes(full)
+                self.last_sync = datetime.now().isoformat()
+                if full:
+                    self.last_full_sync = self.last_sync
+                self.last_sync_error = None
+                return pushed, pulled
+            except Exception as e:
+                self.last_sync_error = str(e)
+                print(f"Error synchronizing with Supabase: {e}")
+                return 0, 0
+
+    def get_sync_status(self):
+        """Get the state of the synchronizer"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT COUNT(*), MIN(created_at), MAX(attempts) FROM sync_outbox')
+        pending, oldest, attempts = cursor.fetchone()
+        cursor.execute('SELECT COUNT(*) FROM sync_dead_letters')
+        dead_letters = cursor.fetchone()[0]
+
+        conn.close()
+
+        return {
+            'pending': pending,
+            'dead_letters': dead_letters,
+            'oldest_pending': oldest,
+            'max_attempts': attempts or 0,
+            'last_sync': self.last_sync,
+            'last_full_sync': self.last_full_sync,
+            'last_error': self.last_sync_error,
+            'running': bool(self.sync_thread and self.sync_thread.is_alive())
+        }
+
+    def push_pending(self):
+        """Send queued writes to Supabase in batches; returns the number sent"""
+        pushed = 0
+        last_entry = 0
+
+        while True:
+            conn = self.local.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM sync_outbox WHERE id > ? ORDER BY id LIMIT ?', (last_entry, PUSH_BATCH_SIZE))
+            entries = [dict(row) for row in cursor.fetchall()]
+            conn.close()
+
+            if not entries:
+                return pushed
+
+            # Entries that fail stay queued for the next round
+            last_entry = entries[-1]['id']
+
+            try:
+                # The idempotency key makes a resent batch overwrite rather than duplicate
+                payloads = [json.loads(entry['payload']) for entry in entries]
+                result = self.remote.supabase.table('attendance').upsert(payloads, on_conflict='client_key').execute()
+                self.complete_pushed(result.data)
+                pushed += len(entries)
+            except Exception as e:
+                # Retry one at a time so a single conflicting row can't block the batch
+                sent = self.push_individually(entries)
+                pushed += sent
+                if sent == 0:
+                    raise Exception(f"Pushing queued attendance failed: {e}")
+
+    def push_individually(self, entries):
+        """Send queued writes one by one, resolving conflicts; returns the number sent"""
+        sent = 0
+
+        for entry in entries:
+            try:
+                payload = json.loads(entry['payload'])
+                result = self.remote.supabase.table('attendance').upsert(payload, on_conflict='client_key').execute()
+                self.complete_pushed(result.data)
+                sent += 1
+            except Exception as e:
+                if UNIQUE_VIOLATION in str(e) or 'duplicate key' in str(e):
+                    # Someone else already recorded this attendance; theirs wins and is pulled later
+                    self.discard_pending(entry['client_key'])
+                    sent += 1
+                elif FOREIGN_KEY_VIOLATION in str(e) or 'foreign key constraint' in str(e):
+                    # The student or session is gone upstream, so no retry can succeed
+                    self.dead_letter(entry, e)
+                    sent += 1
+                else:
+                    self.record_push_error(entry['client_key'], e)
+
+        return sent
+
+    def complete_pushed(self, rows):
+        """Give local rows their Supabase ids and remove them from the outbox"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        for row in rows:
+            cursor.execute('DELETE FROM attendance WHERE id = ? AND client_key IS NOT ?', (row['id'], row['client_key']))
+            cursor.execute('UPDATE attendance SET id = ? WHERE client_key = ?', (row['id'], row['client_key']))
+            cursor.execute('DELETE FROM sync_outbox WHERE client_key = ?', (row['client_key'],))
+
+        conn.commit()
+        conn.close()
+
+    def discard_pending(self, client_key):
+        """Drop a queued write and its local row after a conflict"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM attendance WHERE client_key = ? AND id < 0', (client_key,))
+        cursor.execute('DELETE FROM sync_outbox WHERE client_key = ?', (client_key,))
+
+        conn.commit()
+        conn.close()
+
+    def dead_letter(self, entry, error):
+        """Move a queued write Supabase will never accept out of the outbox, with its local row"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        INSERT INTO sync_dead_letters (client_key, table_name, payload, created_at, failed_at, error)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (entry['client_key'], entry['table_name'], entry['payload'], entry['created_at'],
+              datetime.now().isoformat(), str(error)))
+        cursor.execute('DELETE FROM attendance WHERE client_key = ? AND id < 0', (entry['client_key'],))
+        cursor.execute('DELETE FROM sync_outbox WHERE client_key = ?', (entry['client_key'],))
+
+        conn.commit()
+        conn.close()
+
+    def record_push_error(self, client_key, error):
+        """Count a failed attempt so it is retried on the next round"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+        UPDATE sync_outbox SET attempts = attempts + 1, last_error = ?
+        WHERE client_key = ?
+        ''', (str(error), client_key))
+
+        conn.commit()
+        conn.close()
+
+    def pull_changes(self, full=False):
+        """Copy rows written in Supabase since the last pull into the replica
+
+        Pulls are incremental by the updated_at stamp that REMOTE_SCHEMA_SQL
+        maintains, so rows edited in place (a re-enrolled face or voice, a
+        renamed or deactivated student) arrive as well as new ones, and rows
+        deleted remotely arrive as tombstones. Pass full=True to re-read every
+        table and drop local rows Supabase no longer has, which also repairs
+        anything an incremental pull missed.
+        """
+        pulled = self.pull_deletions()
+
+        for table in PULL_TABLES:
+            if full:
+                pulled += self.pull_table_full(table)
+            else:
+                pulled += self.pull_table(table)
+
+        return pulled
+
+    def pull_table(self, table):
+        """Copy rows of one table stamped since its watermark; returns the number copied"""
+        stamp = self.get_watermark(table, 'last_updated')
+        lower = None
+        if stamp:
+            # Re-read a margin before the watermark for writes that committed out of order
+            lower = (parse_stamp(stamp) - timedelta(seconds=PULL_OVERLAP)).isoformat()
+
+        pulled = 0
+        last_row = None
+
+        while True:
+            query = self.remote.supabase.table(table).select('*')
+            if last_row is not None:
+                # Pages are keyed by (updated_at, id), so rows sharing a stamp can span any number of pages
+                query = query.or_(after_change(last_row))
+            elif lower:
+                query = query.gte('updated_at', lower)
+            result = query.order('updated_at').order('id').range(0, PULL_BATCH_SIZE - 1).execute()
+            if not result.data:
+                break
+
+            self.mirror_rows(table, result.data)
+            self.notify_changes(table, result.data, [])
+            last_row = result.data[-1]
+            pulled += len(result.data)
+
+            if len(result.data) < PULL_BATCH_SIZE:
+                break
+
+        if last_row is not None:
+            self.set_watermark(table, 'last_updated', last_row['updated_at'])
+
+        return pulled
+
+    def pull_table_full(self, table):
+        """Re-read every row of one table and drop local rows Supabase no longer has"""
+        pulled = 0
+        last_id = 0
+        remote_keys = set()
+        newest = None
+        key_column = 'student_id' if table in EMBEDDING_TABLES else 'id'
+
+        # Rows written after this snapshot may be missing from the pages read, so only these are candidates;
+        # pending attendance has negative ids
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+        if table in EMBEDDING_TABLES:
+            cursor.execute(f'SELECT student_id FROM {table}')
+        else:
+            cursor.execute(f'SELECT id FROM {table} WHERE id > 0')
+        local_keys = [row[0] for row in cursor.fetchall()]
+        conn.close()
+
+        while True:
+            result = self.remote.supabase.table(table).select('*').gt('id', last_id) \
+                .order('id').range(0, PULL_BATCH_SIZE - 1).execute()
+            if not result.data:
+                break
+
+            self.mirror_rows(table, result.data)
+            self.notify_changes(table, result.data, [])
+            remote_keys.update(row[key_column] for row in result.data)
+            page_newest = max(change_key(row) for row in result.data)
+            newest = page_newest if newest is None else max(newest, page_newest)
+            last_id = result.data[-1]['id']
+            pulled += len(result.data)
+
+            if len(result.data) < PULL_BATCH_SIZE:
+                break
+
+        self.remove_rows(table, [key for key in local_keys if key not in remote_keys])
+
+        # Incremental pulls carry on from the newest row read
+        if newest is not None:
+            self.set_watermark(table, 'last_updated', newest[0].isoformat())
+
+        return pulled
+
+    def pull_deletions(self):
+        """Apply the tombstones of rows deleted in Supabase since the last pull"""
+        last_id = self.get_watermark('sync_tombstones')
+        removed = 0
+
+        while True:
+            result = self.remote.supabase.table('sync_tombstones').select('*').gt('id', last_id) \
+                .order('id').range(0, PULL_BATCH_SIZE - 1).execute()
+            if not result.data:
+                break
+
+            deleted = {}
+            for tombstone in result.data:
+                key = 'student_id' if tombstone['table_name'] in EMBEDDING_TABLES else 'row_id'
+                deleted.setdefault(tombstone['table_name'], []).append(tombstone[key])
+
+            for table in PULL_TABLES:
+                if table in deleted:
+                    self.remove_rows(table, deleted[table])
+
+            last_id = result.data[-1]['id']
+            self.set_watermark('sync_tombstones', 'last_id', last_id)
+            removed += len(result.data)
+
+            if len(result.data) < PULL_BATCH_SIZE:
+                break
+
+        return removed
+
+    def remove_rows(self, table, keys):
+        """Delete rows removed in Supabase from the replica
+
+        Face encodings and voice embeddings are keyed by student. A student may
+        have enrolled again since the deletion, so only those Supabase has no
+        row for are removed.
+        """
+        keys = list(dict.fromkeys(keys))
+        if keys and table in EMBEDDING_TABLES:
+            present = set()
+            for start in range(0, len(keys), PULL_BATCH_SIZE):
+                batch = keys[start:start + PULL_BATCH_SIZE]
+                result = self.remote.supabase.table(table).select('student_id').in_('student_id', batch).execute()
+                present.update(row['student_id'] for row in result.data)
+            keys = [key for key in keys if key not in present]
+
+        if not keys:
+            return
+
+        for key in keys:
+            if table == 'students':
+                self.local.delete_student(key)
+            elif table == 'sessions':
+                self.local.delete_session(key)
+            elif table == 'face_encodings':
+                self.local.delete_face_encoding(key)
+            elif table == 'voice_embeddings':
+                self.local.delete_voice_embedding(key)
+
+        if table == 'attendance':
+            conn = self.local.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany('DELETE FROM attendance WHERE id = ?', [(key,) for key in keys])
+            conn.commit()
+            conn.close()
+
+        self.notify_changes(table, [], keys)
+
+    def add_change_listener(self, callback):
+        """
+        Register a callback for changes pulled from Supabase
+
+        Called as callback(table, rows, deleted) with the rows copied into the
+        replica and the keys removed from it: row ids, or student ids for
+        face_encodings and voice_embeddings.
+        """
+        self.change_listeners.append(callback)
+
+    def notify_changes(self, table, rows, deleted):
+        """Tell listeners about pulled changes; a failing listener does not stop the pull"""
+        for callback in self.change_listeners:
+            try:
+                callback(table, rows, deleted)
+            except Exception as e:
+                print(f"Error applying pulled {table} changes: {e}")
+
+    def get_watermark(self, name, column='last_id'):
+        """Get how far a table has been pulled: its highest id, or newest updated_at stamp"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'SELECT {column} FROM sync_state WHERE table_name = ?', (name,))
+        row = cursor.fetchone()
+
+        conn.close()
+
+        if row is None:
+            return 0 if column == 'last_id' else None
+        return row[column]
+
+    def set_watermark(self, name, column, value):
+        """Record how far a table has been pulled"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f'''
+        INSERT INTO sync_state (table_name, {column}, pulled_at) VALUES (?, ?, ?)
+        ON CONFLICT (table_name) DO UPDATE SET {column} = excluded.{column}, pulled_at = excluded.pulled_at
+        ''', (name, value, datetime.now().isoformat()))
+
+        conn.commit()
+        conn.close()
+
+    def mirror_rows(self, table, rows):
+        """Insert or update remote rows in the replica, keeping their ids"""
+        if table == 'face_encodings':
+            for row in rows:
+                self.local.save_face_encoding(row['student_id'], row['encoding_data'])
+            return
+
+        if table == 'voice_embeddings':
+            for row in rows:
+                self.local.save_voice_embedding(row['student_id'], row['embedding_data'])
+            return
+
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+
+        # Only copy the columns the local schema has
+        cursor.execute(f'PRAGMA table_info({table})')
+        local_columns = [row['name'] for row in cursor.fetchall()]
+
+        for row in rows:
+            columns = [column for column in local_columns if column in row]
+
+            if table == 'attendance' and row.get('client_key'):
+                # Replace the pending local copy of a row this kiosk pushed
+                cursor.execute('DELETE FROM attendance WHERE client_key = ? AND id != ?', (row['client_key'], row['id']))
+
+            updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'id')
+            cursor.execute(f'''
+            INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})
+            ON CONFLICT (id) DO UPDATE SET {updates}
+            ''', [row[column] for column in columns])
+
+        conn.commit()
+        conn.close()
+
+    #-----------------------------------------
+    # Connection Methods
+    #-----------------------------------------
+
+    def init_db(self):
+        """Initialize the local replica and fill it from Supabase if empty"""
+        self.local.init_db()
+        self.init_replica()
+
+        if self.remote.connected:
+            # A full pull on start also drops rows deleted while this kiosk was off
+            self.sync_once(full=True)
+
+        return True
+
+    def test_connection(self):
+        """Test the local replica, which serves every read"""
+        return self.local.test_connection()
+
+    #-----------------------------------------
+    # Student Methods
+    #-----------------------------------------
+
+    def add_student(self, student_data):
+        """Add a student in Supabase and mirror it locally"""
+        student_id = self.remote.add_student(student_data)
+        self.mirror_rows('students', [{**student_data, 'id': student_id}])
+        return student_id
+
+    def add_student_with_biometrics(self, student_data, encoding_data, embedding_data):
+        """Add a student with their face encoding and voice embedding in Supabase and mirror them locally"""
+        student_id = self.remote.add_student_with_biometrics(student_data, encoding_data, embedding_data)
+        self.mirror_rows('students', [{**student_data, 'id': student_id}])
+        self.mirror_rows('face_encodings', [{'student_id': student_id, 'encoding_data': encoding_data}])
+        self.mirror_rows('voice_embeddings', [{'student_id': student_id, 'embedding_data': embedding_data}])
+        return student_id
+
+    def get_students(self, page=1, per_page=10, query=''):
+        """Get students with pagination and search"""
+        return self.local.get_students(page, per_page, query)
+
+    def get_student_by_id(self, student_id):
+        """Get a student by internal ID"""
+        return self.local.get_student_by_id(student_id)
+
+    def get_student_by_student_id(self, student_id):
+        """Get a student by student ID (external ID)"""
+        return self.local.get_student_by_student_id(student_id)
+
+    def update_student(self, student_id, student_data):
+        """Update a student in Supabase and locally"""
+        self.remote.update_student(student_id, student_data)
+        return self.local.update_student(student_id, student_data)
+
+    def delete_student(self, student_id):
+        """Delete a student in Supabase and locally"""
+        self.remote.delete_student(student_id)
+        self.local.delete_face_encoding(student_id)
+        self.local.delete_voice_embedding(student_id)
+        return self.local.delete_student(student_id)
+
+    #-----------------------------------------
+    # Face Encoding and Voice Embedding Methods
+    #-----------------------------------------
+
+    def save_face_encoding(self, student_id, encoding_data):
+        """Save a face encoding in Supabase and locally"""
+        self.remote.save_face_encoding(student_id, encoding_data)
+        return self.local.save_face_encoding(student_id, encoding_data)
+
+    def get_face_encodings(self, on_page=None, progress=None):
+        """Get all face encodings"""
+        return self.local.get_face_encodings(on_page, progress)
+
+    def delete_face_encoding(self, student_id):
+        """Delete a face encoding in Supabase and locally"""
+        self.remote.delete_face_encoding(student_id)
+        return self.local.delete_face_encoding(student_id)
+
+    def save_voice_embedding(self, student_id, embedding_data):
+        """Save a voice embedding in Supabase and locally"""
+        self.remote.save_voice_embedding(student_id, embedding_data)
+        return self.local.save_voice_embedding(student_id, embedding_data)
+
+    def get_voice_embeddings(self, on_page=None, progress=None):
+        """Get all voice embeddings"""
+        return self.local.get_voice_embeddings(on_page, progress)
+
+    def delete_voice_embedding(self, student_id):
+        """Delete a voice embedding in Supabase and locally"""
+        self.remote.delete_voice_embedding(student_id)
+        return self.local.delete_voice_embedding(student_id)
+
+    #-----------------------------------------
+    # Session Methods
+    #-----------------------------------------
+
+    def add_session(self, session_data):
+        """Add a session in Supabase and mirror it locally"""
+        session_id = self.remote.add_session(session_data)
+        self.mirror_rows('sessions', [{**session_data, 'id': session_id}])
+        return session_id
+
+    def get_sessions(self):
+        """Get all sessions"""
+        return self.local.get_sessions()
+
+    def get_sessions_with_counts(self, start_date=None, end_date=None, page=None, per_page=None):
+        """Get sessions with their attendance counts"""
+        return self.local.get_sessions_with_counts(start_date, end_date, page, per_page)
+
+    def get_session_by_id(self, session_id):
+        """Get a session by ID"""
+        return self.local.get_session_by_id(session_id)
+
+    def delete_session(self, session_id):
+        """Delete a session in Supabase and locally"""
+        self.remote.delete_session(session_id)
+        return self.local.delete_session(session_id)
+
+    def get_session_attendance_count(self, session_id):
+        """Get the attendance count for a session"""
+        return self.local.get_session_attendance_count(session_id)
+
+    #-----------------------------------------
+    # Attendance Methods
+    #-----------------------------------------
+
+    def add_attendance(self, attendance_data):
+        """Record attendance locally and queue it for Supabase
+
+        The local row gets a negative id until the synchronizer pushes it and
+        swaps in the id Supabase assigned.
+        """
+        return self.add_attendance_batch([attendance_data])[0]
+
+    def add_attendance_batch(self, records):
+        """Record several attendance records locally in one transaction and queue them"""
+        conn = self.local.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA synchronous=FULL')
+
+        # Rows and outbox entries commit together, so nothing recorded is lost.
+        # The write lock is taken before the lowest id is read, so another
+        # process sharing the replica can't hand out the same placeholder ids.
+        attendance_ids = []
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT MIN(COALESCE(MIN(id), 0), 0) FROM attendance')
+            attendance_id = cursor.fetchone()[0]
+
+            for attendance_data in records:
+                attendance_id -= 1
+                client_key = attendance_data.get('client_key') or str(uuid.uuid4())
+                payload = {**attendance_data, 'client_key': client_key}
+
+                cursor.execute('''
+                INSERT INTO attendance (id, student_id, session_id, timestamp, status, client_key)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    attendance_id,
+                    attendance_data['student_id'],
+                    attendance_data['session_id'],
+                    attendance_data['timestamp'],
+                    attendance_data['status'],
+                    client_key
+                ))
+                cursor.execute('''
+                INSERT INTO sync_outbox (client_key, table_name, payload, created_at)
+                VALUES (?, 'attendance', ?, ?)
+                ''', (client_key, json.dumps(payload), datetime.now().isoformat()))
+                attendance_ids.append(attendance_id)
+
+            conn.commit()
+        finally:
+            conn.close()
+
+        # Wake the synchronizer to push them now
+        self.sync_event.set()
+
+        return attendance_ids
+
+    def get_attendance_by_session(self, session_id):
+        """Get attendance records for a session"""
+        return self.local.get_attendance_by_session(session_id)
+
+    def get_attendance_by_student_session(self, student_id, session_id):
+        """Check if a student has already been marked for a session"""
+        return self.local.get_attendance_by_student_session(student_id, session_id)
+
+    def get_attendance_version(self):
+        """Get a stamp of the replica's report content; pulls write through its triggers"""
+        return self.local.get_attendance_version()
+
+    def get_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get attendance data for reports with filters"""
+        return self.local.get_attendance_report(start_date, end_date, session_id, student_id, course)
+
+    def iter_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Yield attendance report rows"""
+        return self.local.iter_attendance_report(start_date, end_date, session_id, student_id, course)
+
+    def get_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get summary statistics for an attendance report"""
+        return self.local.get_attendance_stats(start_date, end_date, session_id, student_id, course)
+
+    def get_daily_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None, course=None):
+        """Get daily attendance stats for charts"""
+        return self.local.get_daily_attendance_stats(start_date, end_date, session_id, student_id, course)
+
+    #-----------------------------------------
+    # Settings Methods
+    #-----------------------------------------
+
+    def save_settings(self, settings_data):
+        """Save system settings in Supabase"""
+        return self.remote.save_settings(settings_data)
+
+    def get_settings(self):
+        """Get system settings from Supabase"""
+        return self.remote.get_settings()
+
+    def get_settings_version(self):
+        """Get the settings version stamp from Supabase"""
+        return self.remote.get_settings_version()
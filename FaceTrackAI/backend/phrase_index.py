@@ -0,0 +1,164 @@
+import os
+import re
+import zlib
+import secrets
+import unicodedata
+import numpy as np
+
+# Tokens are compared by their character trigrams, hashed into this many buckets
+NGRAM_SIZE = 3
+NGRAM_BUCKETS = 512
+
+# Trigram cosine similarity at which a transcribed word counts as a phrase
+# word; transcription slips such as "attendence" or "sesion" stay above it
+TOKEN_SIMILARITY = 0.6
+
+# Phrases a session's kiosks prompt for, out of all configured phrases; capped
+# at one fewer than configured, so every session rules some phrase out
+PHRASES_PER_SESSION = 3
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def load_rotation_secret(path, configured=None):
+    """
+    Get the secret mixed into the per-session phrase rotation
+
+    A configured secret is used as is. Otherwise a random one is generated
+    the first time and kept in `path`, so the rotation survives restarts and
+    is never predictable from session IDs alone.
+    """
+    if configured:
+        return configured
+
+    if not os.path.exists(path):
+        # Link a complete file into place, so concurrent starts agree on one secret
+        partial = f'{path}.{os.getpid()}.partial'
+        with open(partial, 'w') as secret_file:
+            secret_file.write(secrets.token_hex(16))
+        os.chmod(partial, 0o600)
+        try:
+            os.link(partial, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(partial)
+
+    with open(path) as secret_file:
+        return secret_file.read().strip()
+
+class PhraseIndex:
+    def __init__(self, phrases, secret=''):
+        """
+        Initialize a precompiled index of verification phrases
+
+        Phrases are normalized (NFKC, case-folded, split into Unicode word
+        tokens) once, into a vocabulary and the flat list of each phrase's
+        token IDs. A transcription marks the vocabulary words it contains,
+        exactly or as near misses found by comparing hashed character trigram
+        vectors in one matrix product, and every phrase is then scored in a
+        single gather and segmented sum.
+
+        Args:
+            phrases: Verification phrases, in any language
+            secret: Mixed into the per-session phrase rotation so it cannot be
+                predicted from the session ID alone
+        """
+        # Phrases without a single word, such as punctuation, can never be said
+        phrase_tokens = [sorted(set(self.tokenize(phrase))) for phrase in phrases]
+        self.phrases = [phrase for phrase, tokens in zip(phrases, phrase_tokens) if tokens]
+        phrase_tokens = [tokens for tokens in phrase_tokens if tokens]
+        self.secret = secret
+
+        self.vocabulary = sorted(set().union(*phrase_tokens))
+        self.positions = {token: index for index, token in enumerate(self.vocabulary)}
+
+        # Stored transposed so near-miss lookups are one contiguous product
+        self.token_vectors = np.ascontiguousarray(self.embed_tokens(self.vocabulary).T)
+
+        self.lengths = np.array([len(tokens) for tokens in phrase_tokens], dtype=np.float32)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths[:-1])]).astype(np.intp)
+        self.token_ids = np.array([self.positions[token] for tokens in phrase_tokens for token in tokens], dtype=np.intp)
+
+    @staticmethod
+    def tokenize(text):
+        """Split text into normalized word tokens"""
+        return TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).casefold())
+
+    @staticmethod
+    def embed_tokens(tokens):
+        """Unit vectors of hashed character trigrams, one row per token"""
+        vectors = np.zeros((len(tokens), NGRAM_BUCKETS), dtype=np.float32)
+        for row, token in enumerate(tokens):
+            padded = f'<{token}>'
+            for start in range(max(len(padded) - NGRAM_SIZE + 1, 1)):
+                gram = padded[start:start + NGRAM_SIZE].encode('utf-8')
+                vectors[row, zlib.crc32(gram) % NGRAM_BUCKETS] += 1
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-8)
+
+    def score(self, transcription):
+        """
+        Score a transcription against every phrase
+
+        Returns:
+            Float array with, for each phrase, the share of its words heard,
+            near misses counting by their similarity
+        """
+        tokens = set(self.tokenize(transcription))
+        if not tokens or not self.phrases:
+            return np.zeros(len(self.phrases), dtype=np.float32)
+
+        # Words heard exactly count fully
+        heard = np.zeros(len(self.vocabulary), dtype=np.float32)
+        heard[[self.positions[token] for token in tokens if token in self.positions]] = 1
+
+        # Other words count towards the phrase words they nearly match
+        unknown = sorted(token for token in tokens if token not in self.positions)
+        if unknown:
+            similarity = (self.embed_tokens(unknown) @ self.token_vectors).max(axis=0)
+            heard = np.maximum(heard, np.where(similarity >= TOKEN_SIMILARITY, similarity, 0))
+
+        return np.add.reduceat(heard[self.token_ids], self.offsets) / self.lengths
+
+    @property
+    def rotates(self):
+        """Whether sessions accept different phrases, which needs at least two"""
+        return len(self.phrases) > 1
+
+    def best_match(self, transcription, candidates=None):
+        """
+        Find the phrase a transcription matches best
+
+        Args:
+            candidates: Phrase indexes to consider; all phrases if not given
+
+        Returns:
+            (phrase, score), or (None, 0.0) if no phrase was heard at all
+        """
+        scores = self.score(transcription)
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=int)
+            scores = scores[candidates]
+        if not len(scores) or not scores.max() > 0:
+            return None, 0.0
+
+        best = int(np.argmax(scores))
+        index = int(candidates[best]) if candidates is not None else best
+        return self.phrases[index], float(scores[best])
+
+    def session_phrases(self, session_id, count=PHRASES_PER_SESSION):
+        """
+        Pick the phrases a session accepts
+
+        The choice is fixed for a session, so every kiosk prompts alike, and
+        changes between sessions, so a recording replayed from an earlier
+        session is saying the wrong phrase. At least one configured phrase is
+        left out of every session; with a single phrase nothing rotates.
+
+        Returns:
+            Phrase indexes
+        """
+        seed = zlib.crc32(f'{self.secret}:{session_id}'.encode('utf-8'))
+        count = max(min(count, len(self.phrases) - 1), 1)
+        return sorted(np.random.default_rng(seed).choice(len(self.phrases), count, replace=False).tolist())
@@ -0,0 +1,127 @@
+import time
+import threading
+
+class ServiceRegistry:
+    def __init__(self, started=None):
+        """
+        Initialize the service registry
+
+        Services are registered as factories and constructed on first use,
+        or ahead of it by warm_up() on a background thread, so the web server
+        can bind its port before storage connects and embeddings load. Each
+        service moves through pending, starting and ready (or failed, retried
+        on next use), and its construction time is recorded.
+
+        Args:
+            started: time.perf_counter() reading cold start is measured from;
+                defaults to now
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.factories = {}
+        self.instances = {}
+        self.locks = {}
+        self.status = {}
+        self.ready_callbacks = {}
+        self.imported_seconds = None
+        self.ready_seconds = None
+
+    def register(self, name, factory):
+        """
+        Register a service built by calling `factory()`
+
+        Returns:
+            A LazyService standing in for it
+        """
+        self.factories[name] = factory
+        self.locks[name] = threading.Lock()
+        self.status[name] = {'state': 'pending', 'seconds': None, 'error': None}
+        self.ready_callbacks[name] = []
+        return LazyService(self, name)
+
+    def on_ready(self, name, callback):
+        """Call `callback(instance)` once the service is constructed, or now if it already is"""
+        self.ready_callbacks[name].append(callback)
+        if name in self.instances:
+            callback(self.instances[name])
+
+    def get_if_ready(self, name):
+        """Get a service if it is constructed, or None, without constructing it"""
+        return self.instances.get(name)
+
+    def get(self, name):
+        """Get a service, constructing it first if needed; concurrent callers wait for one construction"""
+        if name in self.instances:
+            return self.instances[name]
+
+        with self.locks[name]:
+            if name in self.instances:
+                return self.instances[name]
+
+            status = self.status[name]
+            status.update({'state': 'starting', 'error': None})
+            started = time.perf_counter()
+            try:
+                instance = self.factories[name]()
+            except Exception as e:
+                status.update({'state': 'failed', 'error': str(e)})
+                raise
+
+            self.instances[name] = instance
+            status.update({'state': 'ready', 'seconds': round(time.perf_counter() - started, 3)})
+            print(f"Started {name} in {status['seconds']}s")
+
+            for callback in self.ready_callbacks[name]:
+                try:
+                    callback(instance)
+                except Exception as e:
+                    print(f"Error preparing {name}: {e}")
+            return instance
+
+    def mark_imported(self):
+        """Record the time taken to import the application"""
+        self.imported_seconds = round(time.perf_counter() - self.started, 3)
+
+    def warm_up(self):
+        """Construct every service in registration order on a background thread"""
+        thread = threading.Thread(target=self.warm_up_services, name='service-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def warm_up_services(self):
+        """Construct every service, recording how long until all were ready"""
+        for name in self.factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Error starting {name}: {e}")
+
+        if self.is_ready():
+            self.ready_seconds = round(time.perf_counter() - self.started, 3)
+            print(f"Backend ready in {self.ready_seconds}s (imported in {self.imported_seconds}s)")
+
+    def is_ready(self):
+        """Whether every service is constructed"""
+        return all(status['state'] == 'ready' for status in self.status.values())
+
+    def get_status(self):
+        """Get each service's state and the cold start timings"""
+        return {
+            'ready': self.is_ready(),
+            'services': {name: dict(status) for name, status in self.status.items()},
+            'cold_start': {
+                'import_seconds': self.imported_seconds,
+                'ready_seconds': self.ready_seconds
+            }
+        }
+
+class LazyService:
+    """Stands in for a registered service, constructing it on first attribute access"""
+
+    __slots__ = ('service_registry', 'service_name')
+
+    def __init__(self, registry, name):
+        self.service_registry = registry
+        self.service_name = name
+
+    def __getattr__(self, attribute):
+        return getattr(self.service_registry.get(self.service_name), attribute)
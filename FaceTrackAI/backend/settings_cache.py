@@ -0,0 +1,104 @@
+import time
+import threading
+
+from storage_backend import DEFAULT_SETTINGS
+
+# Seconds a cached copy is trusted before the stored version stamp is checked again
+SETTINGS_CHECK_INTERVAL = 5.0
+
+# Version of settings that were never loaded, unequal to any stored stamp including None
+UNLOADED = object()
+
+class SettingsCache:
+    def __init__(self, storage, check_interval=SETTINGS_CHECK_INTERVAL):
+        """
+        Initialize the settings cache
+
+        Settings are read once and then served from memory. At most every
+        `check_interval` seconds the backend's version stamp is read; the full
+        settings are only fetched again when it has changed, so a save in any
+        worker process reaches every other worker within one interval.
+
+        Args:
+            storage: StorageBackend holding the settings
+            check_interval: Seconds between version checks
+        """
+        self.storage = storage
+        self.check_interval = check_interval
+        self.settings = None
+        self.version = UNLOADED
+        self.checked_at = None
+        self.listeners = []
+        # Guards the cached fields; never held across a storage call
+        self.lock = threading.Lock()
+        # Serializes refreshes so listeners see versions in order
+        self.refresh_lock = threading.Lock()
+        self.loaded = threading.Event()
+
+    def add_listener(self, callback):
+        """Call `callback(settings)` once settings are loaded and whenever the stored settings change"""
+        with self.refresh_lock:
+            with self.lock:
+                self.listeners.append(callback)
+                settings = self.settings
+            if settings is not None:
+                callback(dict(settings))
+
+    def get(self):
+        """Get the current settings, checking the version stamp if the cache is stale
+
+        One caller checks the stamp while the others keep getting the cached
+        copy; only callers arriving before the first load wait for it.
+        """
+        with self.lock:
+            stale = self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval
+
+        if stale and self.refresh_lock.acquire(blocking=False):
+            try:
+                self.load()
+            finally:
+                self.refresh_lock.release()
+
+        self.loaded.wait()
+        with self.lock:
+            return dict(self.settings)
+
+    def refresh(self):
+        """Reload the settings if their stored version changed, notifying listeners"""
+        with self.refresh_lock:
+            self.load()
+
+    def load(self):
+        """Check the version stamp and fetch changed settings; the caller holds refresh_lock
+
+        A failed read keeps the cached copy, or defaults before the first load,
+        without recording a version, so the next check fetches the settings again.
+        """
+        try:
+            version = self.storage.get_settings_version()
+            with self.lock:
+                changed = version != self.version
+            if changed:
+                settings = self.storage.get_settings()
+                with self.lock:
+                    self.settings = settings
+                    self.version = version
+                    listeners = list(self.listeners)
+                for callback in listeners:
+                    callback(dict(settings))
+        except Exception as e:
+            print(f"Error refreshing settings: {e}")
+            with self.lock:
+                if self.settings is None:
+                    self.settings = dict(DEFAULT_SETTINGS)
+        finally:
+            with self.lock:
+                self.checked_at = time.monotonic()
+            self.loaded.set()
+
+    def save(self, settings_data):
+        """Save settings and apply them to this process immediately"""
+        self.storage.save_settings(settings_data)
+        self.refresh()
+
+        return True
@@ -0,0 +1,442 @@
+import io
+import numpy as np
+import soundfile as sf
+
+# Analysis parameters; embeddings are only comparable between identical settings
+ENGINE_VERSION = 'mfcc-stats-v2'
+CANONICAL_RATE = 16000
+FRAME_LENGTH = 0.025
+FRAME_STEP = 0.010
+PRE_EMPHASIS = 0.97
+NUM_MELS = 40
+NUM_MFCC = 20
+MAX_FREQUENCY = 8000
+
+# Least speech, in seconds, that yields a usable embedding
+MIN_DURATION = 0.5
+
+# Voice activity detection: frames this long are speech when their energy is
+# VAD_ENERGY_MARGIN_DB above the noise floor (the VAD_NOISE_PERCENTILE quietest
+# frame; half the margin for noisy, high zero-crossing fricatives) and above
+# VAD_ABSOLUTE_FLOOR_DB; speech is padded by VAD_HANGOVER on each side
+VAD_FRAME = 0.02
+VAD_NOISE_PERCENTILE = 10
+VAD_ENERGY_MARGIN_DB = 8
+VAD_ABSOLUTE_FLOOR_DB = -55
+VAD_FRICATIVE_ZCR = 0.25
+VAD_HANGOVER = 0.1
+
+# Cosine similarity two different voices typically reach; scores are rescaled
+# from it, so the voice threshold setting reads on a 0 to 1 scale. Measured on
+# synthetic source-filter voices, so retune it against real enrolments.
+SCORE_FLOOR = 0.75
+
+class UnsupportedAudioError(ValueError):
+    """Raised for audio soundfile cannot decode, such as MediaRecorder's WebM/Opus"""
+
+def check_audio_format(audio):
+    """
+    Check that audio bytes are in a format soundfile decodes, without decoding them
+
+    Raises:
+        UnsupportedAudioError naming the accepted formats
+    """
+    try:
+        sf.info(io.BytesIO(audio))
+    except RuntimeError as e:
+        raise UnsupportedAudioError(
+            "Voice samples must be WAV, FLAC or Ogg Vorbis audio; WebM/Opus recordings are not supported"
+        ) from e
+
+class SpeakerEmbeddingEngine:
+    def __init__(self, num_mels=NUM_MELS, num_mfcc=NUM_MFCC):
+        """
+        Initialize the speaker embedding engine
+
+        Computes a fixed-length voice embedding locally with NumPy. Audio is
+        resampled to CANONICAL_RATE and trimmed to its speech by voice activity
+        detection, then framed, pre-emphasized, transformed (STFT, mel
+        filterbank, MFCC, per-utterance CMVN) and pooled into statistics.
+        Filterbank and DCT matrices are built once and reused.
+
+        Args:
+            num_mels: Mel filterbank channels
+            num_mfcc: Cepstral coefficients kept, including c0 (dropped from the embedding)
+        """
+        self.num_mels = num_mels
+        self.num_mfcc = num_mfcc
+        self.dct = self.build_dct(num_mels, num_mfcc)
+        self.analysis = {}
+        self.vad = VoiceActivityDetector(CANONICAL_RATE)
+
+    def read_audio(self, source):
+        """
+        Read audio as mono float32 samples
+
+        Args:
+            source: Path, file-like object or bytes in a format soundfile reads (WAV, FLAC, OGG)
+
+        Returns:
+            (samples, sample_rate)
+
+        Raises:
+            UnsupportedAudioError if the format cannot be decoded
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+
+        try:
+            samples, sample_rate = sf.read(source, dtype='float32', always_2d=True)
+        except RuntimeError as e:
+            raise UnsupportedAudioError(f"Cannot decode the voice sample: {e}") from e
+        return samples.mean(axis=1), sample_rate
+
+    def embed_file(self, source):
+        """Compute the embedding of an audio file; returns (embedding, seconds of speech)"""
+        samples, sample_rate = self.read_audio(source)
+        speech = self.prepare(samples, sample_rate)
+        return self.pool(self.mfcc(speech, CANONICAL_RATE)), len(speech) / CANONICAL_RATE
+
+    def embed(self, samples, sample_rate):
+        """
+        Compute the embedding of mono samples
+
+        Returns:
+            Unit-length float32 vector; compare two with cosine_score
+        """
+        speech = self.prepare(samples, sample_rate)
+        return self.pool(self.mfcc(speech, CANONICAL_RATE))
+
+    def prepare(self, samples, sample_rate):
+        """
+        Resample to CANONICAL_RATE and keep only the speech
+
+        Raises:
+            ValueError if the clip holds less than MIN_DURATION of speech
+        """
+        samples = self.resample(samples, sample_rate, CANONICAL_RATE)
+        speech = self.vad.trim(samples)
+        if len(speech) < MIN_DURATION * CANONICAL_RATE:
+            raise ValueError(f"Not enough speech in the voice sample; speak for at least {MIN_DURATION} seconds")
+
+        return speech
+
+    @staticmethod
+    def resample(samples, sample_rate, target_rate):
+        """Band-limited resampling by truncating or zero-padding the spectrum"""
+        if sample_rate == target_rate or not len(samples):
+            return samples
+
+        length = int(round(len(samples) * target_rate / sample_rate))
+        spectrum = np.fft.rfft(samples)
+        resized = np.zeros(length // 2 + 1, dtype=spectrum.dtype)
+        keep = min(len(spectrum), len(resized))
+        resized[:keep] = spectrum[:keep]
+
+        return (np.fft.irfft(resized, length) * (length / len(samples))).astype(np.float32)
+
+    def mfcc(self, samples, sample_rate):
+        """Compute MFCCs (frames x coefficients, c0 included)"""
+        return self.mfcc_frames(self.pre_emphasize(samples), sample_rate)
+
+    @staticmethod
+    def pre_emphasize(samples, previous=None):
+        """
+        Boost the high frequencies that carry speaker detail
+
+        Args:
+            previous: Last sample of the preceding chunk when streaming
+        """
+        head = samples[:1] if previous is None else samples[:1] - PRE_EMPHASIS * previous
+        return np.append(head, samples[1:] - PRE_EMPHASIS * samples[:-1])
+
+    def mfcc_frames(self, emphasized, sample_rate):
+        """Compute MFCCs of every complete frame of pre-emphasized samples"""
+        frame_length, frame_step, window, filterbank, fft_size = self.get_analysis(sample_rate)
+        if len(emphasized) < frame_length:
+            return np.empty((0, self.num_mfcc), dtype=np.float32)
+
+        # Overlapping frames as a strided view, windowed in one multiply
+        frames = np.lib.stride_tricks.sliding_window_view(emphasized, frame_length)[::frame_step] * window
+
+        power = np.abs(np.fft.rfft(frames, fft_size)) ** 2 / fft_size
+        log_mel = np.log(np.maximum(power @ filterbank.T, 1e-10))
+
+        return log_mel @ self.dct.T
+
+    def pool(self, mfcc):
+        """Pool MFCC frames into a fixed-length embedding"""
+        stats = self.new_stats()
+        self.accumulate(stats, mfcc)
+        return self.pool_stats(stats)
+
+    def new_stats(self):
+        """Create empty running statistics for accumulate and pool_stats"""
+        size = self.num_mfcc - 1
+        return {
+            'frames': 0,
+            'sum': np.zeros(size),
+            'outer': np.zeros((size, size)),
+            'deltas': 0,
+            'delta_sum': np.zeros(size),
+            'delta_square': np.zeros(size),
+            'last': None
+        }
+
+    @staticmethod
+    def accumulate(stats, mfcc):
+        """Add MFCC frames to running statistics, continuing deltas across calls"""
+        if not len(mfcc):
+            return stats
+
+        cepstra = mfcc[:, 1:].astype(np.float64)
+        stats['frames'] += len(cepstra)
+        stats['sum'] += cepstra.sum(axis=0)
+        stats['outer'] += cepstra.T @ cepstra
+
+        joined = cepstra if stats['last'] is None else np.vstack([stats['last'], cepstra])
+        deltas = np.diff(joined, axis=0)
+        stats['deltas'] += len(deltas)
+        stats['delta_sum'] += deltas.sum(axis=0)
+        stats['delta_square'] += (deltas ** 2).sum(axis=0)
+        stats['last'] = cepstra[-1]
+
+        return stats
+
+    @staticmethod
+    def pool_stats(stats):
+        """
+        Turn running statistics into a fixed-length embedding
+
+        Three blocks, each scaled to unit length before concatenation: the mean
+        cepstrum (vocal tract shape), the correlations between CMVN-normalized
+        coefficients, and the spread of their frame-to-frame deltas. c0
+        (loudness) is left out. Cepstral mean and variance normalization
+        removes channel and gain; it is applied through the statistics, so the
+        embedding is the same whether the frames arrived at once or in chunks.
+        """
+        frames = stats['frames']
+        mean = stats['sum'] / frames
+        covariance = stats['outer'] / frames - np.outer(mean, mean)
+        std = np.sqrt(np.maximum(np.diag(covariance), 0)) + 1e-8
+
+        correlation = covariance / np.outer(std, std)
+        upper = correlation[np.triu_indices(correlation.shape[0], k=1)]
+
+        deltas = max(stats['deltas'], 1)
+        delta_mean = stats['delta_sum'] / deltas
+        delta_std = np.sqrt(np.maximum(stats['delta_square'] / deltas - delta_mean ** 2, 0)) / std
+
+        blocks = [mean, upper, delta_std]
+        embedding = np.concatenate([block / (np.linalg.norm(block) + 1e-8) for block in blocks])
+
+        return (embedding / np.linalg.norm(embedding)).astype(np.float32)
+
+    def stream(self, sample_rate=CANONICAL_RATE):
+        """Start an incremental embedding of CANONICAL_RATE audio that arrives in chunks"""
+        if sample_rate != CANONICAL_RATE:
+            raise ValueError(f"Streamed audio must be sampled at {CANONICAL_RATE} Hz")
+
+        return EmbeddingStream(self, sample_rate)
+
+    @staticmethod
+    def cosine_score(embedding, reference):
+        """
+        Score two embeddings by cosine similarity
+
+        Returns:
+            0 at or below SCORE_FLOOR (chance level for different voices) rising to 1 for identical embeddings
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        reference = np.asarray(reference, dtype=np.float32)
+        return float(SpeakerEmbeddingEngine.cosine_scores(embedding[None], reference[None])[0])
+
+    @staticmethod
+    def cosine_scores(embeddings, references):
+        """Score each row of `embeddings` against the same row of `references`, as cosine_score does"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        references = np.asarray(references, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(references, axis=1)
+        cosines = np.einsum('nd,nd->n', embeddings, references) / (norms + 1e-8)
+
+        return np.maximum(0.0, (cosines - SCORE_FLOOR) / (1 - SCORE_FLOOR))
+
+    def get_analysis(self, sample_rate):
+        """Get frame sizes, window and mel filterbank for a sample rate, building them once"""
+        if sample_rate not in self.analysis:
+            frame_length = int(round(FRAME_LENGTH * sample_rate))
+            frame_step = int(round(FRAME_STEP * sample_rate))
+            fft_size = 1 << (frame_length - 1).bit_length()
+            self.analysis[sample_rate] = (
+                frame_length,
+                frame_step,
+                np.hamming(frame_length).astype(np.float32),
+                self.build_filterbank(sample_rate, fft_size, self.num_mels),
+                fft_size
+            )
+
+        return self.analysis[sample_rate]
+
+    @staticmethod
+    def build_filterbank(sample_rate, fft_size, num_mels):
+        """Build triangular mel filters (mels x FFT bins) up to MAX_FREQUENCY or Nyquist"""
+        def to_mel(hz):
+            return 2595 * np.log10(1 + hz / 700)
+
+        def to_hz(mel):
+            return 700 * (10 ** (mel / 2595) - 1)
+
+        high = min(MAX_FREQUENCY, sample_rate / 2)
+        edges = to_hz(np.linspace(to_mel(0), to_mel(high), num_mels + 2))
+        bins = np.fft.rfftfreq(fft_size, 1 / sample_rate)
+
+        lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+        rising = (bins - lower) / (center - lower)
+        falling = (upper - bins) / (upper - center)
+
+        return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+    @staticmethod
+    def build_dct(num_mels, num_mfcc):
+        """Build the orthonormal DCT-II matrix (coefficients x mels)"""
+        n = np.arange(num_mels)
+        k = np.arange(num_mfcc)[:, None]
+        dct = np.cos(np.pi * k * (2 * n + 1) / (2 * num_mels)) * np.sqrt(2 / num_mels)
+        dct[0] /= np.sqrt(2)
+
+        return dct.astype(np.float32)
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate):
+        """
+        Initialize the energy and zero-crossing voice activity detector
+
+        Args:
+            sample_rate: Sample rate of the audio it is given
+        """
+        self.frame_length = int(round(VAD_FRAME * sample_rate))
+        self.hangover = int(round(VAD_HANGOVER / VAD_FRAME))
+
+    def frame_features(self, samples):
+        """
+        Split samples into VAD frames and measure each
+
+        Returns:
+            (frames, energy in dBFS, zero-crossing rate); a partial last frame is dropped
+        """
+        count = len(samples) // self.frame_length
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+
+        energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+        crossings = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+
+        return frames, energy, crossings
+
+    @staticmethod
+    def noise_floor(energy):
+        """Estimate the noise floor from the quietest frames"""
+        return np.percentile(energy, VAD_NOISE_PERCENTILE)
+
+    @staticmethod
+    def classify(energy, crossings, floor):
+        """Mark frames that are voiced, or quieter but fricative-like"""
+        voiced = energy > floor + VAD_ENERGY_MARGIN_DB
+        fricative = (energy > floor + VAD_ENERGY_MARGIN_DB / 2) & (crossings > VAD_FRICATIVE_ZCR)
+        return (voiced | fricative) & (energy > VAD_ABSOLUTE_FLOOR_DB)
+
+    def trim(self, samples):
+        """Drop silence before, between and after speech, keeping VAD_HANGOVER around it"""
+        frames, energy, crossings = self.frame_features(samples)
+        if not len(frames):
+            return samples[:0]
+
+        speech = self.classify(energy, crossings, self.noise_floor(energy))
+
+        # Pad speech on both sides so word onsets and endings are kept
+        padded = np.convolve(speech, np.ones(2 * self.hangover + 1), mode='same') > 0
+
+        return frames[padded].ravel()
+
+class EmbeddingStream:
+    def __init__(self, engine, sample_rate):
+        """
+        Initialize an incremental embedding
+
+        Chunks pass through a causal version of the voice activity detector
+        (noise floor from the frames so far, hangover after speech only). The
+        speech is pre-emphasized and framed as it arrives, with the samples of
+        an unfinished frame carried into the next chunk, and its MFCCs are
+        folded into running statistics.
+
+        Args:
+            engine: SpeakerEmbeddingEngine computing the features
+            sample_rate: Sample rate of the chunks
+        """
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.stats = engine.new_stats()
+        self.raw = np.empty(0, dtype=np.float32)
+        self.energies = np.empty(0)
+        self.since_speech = None
+        self.pending = np.empty(0, dtype=np.float32)
+        self.previous = None
+        self.samples = 0
+        self.speech_samples = 0
+
+    def add(self, samples):
+        """Add a chunk of mono float32 samples"""
+        self.samples += len(samples)
+        self.raw = np.append(self.raw, samples)
+
+        vad = self.engine.vad
+        frames, energy, crossings = vad.frame_features(self.raw)
+        if not len(frames):
+            return
+        self.raw = self.raw[len(frames) * vad.frame_length:]
+
+        self.energies = np.append(self.energies, energy)
+        speech = vad.classify(energy, crossings, vad.noise_floor(self.energies))
+
+        # Keep speech frames and the hangover after each
+        keep = np.zeros(len(frames), dtype=bool)
+        for index, is_speech in enumerate(speech):
+            if is_speech:
+                self.since_speech = 0
+            elif self.since_speech is not None:
+                self.since_speech += 1
+            keep[index] = self.since_speech is not None and self.since_speech <= vad.hangover
+
+        self.add_speech(frames[keep].ravel())
+
+    def add_speech(self, speech):
+        """Fold speech samples into the running feature statistics"""
+        if not len(speech):
+            return
+
+        self.pending = np.append(self.pending, self.engine.pre_emphasize(speech, self.previous))
+        self.previous = speech[-1]
+        self.speech_samples += len(speech)
+
+        mfcc = self.engine.mfcc_frames(self.pending, self.sample_rate)
+        self.engine.accumulate(self.stats, mfcc)
+
+        # Keep the samples the next frame starts from
+        frame_step = self.engine.get_analysis(self.sample_rate)[1]
+        self.pending = self.pending[len(mfcc) * frame_step:]
+
+    @property
+    def duration(self):
+        """Seconds of audio added so far"""
+        return self.samples / self.sample_rate
+
+    @property
+    def speech_duration(self):
+        """Seconds of speech found so far"""
+        return self.speech_samples / self.sample_rate
+
+    def embedding(self):
+        """Embedding of the speech so far, or None until MIN_DURATION of it has arrived"""
+        if self.speech_duration < MIN_DURATION or not self.stats['frames']:
+            return None
+
+        return self.engine.pool_stats(self.stats)
@@ -0,0 +1,208 @@
+import os
+from abc import ABC, abstractmethod
+
+# Default settings for the application, shared by every backend
+DEFAULT_SETTINGS = {
+    'face_recognition_threshold': 0.5,
+    'voice_recognition_threshold': 0.5,
+    'require_both_auth': True,
+    'camera_id': '',
+    'microphone_id': '',
+    'verification_phrases': [
+        "i am present today for the class",
+        "confirming my attendance for today's session",
+        "recording my presence for this class"
+    ]
+}
+
+# Backends create_storage_backend can build, selected by STORAGE_BACKEND
+STORAGE_BACKENDS = ['supabase', 'sqlite', 'hybrid']
+
+class StorageBackend(ABC):
+    """
+    Contract shared by the storage backends
+
+    Every backend returns the same shapes: get_students returns
+    (students, total), get_sessions_with_counts returns (sessions, total),
+    get_attendance_report returns (rows, stats) with the rows yielded by
+    iter_attendance_report, and settings are a dictionary of key to value
+    with DEFAULT_SETTINGS filled in.
+    """
+
+    @abstractmethod
+    def init_db(self):
+        """Create or verify the schema"""
+
+    @abstractmethod
+    def test_connection(self):
+        """Raise if the backend cannot be reached"""
+
+    # Students
+
+    @abstractmethod
+    def add_student(self, student_data):
+        """Add a student and return its internal ID"""
+
+    @abstractmethod
+    def add_student_with_biometrics(self, student_data, encoding_data, embedding_data):
+        """Add a student with their face encoding and voice embedding, all or none of them; return its internal ID"""
+
+    @abstractmethod
+    def get_students(self, page=1, per_page=10, query=''):
+        """Return (students, total) for one page, optionally filtered by a search query"""
+
+    @abstractmethod
+    def get_student_by_id(self, student_id):
+        """Return a student by internal ID, or None"""
+
+    @abstractmethod
+    def get_student_by_student_id(self, student_id):
+        """Return a student by external student ID, or None"""
+
+    @abstractmethod
+    def update_student(self, student_id, student_data):
+        """Update the given fields of a student"""
+
+    @abstractmethod
+    def delete_student(self, student_id):
+        """Delete a student with their face and voice data"""
+
+    # Face encodings and voice embeddings
+
+    @abstractmethod
+    def save_face_encoding(self, student_id, encoding_data):
+        """Insert or replace a student's face encoding"""
+
+    @abstractmethod
+    def get_face_encodings(self, on_page=None, progress=None):
+        """Return all face encodings, or hand them to on_page a page at a time"""
+
+    @abstractmethod
+    def delete_face_encoding(self, student_id):
+        """Delete a student's face encoding"""
+
+    @abstractmethod
+    def save_voice_embedding(self, student_id, embedding_data):
+        """Insert or replace a student's voice embedding"""
+
+    @abstractmethod
+    def get_voice_embeddings(self, on_page=None, progress=None):
+        """Return all voice embeddings, or hand them to on_page a page at a time"""
+
+    @abstractmethod
+    def delete_voice_embedding(self, student_id):
+        """Delete a student's voice embedding"""
+
+    # Sessions
+
+    @abstractmethod
+    def add_session(self, session_data):
+        """Add a session and return its ID"""
+
+    @abstractmethod
+    def get_sessions(self):
+        """Return all sessions, newest first"""
+
+    @abstractmethod
+    def get_sessions_with_counts(self, start_date=None, end_date=None, page=None, per_page=None):
+        """Return (sessions, total) with an attendance_count on each session"""
+
+    @abstractmethod
+    def get_session_by_id(self, session_id):
+        """Return a session by ID, or None"""
+
+    @abstractmethod
+    def delete_session(self, session_id):
+        """Delete a session and its attendance"""
+
+    @abstractmethod
+    def get_session_attendance_count(self, session_id):
+        """Return the number of attendance records for a session"""
+
+    # Attendance
+
+    @abstractmethod
+    def add_attendance(self, attendance_data):
+        """Record attendance and return its ID"""
+
+    @abstractmethod
+    def add_attendance_batch(self, records):
+        """Record several attendance records in one transaction and return their IDs in order"""
+
+    @abstractmethod
+    def get_attendance_by_session(self, session_id):
+        """Return a session's attendance with student_name, email and the external id as student_code"""
+
+    @abstractmethod
+    def get_attendance_by_student_session(self, student_id, session_id):
+        """Return a student's attendance record for a session, or None"""
+
+    @abstractmethod
+    def get_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Return (rows, stats) for the filtered attendance"""
+
+    @abstractmethod
+    def iter_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Yield report rows: id, timestamp, status, student_id, student_name, session_id, session_name, date"""
+
+    @abstractmethod
+    def get_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Return total_sessions, total_students, total_records and attendance_rate"""
+
+    @abstractmethod
+    def get_daily_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Return [{'date', 'count'}] ordered by date"""
+
+    @abstractmethod
+    def get_attendance_version(self):
+        """Return a stamp that changes whenever report content changes, or None if the backend cannot tell"""
+
+    # Settings
+
+    @abstractmethod
+    def save_settings(self, settings_data):
+        """Save a dictionary of settings, leaving keys not given unchanged"""
+
+    @abstractmethod
+    def get_settings(self):
+        """Return all settings with DEFAULT_SETTINGS filled in"""
+
+    @abstractmethod
+    def get_settings_version(self):
+        """Return a stamp that changes whenever settings are saved"""
+
+def create_storage_backend(config=None):
+    """
+    Build the storage backend selected by configuration
+
+    Args:
+        config: Mapping read for STORAGE_BACKEND ('supabase', 'sqlite' or
+            'hybrid'), SQLITE_DB_PATH and LOCAL_REPLICA_DB; defaults to the
+            environment
+
+    Returns:
+        An initialized StorageBackend
+    """
+    config = os.environ if config is None else config
+    backend = config.get('STORAGE_BACKEND', 'hybrid' if config.get('LOCAL_REPLICA_DB') else 'supabase')
+
+    # Import lazily so a backend's dependencies are only needed when it is used
+    if backend == 'sqlite':
+        from database_service import DatabaseService
+        storage = DatabaseService(config.get('SQLITE_DB_PATH', 'data/attendance.db'))
+        storage.init_db()
+    elif backend == 'supabase':
+        from supabase_service import SupabaseService
+        storage = SupabaseService()
+    elif backend == 'hybrid':
+        from database_service import DatabaseService
+        from supabase_service import SupabaseService
+        from hybrid_service import HybridService
+        storage = HybridService(SupabaseService(), DatabaseService(config.get('LOCAL_REPLICA_DB', 'data/replica.db')))
+        storage.init_db()
+        storage.start_sync()
+    else:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {', '.join(STORAGE_BACKENDS)}")
+
+    print(f"Using {backend} storage backend")
+    return storage
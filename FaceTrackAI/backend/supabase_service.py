@@ -1,18 +1,93 @@
 import os
+import re
 import json
+import uuid
 from datetime import datetime
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from storage_backend import StorageBackend, DEFAULT_SETTINGS
 
-# Default settings for the application
-DEFAULT_SETTINGS = {
-    'face_recognition_threshold': 0.5,
-    'voice_recognition_threshold': 0.5,
-    'require_both_auth': True,
-    'camera_id': '',
-    'microphone_id': ''
-}
+# Trigram indexes that let Postgres serve the word-prefix student search from an index
+# instead of a sequential scan. Apply once through the SQL editor or a migration.
+STUDENT_SEARCH_INDEX_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS students_student_id_trgm ON students USING gin (student_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS students_name_trgm ON students USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS students_email_trgm ON students USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS students_course_trgm ON students USING gin (course gin_trgm_ops);
+"""
 
-class SupabaseService:
+# Aggregation functions for reports and charts, so only the totals cross the
+# network. Apply once through the SQL editor or a migration; until then the
+# service aggregates narrow column pages locally.
+REPORT_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION attendance_daily_counts(
+    start_date text DEFAULT NULL, end_date text DEFAULT NULL,
+    filter_session_id bigint DEFAULT NULL, filter_student_id bigint DEFAULT NULL
+) RETURNS TABLE (date date, count bigint) LANGUAGE sql STABLE AS $$
+    SELECT a.time_in::date, COUNT(*)
+    FROM attendance a
+    WHERE (start_date IS NULL OR a.time_in >= start_date::timestamptz)
+      AND (end_date IS NULL OR a.time_in <= end_date::timestamptz)
+      AND (filter_session_id IS NULL OR a.session_id = filter_session_id)
+      AND (filter_student_id IS NULL OR a.student_id = filter_student_id)
+    GROUP BY 1 ORDER BY 1
+$$;
+
+CREATE OR REPLACE FUNCTION attendance_session_counts(
+    start_date text DEFAULT NULL, end_date text DEFAULT NULL,
+    filter_session_id bigint DEFAULT NULL, filter_student_id bigint DEFAULT NULL
+) RETURNS TABLE (session_id bigint, count bigint) LANGUAGE sql STABLE AS $$
+    SELECT a.session_id, COUNT(*)
+    FROM attendance a
+    WHERE (start_date IS NULL OR a.time_in >= start_date::timestamptz)
+      AND (end_date IS NULL OR a.time_in <= end_date::timestamptz)
+      AND (filter_session_id IS NULL OR a.session_id = filter_session_id)
+      AND (filter_student_id IS NULL OR a.student_id = filter_student_id)
+    GROUP BY 1 ORDER BY 1
+$$;
+
+CREATE OR REPLACE FUNCTION attendance_report_stats(
+    start_date text DEFAULT NULL, end_date text DEFAULT NULL,
+    filter_session_id bigint DEFAULT NULL, filter_student_id bigint DEFAULT NULL
+) RETURNS TABLE (total_sessions bigint, total_students bigint, total_records bigint, active_students bigint)
+LANGUAGE sql STABLE AS $$
+    SELECT COUNT(DISTINCT a.session_id), COUNT(DISTINCT a.student_id), COUNT(*),
+           (SELECT COUNT(*) FROM students WHERE status = 'active')
+    FROM attendance a
+    WHERE (start_date IS NULL OR a.time_in >= start_date::timestamptz)
+      AND (end_date IS NULL OR a.time_in <= end_date::timestamptz)
+      AND (filter_session_id IS NULL OR a.session_id = filter_session_id)
+      AND (filter_student_id IS NULL OR a.student_id = filter_student_id)
+$$;
+"""
+
+# Unique key that lets save_settings upsert every setting in one request.
+# Apply once through the SQL editor or a migration; until then each key is
+# written separately.
+SETTINGS_KEY_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS settings_key ON settings (key);
+"""
+
+# Settings row whose value changes on every save, so caches can cheaply check for changes
+SETTINGS_VERSION_KEY = 'settings_version'
+
+# Rows requested per range request when streaming reports
+REPORT_CHUNK_SIZE = 500
+
+# Rows per range request, and concurrent requests, when loading embedding galleries
+EMBEDDING_PAGE_SIZE = 1000
+EMBEDDING_FETCH_WORKERS = 8
+
+# Ids per in_ filter when batching lookups, well inside PostgREST URL limits
+ID_BATCH_SIZE = 100
+
+# Columns searched by get_students, in both backends
+STUDENT_SEARCH_COLUMNS = ['student_id', 'name', 'email', 'course']
+
+# PostgREST's error code for a function missing from its schema cache
+MISSING_FUNCTION_CODE = 'PGRST202'
+
+class SupabaseService(StorageBackend):
     def __init__(self):
         """Initialize the Supabase service with the Supabase URL and API key"""
         # Get Supabase credentials from environment variables
@@ -20,12 +95,20 @@ class SupabaseService:
         self.supabase_key = os.environ.get('SUPABASE_KEY')
         self.supabase = None
         
+        # Database functions found missing, served by the local fallback instead
+        self.missing_rpcs = set()
+        
+        # Cleared when the settings table has no unique key to upsert on
+        self.settings_upsert = True
+        
         if not self.supabase_url or not self.supabase_key:
             print("Warning: Supabase credentials not found in environment variables")
             print("Using local SQLite database instead")
             self.connected = False
         else:
             try:
+                # Import lazily; the client library takes a while to load
+                from supabase import create_client
                 self.supabase = create_client(self.supabase_url, self.supabase_key)
                 self.connected = True
                 print("Connected to Supabase successfully")
@@ -115,6 +198,34 @@ class SupabaseService:
             print(f"Error adding student: {e}")
             raise
     
+    def add_student_with_biometrics(self, student_data, encoding_data, embedding_data):
+        """Add a student with their face encoding and voice embedding
+        
+        The REST API has no transaction across requests, so the student is
+        deleted again if either embedding cannot be inserted.
+        """
+        student_id = self.add_student(student_data)
+        
+        try:
+            self.supabase.table('face_encodings').insert({
+                'student_id': student_id,
+                'encoding_data': encoding_data
+            }).execute()
+            self.supabase.table('voice_embeddings').insert({
+                'student_id': student_id,
+                'embedding_data': embedding_data
+            }).execute()
+        except Exception as e:
+            print(f"Error adding biometrics of student {student_id}, removing the student: {e}")
+            try:
+                self.delete_student(student_id)
+            except Exception as cleanup_error:
+                # The student is left without biometrics; the caller still gets the insert's error
+                print(f"Error removing student {student_id} after failed registration: {cleanup_error}")
+            raise
+        
+        return student_id
+    
     def get_students(self, page=1, per_page=10, query=''):
         """Get students with pagination and search"""
         if not self.connected:
@@ -124,31 +235,42 @@ class SupabaseService:
             # Calculate offset
             offset = (page - 1) * per_page
             
-            # Build query
-            query_builder = self.supabase.table('students').select('*')
+            # Build query, counting matches in the same round trip
+            query_builder = self.supabase.table('students').select('*', count='exact')
             
             # Add search if provided
             if query:
-                query_builder = query_builder.or_(f"name.ilike.%{query}%,student_id.ilike.%{query}%,email.ilike.%{query}%")
+                query_builder = self.apply_student_search(query_builder, query)
             
             # Add pagination
-            result = query_builder.range(offset, offset + per_page - 1).execute()
+            result = query_builder.order('id', desc=True).range(offset, offset + per_page - 1).execute()
+            total = result.count if result.count is not None else 0
             
-            # Get total count for pagination
-            count_result = self.supabase.table('students').select('count', count='exact').execute()
-            total = count_result.count if hasattr(count_result, 'count') else 0
-            
-            return {
-                'students': result.data,
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': (total + per_page - 1) // per_page
-            }
+            return result.data, total
         except Exception as e:
             print(f"Error getting students: {e}")
             raise
     
+    @staticmethod
+    def apply_student_search(query_builder, query):
+        """Filter so every search token starts a word in one of the searched columns.
+        
+        Matches the prefix semantics of the SQLite FTS search ('jo' finds
+        'John' and 'mary-jo' but not 'majority'); the trigram indexes in
+        STUDENT_SEARCH_INDEX_SQL serve these case-insensitive regex filters.
+        """
+        tokens = re.findall(r'\w+', query.lower())
+        if not tokens:
+            # Nothing searchable in the query (punctuation only), so nothing matches
+            return query_builder.eq('id', -1)
+        
+        for token in tokens:
+            # [[:<:]] anchors at a word start; quoted since PostgREST reserves ':' in or filters
+            columns = ','.join(f'{column}.imatch."[[:<:]]{token}"' for column in STUDENT_SEARCH_COLUMNS)
+            query_builder = query_builder.or_(columns)
+        
+        return query_builder
+    
     def get_student_by_id(self, student_id):
         """Get a student by internal ID"""
         if not self.connected:
@@ -228,14 +350,19 @@ class SupabaseService:
             print(f"Error saving face encoding: {e}")
             raise
     
-    def get_face_encodings(self):
-        """Get all face encodings"""
+    def get_face_encodings(self, on_page=None, progress=None):
+        """Get all face encodings
+        
+        Args:
+            on_page: Optional callback receiving each page of rows as it arrives;
+                pages are then not collected and the row count is returned
+            progress: Optional callback receiving (rows_loaded, total_rows)
+        """
         if not self.connected:
             raise Exception("Not connected to Supabase")
             
         try:
-            result = self.supabase.table('face_encodings').select('*').execute()
-            return result.data
+            return self.fetch_all_pages('face_encodings', 'student_id, encoding_data', on_page, progress)
         except Exception as e:
             print(f"Error getting face encodings: {e}")
             raise
@@ -278,14 +405,19 @@ class SupabaseService:
             print(f"Error saving voice embedding: {e}")
             raise
     
-    def get_voice_embeddings(self):
-        """Get all voice embeddings"""
+    def get_voice_embeddings(self, on_page=None, progress=None):
+        """Get all voice embeddings
+        
+        Args:
+            on_page: Optional callback receiving each page of rows as it arrives;
+                pages are then not collected and the row count is returned
+            progress: Optional callback receiving (rows_loaded, total_rows)
+        """
         if not self.connected:
             raise Exception("Not connected to Supabase")
             
         try:
-            result = self.supabase.table('voice_embeddings').select('*').execute()
-            return result.data
+            return self.fetch_all_pages('voice_embeddings', 'student_id, embedding_data', on_page, progress)
         except Exception as e:
             print(f"Error getting voice embeddings: {e}")
             raise
@@ -302,6 +434,63 @@ class SupabaseService:
             print(f"Error deleting voice embedding: {e}")
             raise
     
+    def fetch_all_pages(self, table, columns, on_page=None, progress=None):
+        """Fetch a whole table with concurrent range requests
+        
+        The row count is read first, then EMBEDDING_PAGE_SIZE ranges are fetched
+        over a pool of EMBEDDING_FETCH_WORKERS threads and handed to on_page in
+        completion order. Without on_page the rows are returned in id order.
+        """
+        count_result = self.supabase.table(table).select('id', count='exact').limit(1).execute()
+        total = count_result.count or 0
+        
+        pages = {}
+        loaded = 0
+        
+        def handle_page(start, rows):
+            nonlocal loaded
+            loaded += len(rows)
+            if on_page:
+                on_page(rows)
+            else:
+                pages[start] = rows
+            if progress:
+                progress(loaded, max(total, loaded))
+        
+        with ThreadPoolExecutor(max_workers=EMBEDDING_FETCH_WORKERS) as executor:
+            futures = {
+                executor.submit(self.fetch_range, table, columns, start, start + EMBEDDING_PAGE_SIZE - 1): start
+                for start in range(0, total, EMBEDDING_PAGE_SIZE)
+            }
+            for future in as_completed(futures):
+                handle_page(futures[future], future.result())
+        
+        # Pick up rows added after the count was taken
+        start = max(total, 0)
+        while True:
+            rows = self.fetch_range(table, columns, start, start + EMBEDDING_PAGE_SIZE - 1)
+            if not rows:
+                break
+            handle_page(start, rows)
+            start += len(rows)
+        
+        if on_page:
+            return loaded
+        
+        return [row for start in sorted(pages) for row in pages[start]]
+    
+    def fetch_range(self, table, columns, start, end):
+        """Fetch rows start..end of a table by id, following up if the server caps the page"""
+        rows = []
+        while start <= end:
+            result = self.supabase.table(table).select(columns).order('id').range(start, end).execute()
+            if not result.data:
+                break
+            rows.extend(result.data)
+            start += len(result.data)
+        
+        return rows
+    
     def add_session(self, session_data):
         """Add a new session to the database"""
         if not self.connected:
@@ -326,6 +515,47 @@ class SupabaseService:
             print(f"Error getting sessions: {e}")
             raise
     
+    def get_sessions_with_counts(self, start_date=None, end_date=None, page=None, per_page=None):
+        """Get sessions with their attendance counts in one request
+        
+        The counts are embedded as an attendance(count) aggregate. Returns
+        (sessions, total); pass page and per_page to get one page of sessions.
+        """
+        if not self.connected:
+            raise Exception("Not connected to Supabase")
+            
+        try:
+            query = self.supabase.table('sessions').select('*, attendance(count)', count='exact')
+            
+            # Apply date filters
+            if start_date:
+                query = query.gte('date', start_date)
+            if end_date:
+                query = query.lte('date', end_date)
+            
+            query = query.order('created_at', desc=True)
+            
+            # Add pagination
+            if page and per_page:
+                offset = (page - 1) * per_page
+                query = query.range(offset, offset + per_page - 1)
+            
+            result = query.execute()
+            
+            # Flatten the embedded [{'count': n}] aggregate
+            sessions = []
+            for session in result.data:
+                counts = session.pop('attendance', None) or [{'count': 0}]
+                session['attendance_count'] = counts[0]['count']
+                sessions.append(session)
+            
+            total = result.count if result.count is not None else len(sessions)
+            
+            return sessions, total
+        except Exception as e:
+            print(f"Error getting sessions with counts: {e}")
+            raise
+    
     def get_session_by_id(self, session_id):
         """Get a session by ID"""
         if not self.connected:
@@ -378,34 +608,37 @@ class SupabaseService:
             print(f"Error adding attendance record: {e}")
             raise
     
+    def add_attendance_batch(self, records):
+        """Add several attendance records in one request, returning their IDs in order"""
+        if not self.connected:
+            raise Exception("Not connected to Supabase")
+            
+        try:
+            result = self.supabase.table('attendance').insert(list(records)).execute()
+            return [row['id'] for row in result.data]
+        except Exception as e:
+            print(f"Error adding attendance records: {e}")
+            raise
+    
     def get_attendance_by_session(self, session_id):
         """Get attendance records for a session"""
         if not self.connected:
             raise Exception("Not connected to Supabase")
             
         try:
-            # SQL query to join students and attendance
-            query = """
-            SELECT a.*, s.name, s.student_id, s.email
-            FROM attendance a
-            JOIN students s ON a.student_id = s.id
-            WHERE a.session_id = ?
-            ORDER BY a.time_in DESC
-            """
-            
-            # Note: In a real implementation, we'd use Supabase's query capabilities
-            # This is a placeholder for the SQL join we'd want to do
-            
-            # For now, we'll do two queries and join them in Python
             attendance = self.supabase.table('attendance').select('*').eq('session_id', session_id).order('time_in', desc=True).execute()
             
-            # Get student details for each attendance record
+            # Get student details for all records in batched lookups
+            students = self.get_rows_by_ids('students', [record['student_id'] for record in attendance.data],
+                                            'id, name, student_id, email')
+            
             result = []
             for record in attendance.data:
-                student = self.get_student_by_id(record['student_id'])
+                student = students.get(record['student_id'])
                 if student:
                     record['name'] = student['name']
-                    record['student_id'] = student['student_id']
+                    record['student_name'] = student['name']
+                    record['student_code'] = student['student_id']
                     record['email'] = student['email']
                     result.append(record)
             
@@ -414,6 +647,23 @@ class SupabaseService:
             print(f"Error getting attendance by session: {e}")
             raise
     
+    def get_rows_by_ids(self, table, ids, columns='*'):
+        """Fetch rows by id with de-duplicated, batched in_ filters
+        
+        Returns a dictionary of rows keyed by id. Ids are sent ID_BATCH_SIZE at
+        a time to keep each request URL within server limits.
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        rows = {}
+        
+        for start in range(0, len(unique_ids), ID_BATCH_SIZE):
+            batch = unique_ids[start:start + ID_BATCH_SIZE]
+            result = self.supabase.table(table).select(columns).in_('id', batch).execute()
+            for row in result.data:
+                rows[row['id']] = row
+        
+        return rows
+    
     def get_attendance_by_student_session(self, student_id, session_id):
         """Check if a student has already been marked for a session"""
         if not self.connected:
@@ -426,44 +676,76 @@ class SupabaseService:
             print(f"Error checking attendance: {e}")
             raise
     
+    def get_attendance_version(self):
+        """
+        Get a stamp of report content; always None here
+        
+        Renames of students or sessions, and rows deleted and reinserted, are
+        invisible to anything PostgREST can count cheaply, so Supabase offers
+        no version and exports are served without a validator.
+        """
+        return None
+    
     def get_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None):
         """Get attendance data for reports with filters"""
+        attendance_data = list(self.iter_attendance_report(start_date, end_date, session_id, student_id))
+        stats = self.get_attendance_stats(start_date, end_date, session_id, student_id)
+        
+        return attendance_data, stats
+    
+    def iter_attendance_report(self, start_date=None, end_date=None, session_id=None, student_id=None,
+                               chunk_size=REPORT_CHUNK_SIZE):
+        """Yield attendance report rows, requesting at most chunk_size rows per range request"""
         if not self.connected:
             raise Exception("Not connected to Supabase")
             
         try:
-            # Start building the query
-            query = self.supabase.table('attendance').select('*')
-            
-            # Apply filters
-            if start_date:
-                query = query.gte('time_in', start_date)
-            if end_date:
-                query = query.lte('time_in', end_date)
-            if session_id:
-                query = query.eq('session_id', session_id)
-            if student_id:
-                query = query.eq('student_id', student_id)
-            
-            # Execute query
-            result = query.order('time_in', desc=True).execute()
-            
-            # Get student and session details for each attendance record
-            attendance_with_details = []
-            for record in result.data:
-                # Get student details
-                student = self.get_student_by_id(record['student_id'])
-                session = self.get_session_by_id(record['session_id'])
+            offset = 0
+            # Sessions recur across pages, so keep the ones already fetched
+            sessions = {}
+            while True:
+                # Start building the query
+                query = self.supabase.table('attendance').select('*')
                 
-                if student and session:
-                    attendance_with_details.append({
-                        **record,
-                        'student_name': student['name'],
-                        'student_external_id': student['student_id'],
-                        'session_name': session['name']
-                    })
-            
-            return attendance_with_details
+                # Apply filters
+                if start_date:
+                    query = query.gte('time_in', start_date)
+                if end_date:
+                    query = query.lte('time_in', end_date)
+                if session_id:
+                    query = query.eq('session_id', session_id)
+                if student_id:
+                    query = query.eq('student_id', student_id)
+                
+                # Execute one page; id breaks timestamp ties so pages don't overlap
+                result = query.order('time_in', desc=True).order('id').range(offset, offset + chunk_size - 1).execute()
+                
+                # Get student and session details for the page in batched lookups
+                students = self.get_rows_by_ids('students', [record['student_id'] for record in result.data],
+                                                'id, name, student_id')
+                missing_sessions = [record['session_id'] for record in result.data
+                                    if record['session_id'] not in sessions]
+                sessions.update(self.get_rows_by_ids('sessions', missing_sessions, 'id, name, date'))
+                
+                for record in result.data:
+                    student = students.get(record['student_id'])
+                    session = sessions.get(record['session_id'])
+                    
+                    if student and session:
+                        yield {
+                            'id': record['id'],
+                            'timestamp': record.get('timestamp') or record.get('time_in'),
+                            'status': record.get('status'),
+                            'student_id': student['student_id'],
+                            'student_name': student['name'],
+                            'session_id': record['session_id'],
+                            'session_name': session['name'],
+                            'date': session.get('date')
+                        }
+                
+                if len(result.data) < chunk_size:
+                    break
+                offset += chunk_size
         except Exception as e:
             print(f"Error generating attendance report: {e}")
             raise
@@ -474,66 +756,183 @@ class SupabaseService:
             raise Exception("Not connected to Supabase")
             
         try:
-            # This would be a SQL query in a real implementation
-            # For now, we'll get all attendance and aggregate in Python
-            attendance = self.get_attendance_report(start_date, end_date, session_id, student_id)
-            
-            # Aggregate by date
-            daily_stats = {}
-            for record in attendance:
-                # Extract date from timestamp
+            params = self.build_report_params(start_date, end_date, session_id, student_id)
+            daily_stats = self.call_rpc('attendance_daily_counts', params)
+            if daily_stats is not None:
+                return daily_stats
+            
+            # Fallback: count per date from the timestamps alone
+            counts = {}
+            for record in self.iter_attendance_columns('time_in', start_date, end_date, session_id, student_id):
                 date = record['time_in'].split('T')[0]
-                
-                if date not in daily_stats:
-                    daily_stats[date] = 0
-                
-                daily_stats[date] += 1
+                counts[date] = counts.get(date, 0) + 1
             
-            # Convert to list of objects
-            stats_list = [{'date': date, 'count': count} for date, count in daily_stats.items()]
+            return [{'date': date, 'count': counts[date]} for date in sorted(counts)]
+        except Exception as e:
+            print(f"Error generating daily attendance stats: {e}")
+            raise
+    
+    def get_session_attendance_counts(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Get attendance counts per session"""
+        if not self.connected:
+            raise Exception("Not connected to Supabase")
             
-            # Sort by date
-            stats_list.sort(key=lambda x: x['date'])
+        try:
+            params = self.build_report_params(start_date, end_date, session_id, student_id)
+            session_counts = self.call_rpc('attendance_session_counts', params)
+            if session_counts is not None:
+                return session_counts
             
-            return stats_list
+            # Fallback: count per session from the session ids alone
+            counts = {}
+            for record in self.iter_attendance_columns('session_id', start_date, end_date, session_id, student_id):
+                counts[record['session_id']] = counts.get(record['session_id'], 0) + 1
+            
+            return [{'session_id': key, 'count': counts[key]} for key in sorted(counts)]
         except Exception as e:
-            print(f"Error generating daily attendance stats: {e}")
+            print(f"Error generating session attendance counts: {e}")
+            raise
+    
+    def get_attendance_stats(self, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Get summary statistics for an attendance report"""
+        if not self.connected:
+            raise Exception("Not connected to Supabase")
+            
+        try:
+            params = self.build_report_params(start_date, end_date, session_id, student_id)
+            rows = self.call_rpc('attendance_report_stats', params)
+            
+            if rows:
+                totals = rows[0]
+            else:
+                # Fallback: distinct counts from the id columns alone
+                sessions = set()
+                students = set()
+                total_records = 0
+                for record in self.iter_attendance_columns('session_id, student_id', start_date, end_date,
+                                                           session_id, student_id):
+                    sessions.add(record['session_id'])
+                    students.add(record['student_id'])
+                    total_records += 1
+                
+                active = self.supabase.table('students').select('id', count='exact').eq('status', 'active').limit(1).execute()
+                totals = {
+                    'total_sessions': len(sessions),
+                    'total_students': len(students),
+                    'total_records': total_records,
+                    'active_students': active.count or 0
+                }
+            
+            # Attendance rate against every active student in every session held
+            attendance_rate = 0
+            possible_attendance = totals['active_students'] * totals['total_sessions']
+            if totals['total_students'] > 0 and possible_attendance > 0:
+                attendance_rate = round((totals['total_records'] / possible_attendance) * 100)
+            
+            return {
+                'total_sessions': totals['total_sessions'],
+                'total_students': totals['total_students'],
+                'total_records': totals['total_records'],
+                'attendance_rate': attendance_rate
+            }
+        except Exception as e:
+            print(f"Error generating attendance stats: {e}")
             raise
     
+    @staticmethod
+    def build_report_params(start_date=None, end_date=None, session_id=None, student_id=None):
+        """Build the arguments of the report aggregation functions"""
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'filter_session_id': int(session_id) if session_id else None,
+            'filter_student_id': int(student_id) if student_id else None
+        }
+    
+    def call_rpc(self, name, params):
+        """Call a database function, returning None if it is not installed
+        
+        Missing functions are remembered so the fallback is used without
+        another failed round trip.
+        """
+        if name in self.missing_rpcs:
+            return None
+        
+        try:
+            return self.supabase.rpc(name, params).execute().data
+        except Exception as e:
+            # Only a missing function falls back; a table or row the function
+            # can't find is an error in the function and is raised
+            code = getattr(e, 'code', None)
+            if code == MISSING_FUNCTION_CODE or (code is None and MISSING_FUNCTION_CODE in str(e)):
+                print(f"Database function {name} not installed, aggregating locally")
+                self.missing_rpcs.add(name)
+                return None
+            raise
+    
+    def iter_attendance_columns(self, columns, start_date=None, end_date=None, session_id=None, student_id=None):
+        """Yield only the given attendance columns for the filtered rows, a page at a time"""
+        offset = 0
+        while True:
+            query = self.supabase.table('attendance').select(columns)
+            
+            # Apply filters
+            if start_date:
+                query = query.gte('time_in', start_date)
+            if end_date:
+                query = query.lte('time_in', end_date)
+            if session_id:
+                query = query.eq('session_id', session_id)
+            if student_id:
+                query = query.eq('student_id', student_id)
+            
+            result = query.order('id').range(offset, offset + REPORT_CHUNK_SIZE - 1).execute()
+            yield from result.data
+            
+            if len(result.data) < REPORT_CHUNK_SIZE:
+                break
+            offset += REPORT_CHUNK_SIZE
+    
     def save_settings(self, settings_data):
         """Save system settings
         
+        All keys and a new version stamp are written in one upsert.
+        
         Args:
-            settings_data: Dictionary with key and value for the setting
+            settings_data: Dictionary of setting keys and values; keys not given are left unchanged
         """
         if not self.connected:
             raise Exception("Not connected to Supabase")
             
+        now = datetime.now().isoformat()
+        rows = [{'key': key, 'value': value, 'updated_at': now} for key, value in settings_data.items()]
+        rows.append({'key': SETTINGS_VERSION_KEY, 'value': uuid.uuid4().hex, 'updated_at': now})
+        
         try:
-            # Get the setting key and value
-            key = settings_data.get('key')
-            value = settings_data.get('value')
-            
-            if not key:
-                raise ValueError("Setting key is required")
+            if self.settings_upsert:
+                try:
+                    self.supabase.table('settings').upsert(rows, on_conflict='key').execute()
+                    return True
+                except Exception as e:
+                    # 42P10: no unique constraint matches the ON CONFLICT columns
+                    if '42P10' not in str(e):
+                        raise
+                    print("Settings table has no unique key, saving settings one key at a time")
+                    self.settings_upsert = False
+            
+            for row in rows:
+                # Check if setting with this key exists
+                check = self.supabase.table('settings').select('id').eq('key', row['key']).execute()
                 
-            # Check if setting with this key exists
-            check = self.supabase.table('settings').select('id').eq('key', key).execute()
-            
-            if check.data:
-                # Update existing setting
-                result = self.supabase.table('settings').update({
-                    'value': value,
-                    'updated_at': datetime.now().isoformat()
-                }).eq('key', key).execute()
-            else:
-                # Insert new setting
-                result = self.supabase.table('settings').insert({
-                    'key': key,
-                    'value': value,
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }).execute()
+                if check.data:
+                    # Update existing setting
+                    self.supabase.table('settings').update({
+                        'value': row['value'],
+                        'updated_at': now
+                    }).eq('key', row['key']).execute()
+                else:
+                    # Insert new setting
+                    self.supabase.table('settings').insert({**row, 'created_at': now}).execute()
                 
             return True
         except Exception as e:
@@ -550,12 +949,13 @@ class SupabaseService:
             
             if not result.data:
                 # Return default settings if none exist
-                return DEFAULT_SETTINGS
+                return dict(DEFAULT_SETTINGS)
                 
             # Convert list of settings to dictionary
             settings = {}
             for item in result.data:
-                settings[item['key']] = item['value']
+                if item['key'] != SETTINGS_VERSION_KEY:
+                    settings[item['key']] = item['value']
                 
             # Fill in missing settings with defaults
             for key, value in DEFAULT_SETTINGS.items():
@@ -565,5 +965,13 @@ class SupabaseService:
             return settings
         except Exception as e:
             print(f"Error getting settings: {e}")
-            # Return default settings on error
-            return DEFAULT_SETTINGS
\ No newline at end of file
+            raise
+    
+    def get_settings_version(self):
+        """Get the version stamp written by the last save, or None if settings were never saved"""
+        if not self.connected:
+            raise Exception("Not connected to Supabase")
+            
+        result = self.supabase.table('settings').select('value').eq('key', SETTINGS_VERSION_KEY).execute()
+        
+        return result.data[0]['value'] if result.data else None
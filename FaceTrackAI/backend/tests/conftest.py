@@ -0,0 +1,81 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The backend modules are imported flat, as app.py imports them
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from supabase_service import SupabaseService
+from supabase_standin import StandInClient
+
+# What the kiosk pages upload: MediaRecorder output re-encoded by src/js/wav.js
+CLIENT_SAMPLE_RATE = 16000
+
+def connect_standin(client, monkeypatch):
+    """A SupabaseService talking to the stand-in client instead of a project"""
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_KEY', raising=False)
+    service = SupabaseService()
+    service.supabase = client
+    service.connected = True
+    return service
+
+def synthetic_voice(pitch, formants, seconds=2.0, rate=CLIENT_SAMPLE_RATE, seed=0):
+    """A source-filter stand-in for a speaker: harmonics of `pitch` shaped by `formants`, between silences"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+
+    # Slow pitch drift and syllable-rate loudness, as in running speech
+    f0 = pitch * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, 6)))
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = np.zeros_like(t)
+    for harmonic in range(1, int(4000 / pitch)):
+        gain = sum(np.exp(-((harmonic * pitch - formant) / 120) ** 2) for formant in formants) + 0.02
+        voice += gain / harmonic ** 0.5 * np.sin(harmonic * phase + rng.uniform(0, 6))
+    voice *= 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 2 * t))
+    voice = 0.3 * voice / np.abs(voice).max()
+
+    silence = 0.002 * rng.standard_normal(int(0.3 * rate))
+    return np.concatenate([silence, voice, silence]).astype(np.float32)
+
+def wav_bytes(samples, rate=CLIENT_SAMPLE_RATE):
+    """Samples as the 16-bit PCM WAV file the kiosk pages upload"""
+    import soundfile as sf
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, rate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+@pytest.fixture
+def standin():
+    return StandInClient()
+
+@pytest.fixture
+def supabase_service(standin, monkeypatch):
+    return connect_standin(standin, monkeypatch)
+
+@pytest.fixture(scope='session')
+def backend_app(tmp_path_factory):
+    """The Flask app over a fresh SQLite database, imported once for the session
+
+    app.py keeps its services in module globals and writes under data/
+    relative to the working directory, so it runs from a scratch directory.
+    """
+    working_dir = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('backend'))
+    os.environ.update({'STORAGE_BACKEND': 'sqlite', 'TRANSCRIPTION_BACKEND': 'none'})
+    import app
+    # Construct every service now, not on the warm-up thread after the session ends
+    for name in app.services.factories:
+        app.services.get(name)
+    yield app
+    # Let the background FLAC transcoder finish before the interpreter exits
+    app.services.get('voice_store').stop()
+    os.chdir(working_dir)
+
+@pytest.fixture
+def client(backend_app):
+    return backend_app.app.test_client()
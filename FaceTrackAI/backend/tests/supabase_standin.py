@@ -0,0 +1,344 @@
+"""In-memory stand-in for the parts of the supabase-py client the backends use
+
+Tables behave like the PostgREST API over the schema the backends expect:
+ids are assigned on insert, unique keys are enforced with Postgres error
+codes, attendance must reference an existing student and session, embedded
+attendance(count) aggregates and or-filters (with nested and groups) are understood,
+and with change tracking every write stamps updated_at and every delete
+leaves a row in sync_tombstones, as REMOTE_SCHEMA_SQL sets up.
+"""
+import re
+import itertools
+from datetime import datetime, timedelta, timezone
+
+# Columns the backends rely on being unique, and the code Postgres reports when one is violated
+UNIQUE_KEYS = {
+    'students': [('student_id',)],
+    'settings': [('key',)],
+    'attendance': [('client_key',)]
+}
+UNIQUE_VIOLATION = '23505'
+
+# Columns referencing another table's id, and the code Postgres reports for a missing one
+FOREIGN_KEYS = {
+    'attendance': [('student_id', 'students'), ('session_id', 'sessions')]
+}
+FOREIGN_KEY_VIOLATION = '23503'
+
+# Tables with change tracking when track_changes is on
+TRACKED_TABLES = ['students', 'sessions', 'attendance', 'face_encodings', 'voice_embeddings']
+
+class StandInError(Exception):
+    """Error shaped like postgrest's APIError, whose text carries the error code"""
+
+    def __init__(self, code, message):
+        super().__init__(str({'code': code, 'message': message}))
+        self.code = code
+
+class StandInResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class StandInClient:
+    def __init__(self, track_changes=True):
+        """
+        Initialize an empty stand-in database
+
+        Args:
+            track_changes: Stamp updated_at on writes and keep tombstones of
+                deletes, as a project with REMOTE_SCHEMA_SQL applied does
+        """
+        self.tables = {}
+        self.ids = {}
+        self.functions = {}
+        self.unique_keys = {table: list(keys) for table, keys in UNIQUE_KEYS.items()}
+        self.foreign_keys = {table: list(keys) for table, keys in FOREIGN_KEYS.items()}
+        self.track_changes = track_changes
+        self.offline = False
+        self.fail_after_write = False
+        self.clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.requests = []
+        # (table, column, values) of every in_ filter sent, to check batching
+        self.in_filters = []
+
+    def table(self, name):
+        return StandInQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return StandInCall(self, name, params or {})
+
+    def rows(self, name):
+        """The rows of a table, as stored"""
+        return self.tables.setdefault(name, [])
+
+    def now(self):
+        """A timestamp later than every earlier one, like clock_timestamp()"""
+        self.clock += timedelta(microseconds=1)
+        return self.clock.isoformat()
+
+    def check_online(self, table, operation):
+        self.requests.append((table, operation))
+        if self.offline:
+            raise ConnectionError("network down")
+
+    def insert_row(self, name, values):
+        row = dict(values)
+        rows = self.rows(name)
+
+        for key in self.unique_keys.get(name, []):
+            if all(row.get(column) is not None for column in key) and \
+                    any(all(other.get(column) == row.get(column) for column in key) for other in rows):
+                raise StandInError(UNIQUE_VIOLATION, f'duplicate key value violates unique constraint "{name}_{"_".join(key)}"')
+
+        if 'id' not in row:
+            counter = self.ids.setdefault(name, itertools.count(1))
+            row['id'] = next(counter)
+            while any(other['id'] == row['id'] for other in rows):
+                row['id'] = next(counter)
+
+        now = self.now()
+        if name == 'sessions':
+            row.setdefault('created_at', now)
+        if name == 'attendance':
+            row.setdefault('time_in', row.get('timestamp') or now)
+        if self.track_changes and name in TRACKED_TABLES:
+            row['updated_at'] = now
+
+        rows.append(row)
+        return row
+
+    def check_references(self, name, row):
+        """Raise as Postgres does when a written row references a missing row"""
+        for column, target in self.foreign_keys.get(name, []):
+            if row.get(column) is not None and not any(str(other['id']) == str(row[column]) for other in self.rows(target)):
+                raise StandInError(FOREIGN_KEY_VIOLATION,
+                                   f'insert or update on table "{name}" violates foreign key constraint "{name}_{column}_fkey"')
+
+    def update_row(self, name, row, values):
+        row.update(values)
+        if self.track_changes and name in TRACKED_TABLES:
+            row['updated_at'] = self.now()
+
+    def delete_rows(self, name, doomed):
+        doomed_ids = {id(row) for row in doomed}
+        self.tables[name] = [row for row in self.rows(name) if id(row) not in doomed_ids]
+
+        if self.track_changes and name in TRACKED_TABLES:
+            for row in doomed:
+                self.insert_row('sync_tombstones', {
+                    'table_name': name,
+                    'row_id': row['id'],
+                    'student_id': row.get('student_id') if name in ('face_encodings', 'voice_embeddings') else None,
+                    'deleted_at': self.now()
+                })
+
+class StandInCall:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.check_online('rpc', self.name)
+        if self.name not in self.client.functions:
+            raise StandInError('PGRST202', f'Could not find the function public.{self.name} in the schema cache')
+        return StandInResult(self.client.functions[self.name](self.client, **self.params))
+
+class StandInQuery:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.operation = 'select'
+        self.columns = '*'
+        self.count = None
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.payload = None
+        self.on_conflict = None
+
+    # Operations
+
+    def select(self, columns='*', count=None):
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload):
+        self.operation, self.payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **kwargs):
+        self.operation, self.payload, self.on_conflict = 'upsert', payload, on_conflict
+        return self
+
+    def update(self, payload):
+        self.operation, self.payload = 'update', payload
+        return self
+
+    def delete(self):
+        self.operation = 'delete'
+        return self
+
+    # Filters and modifiers
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and str(row.get(column)) == str(value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and compare(row[column], value) > 0)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and compare(row[column], value) >= 0)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and compare(row[column], value) < 0)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and compare(row[column], value) <= 0)
+        return self
+
+    def in_(self, column, values):
+        self.client.in_filters.append((self.name, column, list(values)))
+        values = {str(value) for value in values}
+        self.filters.append(lambda row: str(row.get(column)) in values)
+        return self
+
+    def or_(self, expression):
+        conditions = [parse_condition(part) for part in split_conditions(expression)]
+        self.filters.append(lambda row: any(condition(row) for condition in conditions))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def limit(self, count):
+        self.window = (0, count - 1)
+        return self
+
+    # Execution
+
+    def execute(self):
+        client = self.client
+        client.check_online(self.name, self.operation)
+
+        if self.operation in ('insert', 'upsert'):
+            result = self.write()
+        else:
+            matched = [row for row in client.rows(self.name) if all(check(row) for check in self.filters)]
+
+            if self.operation == 'update':
+                for row in matched:
+                    client.update_row(self.name, row, self.payload)
+                result = StandInResult([dict(row) for row in matched])
+            elif self.operation == 'delete':
+                client.delete_rows(self.name, matched)
+                result = StandInResult([dict(row) for row in matched])
+            else:
+                result = self.read(matched)
+
+        if client.fail_after_write and self.operation != 'select':
+            # The write is applied but its response is lost, as on a dropped connection
+            client.fail_after_write = False
+            raise ConnectionError("connection reset after write")
+
+        return result
+
+    def write(self):
+        payloads = self.payload if isinstance(self.payload, list) else [self.payload]
+
+        conflict_columns = None
+        if self.operation == 'upsert':
+            conflict_columns = tuple(self.on_conflict.split(',')) if self.on_conflict else ('id',)
+            if conflict_columns != ('id',) and conflict_columns not in self.client.unique_keys.get(self.name, []):
+                raise StandInError('42P10', 'there is no unique or exclusion constraint matching the ON CONFLICT specification')
+
+        written = []
+        for payload in payloads:
+            self.client.check_references(self.name, payload)
+            existing = None
+            if conflict_columns:
+                existing = next((row for row in self.client.rows(self.name)
+                                 if all(row.get(column) == payload.get(column) for column in conflict_columns)), None)
+            if existing is not None:
+                self.client.update_row(self.name, existing, payload)
+                written.append(dict(existing))
+            else:
+                written.append(dict(self.client.insert_row(self.name, payload)))
+
+        return StandInResult(written)
+
+    def read(self, rows):
+        for column, desc in reversed(self.orders):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            # Postgres sorts nulls last ascending and first descending
+            present.sort(key=lambda row: row[column], reverse=desc)
+            rows = missing + present if desc else present + missing
+
+        total = len(rows) if self.count else None
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+
+        return StandInResult([self.project(row) for row in rows], total)
+
+    def project(self, row):
+        columns = [column.strip() for column in self.columns.split(',')]
+        if '*' in columns or columns == ['count']:
+            projected = dict(row)
+        else:
+            projected = {column: row.get(column) for column in columns if '(' not in column}
+
+        for column in columns:
+            embedded = re.fullmatch(r'(\w+)\(count\)', column)
+            if embedded:
+                # Embedded aggregate of the rows referencing this one, e.g. attendance(count) of a session
+                foreign_key = f'{self.name.rstrip("s")}_id'
+                count = sum(1 for other in self.client.rows(embedded.group(1)) if other.get(foreign_key) == row['id'])
+                projected[embedded.group(1)] = [{'count': count}]
+
+        return projected
+
+def compare(left, right):
+    """Compare a stored value with a filter value the way Postgres would for the column"""
+    if isinstance(left, (int, float)) and not isinstance(right, (int, float)):
+        right = type(left)(right)
+    if isinstance(left, str) and re.match(r'\d{4}-\d{2}-\d{2}T.*[+-]\d{2}:\d{2}$', left):
+        left, right = datetime.fromisoformat(left), datetime.fromisoformat(right)
+    return (left > right) - (left < right)
+
+def split_conditions(expression):
+    """Split an or-filter on the commas outside double quotes and and(...) groups"""
+    return [part for part in re.findall(r'(?:[^,"()]|"[^"]*"|\((?:[^()"]|"[^"]*")*\))+', expression)]
+
+def parse_condition(condition):
+    """Turn one 'column.operator.value' condition, or an and(...) group of them, into a row predicate"""
+    if condition.startswith('and(') and condition.endswith(')'):
+        conditions = [parse_condition(part) for part in split_conditions(condition[4:-1])]
+        return lambda row: all(condition(row) for condition in conditions)
+
+    column, operator, value = condition.split('.', 2)
+    value = value[1:-1] if value.startswith('"') and value.endswith('"') else value
+
+    if operator == 'eq':
+        return lambda row: str(row.get(column)) == value
+    if operator == 'gt':
+        return lambda row: row.get(column) is not None and compare(row[column], value) > 0
+    if operator == 'ilike':
+        pattern = re.compile('^' + '.*'.join(re.escape(piece) for piece in value.split('*')) + '$', re.IGNORECASE)
+        return lambda row: bool(pattern.search(str(row.get(column) or '')))
+    if operator == 'imatch':
+        # Postgres' [[:<:]] word start: not preceded by a letter, digit or underscore
+        pattern = re.compile(value.replace('[[:<:]]', r'(?<!\w)'), re.IGNORECASE)
+        return lambda row: bool(pattern.search(str(row.get(column) or '')))
+    raise ValueError(f"Unsupported operator in stand-in or filter: {operator}")
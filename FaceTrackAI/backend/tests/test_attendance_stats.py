@@ -0,0 +1,132 @@
+"""The attendance summary tables against recounts of the rows they summarize"""
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from database_service import DatabaseService
+
+SESSION_COUNTS = '''
+SELECT a.session_id, ses.date, COUNT(*) FROM attendance a
+LEFT JOIN sessions ses ON a.session_id = ses.id
+GROUP BY a.session_id ORDER BY a.session_id
+'''
+MONTHLY_COUNTS = '''
+SELECT a.student_id, COALESCE(substr(ses.date, 1, 7), ''), COUNT(*) FROM attendance a
+LEFT JOIN sessions ses ON a.session_id = ses.id
+GROUP BY 1, 2 ORDER BY 1, 2
+'''
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseService(str(tmp_path / 'attendance.db'))
+    db.init_db()
+    return db
+
+@pytest.fixture
+def history(db):
+    """Forty students attending a seeded random selection of sixty sessions over 2023"""
+    rng = random.Random(27)
+    students = [db.add_student({
+        'student_id': f'M{number}', 'name': f'Student {number}', 'email': None, 'course': 'Physics',
+        'registration_date': '2023-01-01T00:00:00', 'status': 'active'
+    }) for number in range(40)]
+    sessions = []
+    for _ in range(60):
+        day = date(2023, 1, 1) + timedelta(days=rng.randrange(365))
+        session_id = db.add_session({'name': f'Lab {day}', 'date': day.isoformat()})
+        sessions.append(session_id)
+        db.add_attendance_batch([
+            {'student_id': student, 'session_id': session_id, 'timestamp': f'{day}T14:00:00', 'status': 'present'}
+            for student in rng.sample(students, rng.randrange(1, 6))
+        ])
+    return students, sessions
+
+def summaries(db):
+    conn = sqlite3.connect(db.db_file)
+    tables = (
+        conn.execute('SELECT session_id, date, count FROM attendance_session_stats WHERE count > 0 ORDER BY session_id').fetchall(),
+        conn.execute('SELECT student_id, month, count FROM attendance_student_monthly WHERE count > 0 ORDER BY student_id, month').fetchall()
+    )
+    conn.close()
+    return tables
+
+def recounts(db):
+    conn = sqlite3.connect(db.db_file)
+    counts = conn.execute(SESSION_COUNTS).fetchall(), conn.execute(MONTHLY_COUNTS).fetchall()
+    conn.close()
+    return counts
+
+def execute(db, sql, params=()):
+    conn = db.get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+def test_inserts_are_counted(db, history):
+    assert summaries(db) == recounts(db)
+
+def test_deleted_attendance_and_sessions_are_uncounted(db, history):
+    _, sessions = history
+    execute(db, 'DELETE FROM attendance WHERE id % 3 = 0')
+    for session_id in sessions[:10]:
+        db.delete_session(session_id)
+
+    assert summaries(db) == recounts(db)
+
+def test_moving_a_session_moves_its_attendance_between_months(db, history):
+    _, sessions = history
+    for session_id, day in zip(sessions[:15], ['2023-01-15', '2023-12-31', '2024-02-29'] * 5):
+        execute(db, 'UPDATE sessions SET date = ? WHERE id = ?', (day, session_id))
+    execute(db, 'UPDATE sessions SET date = NULL WHERE id = ?', (sessions[15],))
+
+    assert summaries(db) == recounts(db)
+
+def test_reassigned_attendance_is_recounted(db, history):
+    students, sessions = history
+    execute(db, 'UPDATE attendance SET student_id = ?, session_id = ? WHERE id % 4 = 1', (students[0], sessions[-1]))
+
+    assert summaries(db) == recounts(db)
+
+def test_rebuild_matches_the_maintained_tables(db, history):
+    _, sessions = history
+    execute(db, 'DELETE FROM attendance WHERE id % 5 = 0')
+    execute(db, 'UPDATE sessions SET date = ? WHERE id = ?', ('2023-06-30', sessions[0]))
+    maintained = summaries(db)
+
+    db.rebuild_attendance_stats()
+
+    assert summaries(db) == maintained == recounts(db)
+
+def test_deleting_an_archived_session_updates_the_monthly_counts(db, history):
+    _, sessions = history
+    db.rotate_term('2023-h1', '2023-01-01', '2023-06-30')
+    conn = sqlite3.connect(db.db_file)
+    archived = conn.execute("SELECT id FROM sessions WHERE date <= '2023-06-30' ORDER BY id").fetchall()
+    conn.close()
+
+    db.delete_session(archived[0][0])
+    maintained = summaries(db)
+    db.rebuild_attendance_stats()
+
+    assert summaries(db) == maintained
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2023-01-01', '2023-12-31'),
+    ('2023-02-14', '2023-02-20'),
+    ('2023-02-14', '2023-09-03'),
+    ('2023-03-01', '2023-05-17'),
+    ('2023-03-18', '2023-05-31'),
+    ('2023-11-05', None),
+    (None, '2023-04-09'),
+    ('2023-07-31', '2023-08-01'),
+    ('2023-05-10', '2023-05-10'),
+    (None, None)
+])
+def test_student_totals_match_a_raw_count(db, history, start_date, end_date):
+    cursor = db.get_connection().cursor()
+    raw = db.scan_range_students(cursor, start_date, end_date)
+
+    assert db.count_range_students(cursor, start_date, end_date) == raw
+    assert db.get_attendance_stats(start_date, end_date)['total_students'] == raw
@@ -0,0 +1,117 @@
+import time
+import threading
+
+import pytest
+
+from attendance_writer import AttendanceWriter
+
+class RecordingStorage:
+    """Keeps written attendance in a list; a batch holding student_id 'bad' fails"""
+
+    def __init__(self):
+        self.rows = []
+        self.batches = []
+        self.committing = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def add_attendance_batch(self, records):
+        self.committing.set()
+        self.gate.wait()
+        if any(record['student_id'] == 'bad' for record in records):
+            raise ValueError('FOREIGN KEY constraint failed')
+        self.batches.append(len(records))
+        return [self.add(record) for record in records]
+
+    def add_attendance(self, record):
+        if record['student_id'] == 'bad':
+            raise ValueError('FOREIGN KEY constraint failed')
+        return self.add(record)
+
+    def add(self, record):
+        self.rows.append(record)
+        return len(self.rows)
+
+@pytest.fixture
+def storage():
+    return RecordingStorage()
+
+@pytest.fixture
+def writer(storage):
+    writer = AttendanceWriter(storage, delay=0.05)
+    writer.start()
+    yield writer
+    storage.gate.set()
+    writer.stop()
+
+def check_in(student_id):
+    return {'student_id': student_id, 'session_id': 1, 'timestamp': '2024-01-02T09:00:00', 'status': 'present'}
+
+def submit_all(writer, student_ids, timeout=5):
+    results = {}
+
+    def submit(student_id):
+        try:
+            results[student_id] = writer.submit(check_in(student_id), timeout=timeout)
+        except Exception as e:
+            results[student_id] = e
+
+    threads = [threading.Thread(target=submit, args=(student_id,)) for student_id in student_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_check_ins_share_a_commit(writer, storage):
+    results = submit_all(writer, range(20))
+
+    assert sorted(results.values()) == list(range(1, 21))
+    assert len(storage.batches) < 20
+    assert writer.get_stats()['events'] == 20
+
+def test_submit_returns_its_own_record_id(writer, storage):
+    results = submit_all(writer, ['a', 'b', 'c'])
+
+    assert {student_id: storage.rows[row_id - 1]['student_id'] for student_id, row_id in results.items()} == {
+        'a': 'a', 'b': 'b', 'c': 'c'
+    }
+
+def test_bad_record_fails_alone(writer, storage):
+    results = submit_all(writer, ['a', 'bad', 'c'])
+
+    assert isinstance(results['bad'], ValueError)
+    assert sorted(row['student_id'] for row in storage.rows) == ['a', 'c']
+    assert writer.get_stats()['failed'] == 1
+
+def test_timed_out_check_in_is_never_written(writer, storage):
+    # The writer is stuck committing the first event, so the second waits in the queue
+    storage.gate.clear()
+    first = threading.Thread(target=writer.submit, args=(check_in('first'),))
+    first.start()
+    storage.committing.wait()
+
+    with pytest.raises(TimeoutError):
+        writer.submit(check_in('late'), timeout=0.1)
+
+    storage.gate.set()
+    first.join()
+    # A retry of the late check-in is the only copy written
+    writer.submit(check_in('late'))
+
+    assert [row['student_id'] for row in storage.rows] == ['first', 'late']
+    assert writer.get_stats()['abandoned'] == 1
+
+def test_stop_commits_the_open_batch_at_once(storage):
+    writer = AttendanceWriter(storage, delay=5.0)
+    writer.start()
+    waiting = threading.Thread(target=writer.submit, args=(check_in('a'),))
+    waiting.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    writer.stop()
+    waiting.join()
+
+    assert [row['student_id'] for row in storage.rows] == ['a']
+    assert time.monotonic() - started < 1.0
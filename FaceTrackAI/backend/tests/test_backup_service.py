@@ -0,0 +1,22 @@
+import os
+import threading
+
+from backup_service import BackupService
+from database_service import DatabaseService
+
+def test_only_one_of_concurrent_starts_runs(tmp_path):
+    db_file = str(tmp_path / 'attendance.db')
+    DatabaseService(db_file).init_db()
+    backups = BackupService(db_file, str(tmp_path / 'backups'))
+    started = []
+
+    threads = [threading.Thread(target=lambda: started.append(backups.start_backup())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    backups.thread.join()
+
+    assert sorted(started) == [False] * 7 + [True]
+    assert backups.last_backup['status'] == 'ok'
+    assert len(os.listdir(tmp_path / 'backups')) == 1
@@ -0,0 +1,111 @@
+"""Loading whole embedding galleries from Supabase with concurrent range requests"""
+import json
+import time
+import threading
+
+import pytest
+
+import supabase_service as supabase_module
+from conftest import connect_standin
+from supabase_standin import StandInClient
+
+GALLERY_SIZE = 1234
+
+class CappedClient(StandInClient):
+    """A stand-in whose server returns at most max_rows rows per request, like PostgREST's db-max-rows"""
+
+    def __init__(self, max_rows, delay=0.0):
+        super().__init__()
+        self.max_rows = max_rows
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def table(self, name):
+        query = super().table(name)
+        execute = query.execute
+
+        def capped_execute():
+            if query.window:
+                start, end = query.window
+                query.window = (start, min(end, start + self.max_rows - 1))
+            with self.lock:
+                self.in_flight += 1
+                self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            try:
+                time.sleep(self.delay)
+                return execute()
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+
+        query.execute = capped_execute
+        return query
+
+def enrol(client, count, first=1):
+    for student_id in range(first, first + count):
+        client.insert_row('voice_embeddings', {
+            'student_id': student_id,
+            'embedding_data': json.dumps({'embedding': [student_id / 10]})
+        })
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(supabase_module, 'EMBEDDING_PAGE_SIZE', 250)
+    monkeypatch.setattr(supabase_module, 'EMBEDDING_FETCH_WORKERS', 3)
+
+def test_capped_pages_are_followed_up_in_id_order(monkeypatch):
+    client = CappedClient(max_rows=100)
+    enrol(client, GALLERY_SIZE)
+    service = connect_standin(client, monkeypatch)
+
+    rows = service.get_voice_embeddings()
+
+    assert [row['student_id'] for row in rows] == list(range(1, GALLERY_SIZE + 1))
+    assert set(rows[0]) == {'student_id', 'embedding_data'}
+
+def test_ranges_are_fetched_concurrently_within_the_pool(monkeypatch):
+    client = CappedClient(max_rows=1000, delay=0.02)
+    enrol(client, GALLERY_SIZE)
+    service = connect_standin(client, monkeypatch)
+
+    service.get_voice_embeddings()
+
+    assert 1 < client.most_in_flight <= 3
+
+def test_pages_stream_to_the_callback_with_progress(monkeypatch):
+    client = StandInClient()
+    enrol(client, GALLERY_SIZE)
+    service = connect_standin(client, monkeypatch)
+    pages, progress = [], []
+
+    loaded = service.get_voice_embeddings(on_page=pages.append, progress=lambda *step: progress.append(step))
+
+    assert loaded == GALLERY_SIZE
+    assert max(len(page) for page in pages) == 250
+    assert sorted(row['student_id'] for page in pages for row in page) == list(range(1, GALLERY_SIZE + 1))
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+    assert progress[-1] == (GALLERY_SIZE, GALLERY_SIZE)
+
+def test_rows_enrolled_during_the_load_are_included(monkeypatch):
+    client = StandInClient()
+    enrol(client, 500)
+    service = connect_standin(client, monkeypatch)
+
+    def enrol_more(loaded, total):
+        # Another kiosk enrols students after the row count was read
+        if loaded == 250:
+            enrol(client, 30, first=501)
+
+    rows = service.get_voice_embeddings(progress=enrol_more)
+
+    assert len(rows) == 530
+
+def test_empty_gallery_costs_the_count_and_one_sweep(monkeypatch):
+    client = StandInClient()
+    service = connect_standin(client, monkeypatch)
+    client.requests.clear()
+
+    assert service.get_face_encodings() == []
+    assert client.requests == [('face_encodings', 'select'), ('face_encodings', 'select')]
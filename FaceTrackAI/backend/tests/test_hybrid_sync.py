@@ -0,0 +1,226 @@
+import json
+import threading
+
+import pytest
+
+from database_service import DatabaseService
+from hybrid_service import HybridService
+
+STUDENT = {
+    'student_id': 'S1',
+    'name': 'Ada Lovelace',
+    'email': 'ada@example.edu',
+    'course': 'Mathematics',
+    'registration_date': '2024-01-01T00:00:00',
+    'status': 'active'
+}
+
+def attendance(student_id, session_id, minute=0):
+    return {
+        'student_id': student_id,
+        'session_id': session_id,
+        'timestamp': f'2024-01-02T09:{minute:02d}:00',
+        'status': 'present'
+    }
+
+@pytest.fixture
+def hybrid(supabase_service, tmp_path):
+    hybrid = HybridService(supabase_service, DatabaseService(str(tmp_path / 'replica.db')))
+    hybrid.init_db()
+    return hybrid
+
+@pytest.fixture
+def roster(hybrid):
+    student_id = hybrid.add_student(STUDENT)
+    session_id = hybrid.add_session({'name': 'Lecture 1', 'date': '2024-01-02'})
+    return student_id, session_id
+
+def local_attendance(hybrid):
+    conn = hybrid.local.get_connection()
+    rows = [dict(row) for row in conn.execute('SELECT * FROM attendance ORDER BY id')]
+    conn.close()
+    return rows
+
+def test_offline_attendance_is_queued_and_served_locally(hybrid, roster, standin):
+    student_id, session_id = roster
+    standin.offline = True
+
+    attendance_id = hybrid.add_attendance(attendance(student_id, session_id))
+
+    assert attendance_id < 0
+    assert hybrid.get_attendance_by_student_session(student_id, session_id)['id'] == attendance_id
+    assert hybrid.sync_once() == (0, 0)
+    assert hybrid.get_sync_status()['pending'] == 1
+    assert standin.rows('attendance') == []
+
+def test_queue_drains_when_back_online(hybrid, roster, standin):
+    student_id, session_id = roster
+    standin.offline = True
+    hybrid.add_attendance_batch([attendance(student_id, session_id, minute) for minute in range(3)])
+
+    standin.offline = False
+    pushed, _ = hybrid.sync_once()
+
+    remote_ids = sorted(row['id'] for row in standin.rows('attendance'))
+    assert pushed == 3
+    assert hybrid.get_sync_status()['pending'] == 0
+    assert [row['id'] for row in local_attendance(hybrid)] == remote_ids
+
+def test_replayed_push_does_not_duplicate(hybrid, roster, standin):
+    student_id, session_id = roster
+    hybrid.add_attendance(attendance(student_id, session_id))
+
+    # Supabase applies the batch upsert but the kiosk never sees the response, so the row is sent again
+    standin.fail_after_write = True
+    hybrid.sync_once()
+    assert standin.requests.count(('attendance', 'upsert')) == 2
+
+    hybrid.sync_once()
+
+    assert len(standin.rows('attendance')) == 1
+    assert hybrid.get_sync_status()['pending'] == 0
+    assert [row['id'] for row in local_attendance(hybrid)] == [standin.rows('attendance')[0]['id']]
+
+def test_conflicting_attendance_defers_to_the_remote_row(hybrid, roster, standin):
+    student_id, session_id = roster
+    standin.unique_keys['attendance'].append(('student_id', 'session_id'))
+
+    # Another kiosk marked the same student while this one was offline
+    standin.table('attendance').insert({**attendance(student_id, session_id, 5), 'client_key': 'other-kiosk'}).execute()
+    standin.offline = True
+    hybrid.add_attendance(attendance(student_id, session_id))
+
+    standin.offline = False
+    hybrid.sync_once()
+
+    rows = local_attendance(hybrid)
+    assert hybrid.get_sync_status()['pending'] == 0
+    assert [(row['id'], row['client_key']) for row in rows] == [(standin.rows('attendance')[0]['id'], 'other-kiosk')]
+
+def test_placeholder_ids_are_unique_across_writers(hybrid, roster):
+    student_id, session_id = roster
+    # A second backend over the same replica file stands in for another process
+    other = HybridService(hybrid.remote, DatabaseService(hybrid.local.db_file))
+    ids, errors = [], []
+
+    def record(storage):
+        try:
+            for minute in range(20):
+                ids.extend(storage.add_attendance_batch([attendance(student_id, session_id, minute)] * 3))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=record, args=(storage,)) for storage in (hybrid, other)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(ids) == len(set(ids)) == 120
+
+def test_edits_in_place_reach_the_replica(hybrid, roster, standin):
+    student_id, _ = roster
+    changes = []
+    hybrid.add_change_listener(lambda table, rows, deleted: changes.append((table, rows, deleted)))
+    hybrid.save_face_encoding(student_id, json.dumps([0.1]))
+    hybrid.sync_once()
+    changes.clear()
+
+    # Another kiosk re-enrols the face and renames the student; Supabase keeps the row ids
+    hybrid.remote.save_face_encoding(student_id, json.dumps([0.9]))
+    hybrid.remote.update_student(student_id, {'name': 'Ada King'})
+    hybrid.sync_once()
+
+    assert hybrid.get_student_by_id(student_id)['name'] == 'Ada King'
+    assert hybrid.get_face_encodings() == [{'student_id': student_id, 'encoding_data': '[0.9]'}]
+    assert any(table == 'face_encodings' and rows[0]['encoding_data'] == '[0.9]' for table, rows, _ in changes)
+
+def test_remote_deletes_reach_the_replica(hybrid, roster, standin):
+    student_id, session_id = roster
+    hybrid.save_voice_embedding(student_id, json.dumps({'embedding': [0.1]}))
+    hybrid.add_attendance(attendance(student_id, session_id))
+    hybrid.sync_once()
+    changes = []
+    hybrid.add_change_listener(lambda table, rows, deleted: changes.append((table, deleted)))
+
+    hybrid.remote.delete_session(session_id)
+    hybrid.remote.delete_student(student_id)
+    hybrid.sync_once()
+
+    assert hybrid.get_student_by_id(student_id) is None
+    assert hybrid.get_session_by_id(session_id) is None
+    assert hybrid.get_voice_embeddings() == []
+    assert local_attendance(hybrid) == []
+    assert ('students', [student_id]) in changes
+
+def test_reenrolment_after_delete_is_kept(hybrid, roster):
+    student_id, _ = roster
+    hybrid.save_voice_embedding(student_id, '{"embedding": [0.1]}')
+    hybrid.sync_once()
+
+    # Deleted and enrolled again between two pulls: the tombstone must not remove the new row
+    hybrid.remote.delete_voice_embedding(student_id)
+    hybrid.remote.save_voice_embedding(student_id, '{"embedding": [0.2]}')
+    hybrid.sync_once()
+
+    assert hybrid.get_voice_embeddings() == [{'student_id': student_id, 'embedding_data': '{"embedding": [0.2]}'}]
+
+def test_full_pull_drops_rows_deleted_without_tombstones(hybrid, roster, standin):
+    student_id, session_id = roster
+    hybrid.add_attendance(attendance(student_id, session_id))
+    hybrid.sync_once()
+
+    # Deleted before change tracking was installed, so no tombstone exists
+    standin.track_changes = False
+    hybrid.remote.delete_student(student_id)
+    hybrid.sync_once()
+    assert hybrid.get_student_by_id(student_id) is not None
+
+    hybrid.sync_once(full=True)
+
+    assert hybrid.get_student_by_id(student_id) is None
+    assert hybrid.get_session_by_id(session_id) is not None
+    assert hybrid.get_sync_status()['last_full_sync'] is not None
+
+def test_pull_pages_through_rows_sharing_a_stamp(hybrid, roster, standin):
+    student_id, session_id = roster
+    hybrid.sync_once()
+
+    # A bulk import in one transaction stamps every row alike, more than a page of them
+    rows = [standin.insert_row('attendance', attendance(student_id, session_id)) for _ in range(1234)]
+    for row in rows:
+        row['updated_at'] = rows[0]['updated_at']
+
+    hybrid.sync_once()
+
+    assert sorted(row['id'] for row in local_attendance(hybrid)) == sorted(row['id'] for row in rows)
+
+def test_attendance_for_a_session_deleted_upstream_is_dead_lettered(hybrid, roster, standin):
+    student_id, session_id = roster
+    standin.offline = True
+    hybrid.add_attendance(attendance(student_id, session_id))
+
+    # An administrator deletes the session while the kiosk is offline
+    standin.offline = False
+    hybrid.remote.delete_session(session_id)
+    hybrid.sync_once()
+    standin.requests.clear()
+    hybrid.sync_once()
+
+    status = hybrid.get_sync_status()
+    assert (status['pending'], status['dead_letters'], status['last_error']) == (0, 1, None)
+    assert ('attendance', 'upsert') not in standin.requests
+    assert local_attendance(hybrid) == []
+
+def test_reports_filter_by_course(hybrid, roster):
+    student_id, session_id = roster
+    hybrid.add_attendance(attendance(student_id, session_id))
+
+    rows, stats = hybrid.get_attendance_report(course='Mathematics')
+
+    assert [row['student_id'] for row in rows] == ['S1']
+    assert stats['total_records'] == 1
+    assert hybrid.get_attendance_stats(course='History')['total_records'] == 0
+    assert hybrid.get_daily_attendance_stats(course='History') == []
+    assert list(hybrid.iter_attendance_report(course='History')) == []
@@ -0,0 +1,84 @@
+import io
+import threading
+
+from conftest import synthetic_voice, wav_bytes
+from phrase_index import PhraseIndex, load_rotation_secret
+from storage_backend import DEFAULT_SETTINGS
+from transcription_service import StubTranscriptionBackend, TranscriptionQueue
+
+def test_every_session_rules_a_default_phrase_out():
+    phrase_index = PhraseIndex(DEFAULT_SETTINGS['verification_phrases'], 'secret')
+    phrases = len(phrase_index.phrases)
+
+    choices = {tuple(phrase_index.session_phrases(session_id)) for session_id in range(50)}
+
+    assert phrase_index.rotates
+    assert all(len(choice) == phrases - 1 for choice in choices)
+    assert len(choices) > 1
+
+def test_session_choice_is_stable():
+    phrase_index = PhraseIndex(DEFAULT_SETTINGS['verification_phrases'], 'secret')
+
+    assert phrase_index.session_phrases(7) == PhraseIndex(DEFAULT_SETTINGS['verification_phrases'], 'secret').session_phrases(7)
+
+def test_replayed_phrase_fails_in_a_session_without_it():
+    phrase_index = PhraseIndex(DEFAULT_SETTINGS['verification_phrases'], 'secret')
+    session_id = next(session_id for session_id in range(50) if 0 not in phrase_index.session_phrases(session_id))
+
+    _, anywhere = phrase_index.best_match(phrase_index.phrases[0])
+    _, in_session = phrase_index.best_match(phrase_index.phrases[0], phrase_index.session_phrases(session_id))
+
+    assert anywhere == 1.0
+    assert in_session < 1.0
+
+def test_single_phrase_does_not_rotate():
+    phrase_index = PhraseIndex(['i am present'])
+
+    assert not phrase_index.rotates
+    assert phrase_index.session_phrases(1) == [0]
+
+def test_configured_secret_wins(tmp_path):
+    assert load_rotation_secret(str(tmp_path / 'secret'), 'configured') == 'configured'
+    assert not (tmp_path / 'secret').exists()
+
+def test_generated_secret_is_kept_across_restarts(tmp_path):
+    path = str(tmp_path / 'secret')
+
+    secret = load_rotation_secret(path)
+
+    assert len(secret) == 32
+    assert load_rotation_secret(path) == secret
+    assert load_rotation_secret(str(tmp_path / 'other')) != secret
+
+def test_concurrent_starts_agree_on_one_secret(tmp_path):
+    path = str(tmp_path / 'secret')
+    secrets = []
+
+    threads = [threading.Thread(target=lambda: secrets.append(load_rotation_secret(path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(secrets)) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['secret']
+
+def verify_without_session(client):
+    return client.post('/api/recognition/verify-voice', data={
+        'student_id': '1',
+        'voice_sample': (io.BytesIO(wav_bytes(synthetic_voice(120, (700, 1200, 2600)))), 'blob', 'audio/wav')
+    }, content_type='multipart/form-data')
+
+def test_session_is_optional_without_a_transcriber(backend_app, client):
+    assert backend_app.services.get('voice').transcriber is None
+
+    assert verify_without_session(client).status_code != 400
+
+def test_session_is_required_while_phrases_are_checked(backend_app, client, monkeypatch):
+    voice_service = backend_app.services.get('voice')
+    monkeypatch.setattr(voice_service, 'transcriber', TranscriptionQueue(StubTranscriptionBackend('hello')))
+
+    response = verify_without_session(client)
+
+    assert response.status_code == 400
+    assert 'Session ID is required' in response.json['message']
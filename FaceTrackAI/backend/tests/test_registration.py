@@ -0,0 +1,89 @@
+"""Student registration through the Flask app, with the form the registration page posts"""
+import io
+import os
+import base64
+
+import pytest
+from PIL import Image
+
+from conftest import synthetic_voice, wav_bytes
+
+def registration_form(student_id, audio):
+    # The page sends the canvas as base64 JPEG and the recording as an unnamed Blob
+    snapshot = io.BytesIO()
+    Image.new('RGB', (320, 240), (180, 140, 120)).save(snapshot, format='JPEG')
+    return {
+        'student_id': student_id,
+        'name': 'Katherine Johnson',
+        'email': f'{student_id.lower()}@example.edu',
+        'course': 'Mathematics',
+        'face_image': base64.b64encode(snapshot.getvalue()).decode(),
+        'voice_sample': (io.BytesIO(audio), 'blob', 'audio/wav')
+    }
+
+def post_registration(client, student_id, audio):
+    return client.post('/api/students/register', data=registration_form(student_id, audio),
+                       content_type='multipart/form-data')
+
+@pytest.fixture
+def recording():
+    return wav_bytes(synthetic_voice(180, (500, 1500, 2500)))
+
+def test_registration_saves_every_part(backend_app, client, recording):
+    response = post_registration(client, 'R200', recording)
+
+    assert response.status_code == 200, response.json
+    student_id = response.json['student_id']
+
+    student = client.get(f'/api/students/{student_id}').json['student']
+    assert (student['student_id'], student['course']) == ('R200', 'Mathematics')
+
+    face_service = backend_app.services.get('face')
+    voice_service = backend_app.services.get('voice')
+    voice_store = backend_app.services.get('voice_store')
+    assert student_id in face_service.face_encodings_db
+    assert student_id in voice_service.voice_embeddings_db
+    assert os.path.exists(os.path.join(face_service.face_db_dir, f'{student_id}.jpg'))
+    assert voice_store.read(student_id)
+
+def test_duplicate_student_id_is_refused(client, recording):
+    assert post_registration(client, 'R201', recording).status_code == 200
+
+    response = post_registration(client, 'R201', recording)
+
+    assert response.status_code == 400
+    assert 'already exists' in response.json['message']
+
+def test_failed_registration_leaves_no_student(backend_app, client, recording, monkeypatch):
+    def full_disk(student_id, source):
+        raise OSError('No space left on device')
+    monkeypatch.setattr(backend_app.services.get('voice_store'), 'save', full_disk)
+
+    response = post_registration(client, 'R202', recording)
+
+    assert response.status_code == 500
+    assert 'No space left on device' in response.json['message']
+    assert backend_app.services.get('storage').get_student_by_student_id('R202') is None
+
+def test_failed_cleanup_keeps_the_registration_error(backend_app, client, recording, monkeypatch):
+    def full_disk(student_id, source):
+        raise OSError('No space left on device')
+    def locked(student_id):
+        raise OSError('Permission denied')
+    voice_store = backend_app.services.get('voice_store')
+    monkeypatch.setattr(voice_store, 'save', full_disk)
+    monkeypatch.setattr(voice_store, 'delete', locked)
+
+    response = post_registration(client, 'R203', recording)
+
+    assert response.status_code == 500
+    assert 'No space left on device' in response.json['message']
+    # The cleanups after the failed one still ran
+    assert backend_app.services.get('storage').get_student_by_student_id('R203') is None
+
+def test_too_short_recording_registers_nobody(backend_app, client):
+    response = post_registration(client, 'R204', wav_bytes(synthetic_voice(180, (500, 1500, 2500), seconds=0.2)))
+
+    assert response.status_code == 500
+    assert 'Not enough speech' in response.json['message']
+    assert backend_app.services.get('storage').get_student_by_student_id('R204') is None
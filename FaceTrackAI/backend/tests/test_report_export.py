@@ -0,0 +1,110 @@
+"""CSV exports from /api/reports/export: content, compression, ranges and validators"""
+import csv
+import io
+import gzip
+import itertools
+
+import pytest
+
+students = itertools.count(1)
+
+@pytest.fixture
+def storage(backend_app):
+    return backend_app.services.get('storage')
+
+@pytest.fixture
+def lecture(storage):
+    """A session of its own, so each test's export holds only its own rows"""
+    number = next(students)
+    session_id = storage.add_session({'name': f'Lecture {number}', 'date': '2024-03-04'})
+    student_id = storage.add_student({
+        'student_id': f'E{number}', 'name': 'Hopper, Grace "Amazing Grace"', 'email': f'e{number}@example.edu',
+        'course': 'Computing', 'registration_date': '2024-01-01T00:00:00', 'status': 'active'
+    })
+    storage.add_attendance({'student_id': student_id, 'session_id': session_id,
+                            'timestamp': '2024-03-04T09:15:00', 'status': 'present'})
+    return session_id, student_id
+
+def export(client, session_id, **headers):
+    return client.get('/api/reports/export', query_string={'session_id': session_id}, headers=headers)
+
+def execute(storage, sql, params):
+    conn = storage.get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+def test_names_with_commas_and_quotes_survive(client, lecture):
+    session_id, _ = lecture
+
+    response = export(client, session_id)
+
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['Date', 'Session', 'Student ID', 'Student Name', 'Time', 'Status']
+    assert rows[1][3] == 'Hopper, Grace "Amazing Grace"'
+    assert rows[1][4] == '09:15:00'
+
+def test_attendance_without_a_timestamp_has_an_empty_time(client, storage, lecture):
+    session_id, student_id = lecture
+    storage.add_attendance({'student_id': student_id, 'session_id': session_id, 'timestamp': None, 'status': 'excused'})
+
+    response = export(client, session_id)
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert sorted(row[4] for row in rows[1:]) == ['', '09:15:00']
+
+def test_gzip_export_has_its_own_validator(client, lecture):
+    session_id, _ = lecture
+    plain = export(client, session_id)
+
+    compressed = export(client, session_id, **{'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert compressed.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert export(client, session_id, **{'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']}).status_code == 304
+
+def test_range_resumes_the_same_version(client, lecture):
+    session_id, _ = lecture
+    full = export(client, session_id)
+    body = full.get_data()
+
+    partial = export(client, session_id, Range='bytes=10-29', **{'If-Range': full.headers['ETag']})
+
+    assert partial.status_code == 206
+    assert partial.get_data() == body[10:30]
+    assert partial.headers['Content-Range'] == f'bytes 10-29/{len(body)}'
+    assert export(client, session_id, Range=f'bytes={len(body)}-').status_code == 416
+
+@pytest.mark.parametrize('change', ['rename student', 'rename session', 'delete and reinsert'])
+def test_any_report_change_invalidates_the_range(client, storage, lecture, change):
+    session_id, student_id = lecture
+    before = export(client, session_id)
+
+    if change == 'rename student':
+        storage.update_student(student_id, {'name': 'Grace Brewster Hopper'})
+    elif change == 'rename session':
+        execute(storage, 'UPDATE sessions SET name = ? WHERE id = ?', ('Lecture (moved)', session_id))
+    else:
+        # SQLite hands the freed id straight back out, so id ranges cannot see this
+        execute(storage, 'DELETE FROM attendance WHERE session_id = ?', (session_id,))
+        storage.add_attendance({'student_id': student_id, 'session_id': session_id,
+                                'timestamp': '2024-03-04T09:45:00', 'status': 'late'})
+
+    resumed = export(client, session_id, Range='bytes=10-29', **{'If-Range': before.headers['ETag']})
+
+    assert resumed.headers['ETag'] != before.headers['ETag']
+    assert resumed.status_code == 200
+    assert resumed.get_data() != before.get_data()
+
+def test_backend_without_a_version_serves_whole_exports(client, storage, lecture, monkeypatch):
+    session_id, _ = lecture
+    monkeypatch.setattr(storage, 'get_attendance_version', lambda: None)
+
+    response = export(client, session_id, Range='bytes=0-9')
+
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert response.headers['Accept-Ranges'] == 'none'
+    assert response.get_data().startswith(b'Date,Session')
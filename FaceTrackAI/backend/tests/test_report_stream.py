@@ -0,0 +1,125 @@
+"""Report rows fetched and sent a chunk at a time: iter_attendance_report and /api/reports/stream"""
+import json
+
+import pytest
+
+from database_service import DatabaseService
+
+ROW_COUNT = 5000
+
+def report_row(index):
+    return {
+        'id': index, 'timestamp': '2024-03-04T09:00:00', 'status': 'present',
+        'student_id': f'S{index}', 'student_name': f'Student {index}',
+        'session_id': 1, 'session_name': 'Lecture', 'date': '2024-03-04'
+    }
+
+class CountingReport:
+    """Stands in for iter_attendance_report, counting how far the response has read it"""
+
+    def __init__(self, count=ROW_COUNT, error=None):
+        self.count = count
+        self.error = error
+        self.produced = 0
+
+    def __call__(self, *filters):
+        if self.error:
+            raise self.error
+        for index in range(self.count):
+            self.produced += 1
+            yield report_row(index)
+
+class RecordingConnection:
+    """Passes through to a sqlite3 connection, noting the size of every fetchmany on its cursors"""
+
+    def __init__(self, conn, fetches):
+        self.conn = conn
+        self.fetches = fetches
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def cursor(self):
+        return RecordingCursor(self.conn.cursor(), self.fetches)
+
+class RecordingCursor:
+    def __init__(self, cursor, fetches):
+        self.cursor = cursor
+        self.fetches = fetches
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def fetchmany(self, size):
+        self.fetches.append(size)
+        return self.cursor.fetchmany(size)
+
+@pytest.fixture
+def report(backend_app, monkeypatch):
+    report = CountingReport()
+    monkeypatch.setattr(backend_app.services.get('storage'), 'iter_attendance_report', report)
+    return report
+
+def test_cursor_is_read_in_chunks(tmp_path, monkeypatch):
+    db = DatabaseService(str(tmp_path / 'attendance.db'))
+    db.init_db()
+    session_id = db.add_session({'name': 'Lecture', 'date': '2024-03-04'})
+    for number in range(7):
+        student_id = db.add_student({
+            'student_id': f'S{number}', 'name': f'Student {number}', 'email': f's{number}@example.edu',
+            'course': 'Computing', 'registration_date': '2024-01-01', 'status': 'active'
+        })
+        db.add_attendance({'student_id': student_id, 'session_id': session_id,
+                           'timestamp': f'2024-03-04T09:0{number}:00', 'status': 'present'})
+
+    expected = db.get_attendance_report()[0]
+
+    fetches = []
+    connect = db.get_connection
+    monkeypatch.setattr(db, 'get_connection', lambda: RecordingConnection(connect(), fetches))
+
+    rows = db.iter_attendance_report(chunk_size=3)
+    first = next(rows)
+    assert fetches == [3]
+
+    # The rest follow in order, three at a time, until an empty fetch
+    assert [first] + list(rows) == expected
+    assert fetches == [3, 3, 3, 3]
+
+def test_json_array_is_sent_before_the_report_is_read(client, report):
+    response = client.get('/api/reports/stream', buffered=False)
+    chunks = iter(response.response)
+
+    first = next(chunks)
+
+    assert response.mimetype == 'application/json'
+    assert first.startswith(b'[{')
+    assert report.produced < ROW_COUNT
+
+    body = first + b''.join(chunks)
+    assert json.loads(body) == [report_row(index) for index in range(ROW_COUNT)]
+
+def test_ndjson_has_one_row_per_line(client, report):
+    response = client.get('/api/reports/stream', query_string={'format': 'ndjson'})
+
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(lines) == ROW_COUNT
+    assert json.loads(lines[-1]) == report_row(ROW_COUNT - 1)
+
+def test_empty_report_is_an_empty_array(client, report):
+    report.count = 0
+
+    assert client.get('/api/reports/stream').get_json() == []
+    assert client.get('/api/reports/stream', query_string={'format': 'ndjson'}).get_data() == b''
+
+def test_query_failure_is_an_error_response_not_a_cut_off_body(client, report):
+    report.error = ConnectionError('Supabase unreachable')
+
+    response = client.get('/api/reports/stream')
+
+    assert response.status_code == 500
+    assert 'Supabase unreachable' in response.get_json()['message']
+
+def test_unknown_format_is_refused(client, report):
+    assert client.get('/api/reports/stream', query_string={'format': 'xml'}).status_code == 400
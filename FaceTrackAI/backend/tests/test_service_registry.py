@@ -0,0 +1,47 @@
+import pytest
+
+from service_registry import ServiceRegistry
+
+def test_ready_callbacks_run_after_a_failed_construction_is_retried():
+    registry = ServiceRegistry()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("gallery not reachable")
+        return object()
+
+    registry.register('voice', factory)
+    ready = []
+    registry.on_ready('voice', ready.append)
+
+    with pytest.raises(RuntimeError):
+        registry.get('voice')
+    assert ready == [] and registry.get_if_ready('voice') is None
+
+    voice = registry.get('voice')
+
+    assert ready == [voice]
+    assert registry.get_if_ready('voice') is voice
+
+def test_late_ready_callback_runs_at_once():
+    registry = ServiceRegistry()
+    registry.register('face', object)
+    face = registry.get('face')
+    ready = []
+
+    registry.on_ready('face', ready.append)
+
+    assert ready == [face]
+
+def test_failing_ready_callback_does_not_fail_the_service():
+    registry = ServiceRegistry()
+    registry.register('face', object)
+
+    def broken(service):
+        raise ValueError("bad settings")
+    registry.on_ready('face', broken)
+
+    assert registry.get('face') is not None
+    assert registry.get_status()['services']['face']['state'] == 'ready'
@@ -0,0 +1,112 @@
+"""The sessions list with attendance counts: one query or request per page, on both backends"""
+import pytest
+
+from conftest import connect_standin
+from database_service import DatabaseService
+from supabase_standin import StandInClient
+
+# Created oldest first, so newest-first order is the same by date and by creation
+DATES = ['2024-02-01', '2024-02-02', '2024-02-03', '2024-02-04', '2024-02-05']
+
+class StatementCounter:
+    """Counts the SQL statements a DatabaseService runs, across all its connections"""
+
+    def __init__(self, db, monkeypatch):
+        self.statements = []
+        connect = db.get_connection
+
+        def get_connection():
+            conn = connect()
+            conn.set_trace_callback(self.statements.append)
+            return conn
+        monkeypatch.setattr(db, 'get_connection', get_connection)
+
+    def selects(self):
+        return [sql for sql in self.statements if sql.lstrip().upper().startswith('SELECT')]
+
+def build(kind, tmp_path, monkeypatch):
+    if kind == 'sqlite':
+        storage = DatabaseService(str(tmp_path / 'attendance.db'))
+    else:
+        storage = connect_standin(StandInClient(), monkeypatch)
+    storage.init_db()
+
+    sessions = [storage.add_session({'name': f'Lecture {date}', 'date': date}) for date in DATES]
+    students = [
+        storage.add_student({'student_id': f'S{number}', 'name': f'Student {number}', 'email': f's{number}@example.edu',
+                             'course': 'Computing', 'registration_date': '2024-01-01', 'status': 'active'})
+        for number in range(4)
+    ]
+    # Session i is attended by its first i students
+    storage.add_attendance_batch([
+        {'student_id': student, 'session_id': session, 'timestamp': f'{date}T09:00:00', 'status': 'present'}
+        for index, (session, date) in enumerate(zip(sessions, DATES))
+        for student in students[:index]
+    ])
+    return storage, sessions
+
+@pytest.mark.parametrize('kind', ['sqlite', 'supabase'])
+def test_date_window_and_page(kind, tmp_path, monkeypatch):
+    storage, sessions = build(kind, tmp_path, monkeypatch)
+
+    page, total = storage.get_sessions_with_counts('2024-02-02', '2024-02-05', page=1, per_page=2)
+    rest, _ = storage.get_sessions_with_counts('2024-02-02', '2024-02-05', page=2, per_page=2)
+
+    assert total == 4
+    assert [(session['date'], session['attendance_count']) for session in page + rest] == [
+        ('2024-02-05', 4), ('2024-02-04', 3), ('2024-02-03', 2), ('2024-02-02', 1)
+    ]
+
+@pytest.mark.parametrize('kind', ['sqlite', 'supabase'])
+def test_unpaged_list_counts_sessions_without_attendance(kind, tmp_path, monkeypatch):
+    storage, sessions = build(kind, tmp_path, monkeypatch)
+
+    listed, total = storage.get_sessions_with_counts()
+
+    assert total == len(DATES)
+    assert {session['id']: session['attendance_count'] for session in listed}[sessions[0]] == 0
+
+def test_sqlite_page_is_one_select_plus_the_total(tmp_path, monkeypatch):
+    storage, _ = build('sqlite', tmp_path, monkeypatch)
+    counter = StatementCounter(storage, monkeypatch)
+
+    storage.get_sessions_with_counts(page=1, per_page=3)
+
+    assert len(counter.selects()) == 2
+    assert not any('attendance a' in sql or 'FROM attendance' in sql for sql in counter.selects())
+
+def test_supabase_page_is_one_request(tmp_path, monkeypatch):
+    client = StandInClient()
+    storage = connect_standin(client, monkeypatch)
+    storage.init_db()
+    for date in DATES:
+        storage.add_session({'name': f'Lecture {date}', 'date': date})
+    client.requests.clear()
+
+    storage.get_sessions_with_counts(page=2, per_page=2)
+
+    assert client.requests == [('sessions', 'select')]
+
+def test_counts_follow_deleted_attendance(tmp_path, monkeypatch):
+    storage, sessions = build('sqlite', tmp_path, monkeypatch)
+    conn = storage.get_connection()
+    conn.execute('DELETE FROM attendance WHERE session_id = ? AND student_id IN (SELECT id FROM students LIMIT 2)',
+                 (sessions[4],))
+    conn.commit()
+    conn.close()
+
+    counts = {session['id']: session['attendance_count'] for session in storage.get_sessions_with_counts()[0]}
+
+    assert counts[sessions[4]] == 2
+
+def test_sessions_route_passes_the_window_and_page(client):
+    for day in range(1, 4):
+        client.post('/api/sessions', json={'name': f'Archive day {day}', 'date': f'1999-01-0{day}'})
+
+    body = client.get('/api/sessions', query_string={
+        'start_date': '1999-01-01', 'end_date': '1999-01-31', 'page': 1, 'per_page': 2
+    }).get_json()
+
+    assert body['total'] == 3
+    assert [session['name'] for session in body['sessions']] == ['Archive day 3', 'Archive day 2']
+    assert all(session['attendance_count'] == 0 for session in body['sessions'])
@@ -0,0 +1,66 @@
+import threading
+
+from settings_cache import SettingsCache
+from storage_backend import DEFAULT_SETTINGS
+
+class FlakySettings:
+    """Settings storage whose reads can be made to fail or stall"""
+
+    def __init__(self):
+        self.settings = {**DEFAULT_SETTINGS, 'camera_id': 'front'}
+        self.version = 'v1'
+        self.failing = False
+        self.gate = None
+
+    def get_settings_version(self):
+        if self.gate:
+            self.gate.wait()
+        return self.version
+
+    def get_settings(self):
+        if self.failing:
+            raise ConnectionError("network down")
+        return dict(self.settings)
+
+def test_failed_read_is_retried_on_the_next_check():
+    storage = FlakySettings()
+    storage.failing = True
+    cache = SettingsCache(storage, check_interval=0)
+
+    # The defaults stand in, but are not recorded as version v1
+    assert cache.get() == DEFAULT_SETTINGS
+
+    storage.failing = False
+    assert cache.get()['camera_id'] == 'front'
+
+def test_failed_reload_keeps_the_cached_settings():
+    storage = FlakySettings()
+    cache = SettingsCache(storage, check_interval=0)
+    applied = []
+    cache.add_listener(applied.append)
+    cache.get()
+
+    storage.version, storage.failing = 'v2', True
+    storage.settings['camera_id'] = 'rear'
+    assert cache.get()['camera_id'] == 'front'
+
+    storage.failing = False
+    assert cache.get()['camera_id'] == 'rear'
+    assert [settings['camera_id'] for settings in applied] == ['front', 'rear']
+
+def test_readers_do_not_wait_for_a_version_check():
+    storage = FlakySettings()
+    cache = SettingsCache(storage, check_interval=0)
+    cache.get()
+
+    storage.gate = threading.Event()
+    checker = threading.Thread(target=cache.get)
+    checker.start()
+    while not cache.refresh_lock.locked():
+        pass
+
+    # Served from memory while the other thread's check is stalled
+    assert cache.get()['camera_id'] == 'front'
+
+    storage.gate.set()
+    checker.join()
@@ -0,0 +1,228 @@
+"""Assertions every StorageBackend must satisfy, run against each implementation
+
+The routes in app.py are written against these shapes, so a backend that
+passes here can be swapped in with STORAGE_BACKEND without touching them.
+"""
+import pytest
+
+from conftest import connect_standin
+from database_service import DatabaseService
+from storage_backend import DEFAULT_SETTINGS
+from supabase_standin import StandInClient
+
+STUDENTS = [
+    {'student_id': 'S1', 'name': 'Ada Lovelace', 'email': 'ada@example.edu', 'course': 'Mathematics'},
+    {'student_id': 'S2', 'name': 'Alan Turing', 'email': 'alan@example.edu', 'course': 'Computing'},
+    {'student_id': 'S3', 'name': 'Grace Hopper', 'email': 'grace@example.edu', 'course': 'Computing'}
+]
+
+REPORT_COLUMNS = {'id', 'timestamp', 'status', 'student_id', 'student_name', 'session_id', 'session_name', 'date'}
+
+@pytest.fixture(params=['sqlite', 'supabase'])
+def storage(request, tmp_path, monkeypatch):
+    if request.param == 'sqlite':
+        storage = DatabaseService(str(tmp_path / 'attendance.db'))
+    else:
+        storage = connect_standin(StandInClient(), monkeypatch)
+    storage.init_db()
+    return storage
+
+@pytest.fixture
+def roster(storage):
+    student_ids = [
+        storage.add_student({**student, 'registration_date': '2024-01-01T00:00:00', 'status': 'active'})
+        for student in STUDENTS
+    ]
+    session_ids = [
+        storage.add_session({'name': 'Lecture 1', 'date': '2024-01-02'}),
+        storage.add_session({'name': 'Lecture 2', 'date': '2024-01-03'})
+    ]
+    return student_ids, session_ids
+
+def mark(storage, student_id, session_id, timestamp):
+    return storage.add_attendance({
+        'student_id': student_id,
+        'session_id': session_id,
+        'timestamp': timestamp,
+        'status': 'present'
+    })
+
+# Students
+
+def test_get_students_pages_with_total(storage, roster):
+    students, total = storage.get_students(page=1, per_page=2)
+
+    assert total == 3
+    assert len(students) == 2
+    assert {'id', 'student_id', 'name', 'email', 'course', 'status'} <= set(students[0])
+
+    rest, _ = storage.get_students(page=2, per_page=2)
+    assert len(rest) == 1
+    assert {student['student_id'] for student in students + rest} == {'S1', 'S2', 'S3'}
+
+def test_get_students_searches_word_prefixes(storage, roster):
+    assert [student['student_id'] for student in storage.get_students(query='tur')[0]] == ['S2']
+    assert {student['student_id'] for student in storage.get_students(query='comp')[0]} == {'S2', 'S3'}
+    assert storage.get_students(query='uring') == ([], 0)
+
+def test_student_lookup_update_and_delete(storage, roster):
+    student_ids, _ = roster
+
+    assert storage.get_student_by_student_id('S1')['id'] == student_ids[0]
+    assert storage.get_student_by_id(student_ids[0])['student_id'] == 'S1'
+    assert storage.get_student_by_student_id('missing') is None
+
+    storage.update_student(student_ids[0], {'name': 'Ada King'})
+    assert storage.get_student_by_id(student_ids[0])['name'] == 'Ada King'
+
+    storage.delete_student(student_ids[0])
+    assert storage.get_student_by_id(student_ids[0]) is None
+    assert storage.get_students()[1] == 2
+
+# Settings
+
+def test_settings_default_before_any_save(storage):
+    assert storage.get_settings() == DEFAULT_SETTINGS
+
+def test_settings_round_trip(storage):
+    version = storage.get_settings_version()
+    settings = {
+        **DEFAULT_SETTINGS,
+        'face_recognition_threshold': 0.7,
+        'require_both_auth': False,
+        'verification_phrases': ['one two three', 'four five six']
+    }
+
+    storage.save_settings(settings)
+
+    assert storage.get_settings() == settings
+    assert storage.get_settings_version() != version
+
+def test_partial_settings_keep_defaults(storage):
+    storage.save_settings({'camera_id': 'front'})
+
+    assert storage.get_settings() == {**DEFAULT_SETTINGS, 'camera_id': 'front'}
+
+# Attendance
+
+def test_attendance_add_and_lookup(storage, roster):
+    (ada, alan, _), (first, second) = roster
+
+    attendance_id = mark(storage, ada, first, '2024-01-02T09:00:00')
+    mark(storage, alan, first, '2024-01-02T09:05:00')
+    mark(storage, ada, second, '2024-01-03T09:00:00')
+
+    record = storage.get_attendance_by_student_session(ada, first)
+    assert record['id'] == attendance_id
+    assert record['status'] == 'present'
+    assert storage.get_attendance_by_student_session(alan, second) is None
+
+    # Session rolls keep the student's row id and add their own id and details
+    roll = storage.get_attendance_by_session(first)
+    assert {row['student_id'] for row in roll} == {ada, alan}
+    assert {row['student_code'] for row in roll} == {'S1', 'S2'}
+    assert {(row['student_name'], row['email']) for row in roll} == {
+        ('Ada Lovelace', 'ada@example.edu'), ('Alan Turing', 'alan@example.edu')
+    }
+    assert storage.get_session_attendance_count(first) == 2
+
+def test_session_roll_student_id_is_the_row_id(storage, roster):
+    (_, _, grace), (first, _) = roster
+    mark(storage, grace, first, '2024-01-02T09:00:00')
+
+    [row] = storage.get_attendance_by_session(first)
+
+    # Callers look the student up again by the roll's student_id
+    assert storage.get_student_by_id(row['student_id'])['student_id'] == row['student_code'] == 'S3'
+    assert storage.get_attendance_by_student_session(row['student_id'], first)['id'] == row['id']
+
+def test_attendance_batch_returns_an_id_per_record(storage, roster):
+    (ada, alan, grace), (first, _) = roster
+
+    ids = storage.add_attendance_batch([
+        {'student_id': student_id, 'session_id': first, 'timestamp': '2024-01-02T09:00:00', 'status': 'present'}
+        for student_id in (ada, alan, grace)
+    ])
+
+    assert len(set(ids)) == 3
+    assert storage.get_session_attendance_count(first) == 3
+
+def test_deleting_a_session_removes_its_attendance(storage, roster):
+    (ada, _, _), (first, second) = roster
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+
+    storage.delete_session(first)
+
+    assert storage.get_session_by_id(first) is None
+    assert storage.get_attendance_by_student_session(ada, first) is None
+    assert [session['id'] for session in storage.get_sessions()] == [second]
+
+def test_attendance_version_changes_with_report_content(storage, roster):
+    (ada, _, _), (first, _) = roster
+    version = storage.get_attendance_version()
+    if version is None:
+        # A backend that cannot tell serves exports without a validator
+        mark(storage, ada, first, '2024-01-02T09:00:00')
+        assert storage.get_attendance_version() is None
+        return
+
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+    marked = storage.get_attendance_version()
+    storage.update_student(ada, {'name': 'Ada King'})
+
+    assert len({version, marked, storage.get_attendance_version()}) == 3
+
+# Reports
+
+def test_report_rows_share_one_shape(storage, roster):
+    (ada, alan, _), (first, second) = roster
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+    mark(storage, alan, first, '2024-01-02T09:05:00')
+    mark(storage, ada, second, '2024-01-03T09:00:00')
+
+    rows, stats = storage.get_attendance_report()
+
+    assert len(rows) == 3
+    assert stats['total_records'] == 3
+    assert all(set(row) == REPORT_COLUMNS for row in rows)
+    row = next(row for row in rows if row['student_id'] == 'S2')
+    assert (row['student_name'], row['session_name'], row['status']) == ('Alan Turing', 'Lecture 1', 'present')
+    assert list(storage.iter_attendance_report()) == rows
+
+def test_report_filters(storage, roster):
+    (ada, alan, _), (first, second) = roster
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+    mark(storage, alan, first, '2024-01-02T09:05:00')
+    mark(storage, ada, second, '2024-01-03T09:00:00')
+
+    def report(**filters):
+        return sorted(row['id'] for row in storage.get_attendance_report(**filters)[0])
+
+    assert len(report(session_id=first)) == 2
+    assert len(report(student_id=ada)) == 2
+    assert len(report(start_date='2024-01-03')) == 1
+    assert len(report(end_date='2024-01-02T23:59:59')) == 2
+
+def test_stats_shape(storage, roster):
+    (ada, alan, _), (first, second) = roster
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+    mark(storage, alan, first, '2024-01-02T09:05:00')
+    mark(storage, ada, second, '2024-01-03T09:00:00')
+
+    stats = storage.get_attendance_stats()
+    daily = storage.get_daily_attendance_stats()
+
+    assert set(stats) == {'total_students', 'total_sessions', 'total_records', 'attendance_rate'}
+    assert (stats['total_students'], stats['total_sessions'], stats['total_records']) == (2, 2, 3)
+    assert [(day['date'], day['count']) for day in daily] == [('2024-01-02', 2), ('2024-01-03', 1)]
+
+def test_sessions_with_counts_shape(storage, roster):
+    (ada, alan, _), (first, second) = roster
+    mark(storage, ada, first, '2024-01-02T09:00:00')
+    mark(storage, alan, first, '2024-01-02T09:05:00')
+
+    sessions, total = storage.get_sessions_with_counts()
+
+    assert total == 2
+    counts = {session['id']: session['attendance_count'] for session in sessions}
+    assert counts == {first: 2, second: 0}
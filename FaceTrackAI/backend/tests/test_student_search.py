@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from database_service import DatabaseService
+
+def add(db, student_id, name, email, course):
+    return db.add_student({
+        'student_id': student_id,
+        'name': name,
+        'email': email,
+        'course': course,
+        'registration_date': '2024-01-01T00:00:00',
+        'status': 'active'
+    })
+
+def search(db, query):
+    students, total = db.get_students(per_page=50, query=query)
+    assert total == len(students)
+    return sorted(student['student_id'] for student in students)
+
+def check_index(db):
+    """Have FTS5 compare the index with the students table; a stale entry raises"""
+    conn = db.get_connection()
+    try:
+        conn.execute("INSERT INTO students_fts (students_fts, rank) VALUES ('integrity-check', 1)")
+    finally:
+        conn.close()
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseService(str(tmp_path / 'attendance.db'))
+    db.init_db()
+    return db
+
+def test_every_token_must_prefix_a_word_in_some_column(db):
+    add(db, 'CS-101', 'Ada Lovelace', 'ada@example.edu', 'Mathematics')
+    add(db, 'CS-102', 'Adam Smith', 'smith@example.edu', 'Economics')
+
+    assert search(db, 'ada') == ['CS-101', 'CS-102']
+    assert search(db, 'ada math') == ['CS-101']
+    assert search(db, 'ADA   Lov') == ['CS-101']
+    assert search(db, '102') == ['CS-102']
+    assert search(db, 'velace') == []
+
+def test_operator_words_and_quotes_are_searched_as_text(db):
+    add(db, 'S1', 'Ada Or', 'ada@example.edu', 'Near "East" Studies')
+
+    # Unquoted, these would be FTS5 syntax and raise
+    assert search(db, 'or') == ['S1']
+    assert search(db, 'near(') == ['S1']
+    assert search(db, '"east') == ['S1']
+    assert db.get_students(query='"*-') == ([], 0)
+
+def test_triggers_follow_updates_and_deletes(db):
+    ada = add(db, 'S1', 'Ada Lovelace', 'ada@example.edu', 'Mathematics')
+    alan = add(db, 'S2', 'Alan Turing', 'alan@example.edu', 'Computing')
+
+    db.update_student(ada, {'name': 'Ada King', 'course': 'Computing'})
+    db.delete_student(alan)
+
+    assert search(db, 'lovelace') == []
+    assert search(db, 'king') == ['S1']
+    assert search(db, 'comp') == ['S1']
+    assert search(db, 'turing') == []
+    check_index(db)
+
+def test_students_added_before_the_index_are_backfilled(db):
+    conn = sqlite3.connect(db.db_file)
+    conn.executescript('''
+    DROP TRIGGER students_fts_insert;
+    DROP TRIGGER students_fts_update;
+    DROP TRIGGER students_fts_delete;
+    DROP TABLE students_fts;
+    INSERT INTO students (student_id, name, email, course, registration_date, status)
+    VALUES ('OLD', 'Grace Hopper', 'grace@example.edu', 'Computing', '2020-01-01', 'active');
+    ''')
+    conn.close()
+
+    db.init_db()
+
+    assert search(db, 'hopper') == ['OLD']
+    check_index(db)
@@ -0,0 +1,60 @@
+"""Batched lookups and paged reads of the Supabase report path, over the stand-in client"""
+from supabase_service import ID_BATCH_SIZE
+
+def add_students(standin, count):
+    return [standin.insert_row('students', {'student_id': f'P{number}', 'name': f'Student {number}'})['id']
+            for number in range(count)]
+
+def add_sessions(standin, count):
+    return [standin.insert_row('sessions', {'name': f'Tutorial {number}', 'date': f'2024-02-{number + 1:02d}'})['id']
+            for number in range(count)]
+
+def test_ids_are_deduplicated_and_sent_in_batches(supabase_service, standin):
+    student_ids = add_students(standin, 250)
+
+    rows = supabase_service.get_rows_by_ids('students', student_ids + student_ids[:50] + [9999])
+
+    batches = [values for table, column, values in standin.in_filters if table == 'students']
+    assert [len(batch) for batch in batches] == [ID_BATCH_SIZE, ID_BATCH_SIZE, 51]
+    assert sum(batches, []) == student_ids + [9999]
+    assert sorted(rows) == student_ids
+
+def test_no_ids_send_no_request(supabase_service, standin):
+    assert supabase_service.get_rows_by_ids('students', []) == {}
+    assert standin.requests == []
+
+def test_report_pages_through_every_row_once(supabase_service, standin):
+    students = add_students(standin, 150)
+    sessions = add_sessions(standin, 9)
+    for number in range(1234):
+        standin.insert_row('attendance', {
+            'student_id': students[number % len(students)],
+            'session_id': sessions[number % len(sessions)],
+            # Many rows share a timestamp, so pages rely on the id tie-break
+            'timestamp': f'2024-02-{number % 9 + 1:02d}T09:00:00',
+            'status': 'present'
+        })
+
+    rows = list(supabase_service.iter_attendance_report(chunk_size=500))
+
+    assert len(rows) == 1234
+    assert len({row['id'] for row in rows}) == 1234
+    assert [row['timestamp'] for row in rows] == sorted((row['timestamp'] for row in rows), reverse=True)
+    assert standin.requests.count(('attendance', 'select')) == 3
+    # Students are looked up per page, at most a batch at a time; sessions only once
+    student_batches = [values for table, _, values in standin.in_filters if table == 'students']
+    assert all(len(batch) <= ID_BATCH_SIZE for batch in student_batches)
+    session_batches = [values for table, _, values in standin.in_filters if table == 'sessions']
+    assert sorted(sum(session_batches, [])) == sessions
+
+def test_report_skips_rows_of_deleted_students(supabase_service, standin):
+    kept, deleted = add_students(standin, 2)
+    session, = add_sessions(standin, 1)
+    for student in (kept, deleted):
+        standin.insert_row('attendance', {'student_id': student, 'session_id': session,
+                                          'timestamp': '2024-02-01T09:00:00', 'status': 'present'})
+    standin.tables['students'] = [row for row in standin.rows('students') if row['id'] != deleted]
+
+    rows = list(supabase_service.iter_attendance_report())
+
+    assert [row['student_id'] for row in rows] == ['P0']
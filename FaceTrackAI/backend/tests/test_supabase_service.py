@@ -0,0 +1,35 @@
+import pytest
+
+from supabase_standin import StandInError
+
+def test_missing_report_function_falls_back_once(supabase_service, standin):
+    assert supabase_service.call_rpc('attendance_daily_counts', {}) is None
+    assert supabase_service.call_rpc('attendance_daily_counts', {}) is None
+    assert standin.requests.count(('rpc', 'attendance_daily_counts')) == 1
+
+def test_report_function_errors_are_raised(supabase_service, standin):
+    def broken(client, **params):
+        raise StandInError('42P01', 'relation "attendance" not found')
+    standin.functions['attendance_daily_counts'] = broken
+
+    with pytest.raises(StandInError):
+        supabase_service.call_rpc('attendance_daily_counts', {})
+    assert 'attendance_daily_counts' not in supabase_service.missing_rpcs
+
+def test_failed_registration_raises_its_own_error_when_cleanup_fails(supabase_service, standin):
+    check_online = standin.check_online
+
+    def flaky(table, operation):
+        check_online(table, operation)
+        if (table, operation) == ('voice_embeddings', 'insert'):
+            raise StandInError('23514', 'new row violates check constraint "voice_embeddings_embedding_data_check"')
+        if operation == 'delete':
+            raise ConnectionError("network down")
+    standin.check_online = flaky
+
+    student = {'student_id': 'S1', 'name': 'Ada Lovelace', 'email': 'ada@example.edu', 'course': 'Mathematics'}
+    with pytest.raises(StandInError) as error:
+        supabase_service.add_student_with_biometrics(student, '[0.1]', '{"embedding": [0.1]}')
+
+    assert error.value.code == '23514'
+    assert ('face_encodings', 'delete') in standin.requests
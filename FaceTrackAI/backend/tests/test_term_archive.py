@@ -0,0 +1,90 @@
+"""Rotating closed terms into archive files, and reading and deleting through them"""
+import sqlite3
+
+import pytest
+
+from database_service import ARCHIVE_ATTACH_LIMIT, DatabaseService
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseService(str(tmp_path / 'attendance.db'))
+    db.init_db()
+    return db
+
+def enrol(db, number):
+    return db.add_student({
+        'student_id': f'T{number}', 'name': f'Student {number}', 'email': None, 'course': 'History',
+        'registration_date': '2010-01-01T00:00:00', 'status': 'active'
+    })
+
+def hold_session(db, day, student_ids, timestamp=True):
+    session_id = db.add_session({'name': f'Seminar {day}', 'date': day})
+    for student_id in student_ids:
+        db.add_attendance({'student_id': student_id, 'session_id': session_id,
+                           'timestamp': f'{day}T10:00:00' if timestamp else None, 'status': 'present'})
+    return session_id
+
+def report_sessions(db, **filters):
+    return sorted(row['session_id'] for row in db.iter_attendance_report(**filters))
+
+def test_rotation_moves_rows_into_an_archive_with_the_live_schema(db):
+    student = enrol(db, 1)
+    archived = hold_session(db, '2019-03-01', [student], timestamp=False)
+    live = hold_session(db, '2019-09-01', [student])
+
+    term = db.rotate_term('2019-spring', '2019-01-01', '2019-06-30')
+
+    assert term['records'] == 1
+    archive = sqlite3.connect(term['file'])
+    main = sqlite3.connect(db.db_file)
+    table_sql = "SELECT sql FROM sqlite_master WHERE name = 'attendance'"
+    assert archive.execute(table_sql).fetchone() == main.execute(table_sql).fetchone()
+    # A row without a timestamp is archived as it was
+    assert archive.execute('SELECT session_id, timestamp FROM attendance').fetchall() == [(archived, None)]
+    assert main.execute('SELECT session_id FROM attendance').fetchall() == [(live,)]
+
+def test_reports_read_archived_and_live_rows_together(db):
+    student = enrol(db, 1)
+    archived = hold_session(db, '2019-03-01', [student])
+    live = hold_session(db, '2019-09-01', [student])
+    db.rotate_term('2019-spring', '2019-01-01', '2019-06-30')
+
+    assert report_sessions(db) == [archived, live]
+    assert report_sessions(db, start_date='2019-02-01', end_date='2019-04-01') == [archived]
+    assert report_sessions(db, session_id=archived) == [archived]
+    assert db.get_session_attendance_count(archived) == 1
+
+def test_more_terms_than_can_be_attached_are_all_read(db):
+    students = [enrol(db, number) for number in range(2)]
+    sessions = []
+    for year in range(2008, 2008 + ARCHIVE_ATTACH_LIMIT + 2):
+        sessions.append(hold_session(db, f'{year}-03-01', students))
+        db.rotate_term(f'{year}-spring', f'{year}-01-01', f'{year}-06-30')
+    sessions.append(hold_session(db, '2024-03-01', students))
+
+    assert report_sessions(db) == sorted(sessions * 2)
+    assert db.get_attendance_report()[1]['total_records'] == len(sessions) * 2
+    assert report_sessions(db, start_date='2009-01-01') == sorted(sessions[1:] * 2)
+    assert db.rebuild_attendance_stats()
+    assert db.get_attendance_stats()['total_records'] == len(sessions) * 2
+
+def test_deleting_an_archived_session_deletes_its_archived_rows(db):
+    student = enrol(db, 1)
+    kept = hold_session(db, '2019-02-01', [student])
+    deleted = hold_session(db, '2019-03-01', [student])
+    term = db.rotate_term('2019-spring', '2019-01-01', '2019-06-30')
+
+    db.delete_session(deleted)
+
+    archive = sqlite3.connect(term['file'])
+    assert archive.execute('SELECT session_id FROM attendance').fetchall() == [(kept,)]
+    assert report_sessions(db) == [kept]
+    assert db.get_session_by_id(deleted) is None
+
+def test_rotation_refuses_overlapping_or_open_terms(db):
+    db.rotate_term('2019-spring', '2019-01-01', '2019-06-30')
+
+    with pytest.raises(ValueError, match='overlaps'):
+        db.rotate_term('2019-spring-2', '2019-06-01', '2019-08-31')
+    with pytest.raises(ValueError, match='ended'):
+        db.rotate_term('future', '2019-09-01', '2999-01-01')
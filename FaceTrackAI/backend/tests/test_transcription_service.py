@@ -0,0 +1,56 @@
+import time
+import threading
+import types
+
+import pytest
+
+from transcription_service import LocalWhisperBackend, StubTranscriptionBackend, TranscriptionQueue
+
+class SlowSegments:
+    """faster-whisper's lazy segment generator, taking `delay` seconds per segment"""
+
+    def __init__(self, words, delay):
+        self.words = words
+        self.delay = delay
+        self.decoded = 0
+
+    def transcribe(self, audio, language=None):
+        def segments():
+            for word in self.words:
+                time.sleep(self.delay)
+                self.decoded += 1
+                yield types.SimpleNamespace(text=f' {word} ')
+        return segments(), None
+
+@pytest.fixture
+def local_whisper():
+    # Built without loading a model; each test supplies its own
+    backend = LocalWhisperBackend.__new__(LocalWhisperBackend)
+    backend.lock = threading.Lock()
+    return backend
+
+def test_local_whisper_abandons_a_job_past_its_deadline(local_whisper):
+    local_whisper.model = SlowSegments(['one', 'two', 'three', 'four', 'five'], delay=0.05)
+
+    with pytest.raises(TimeoutError):
+        local_whisper.transcribe(b'audio', timeout=0.08)
+
+    assert local_whisper.model.decoded < 5
+    assert not local_whisper.lock.locked()
+
+def test_local_whisper_finishes_within_its_deadline(local_whisper):
+    local_whisper.model = SlowSegments(['Present', 'Today'], delay=0)
+
+    assert local_whisper.transcribe(b'audio', timeout=1) == 'present today'
+
+def test_abandoned_jobs_count_as_timeouts():
+    queue = TranscriptionQueue(StubTranscriptionBackend('present', delay=5), timeout=0.05)
+    started = time.monotonic()
+
+    with pytest.raises(TimeoutError):
+        queue.transcribe(b'audio', timeout=1)
+
+    stats = queue.get_stats()
+    assert time.monotonic() - started < 1
+    assert (stats['timeouts'], stats['failed'], stats['pending']) == (1, 0, 0)
+    queue.shutdown()
@@ -0,0 +1,79 @@
+"""The voice activity stage run before every speaker embedding"""
+import numpy as np
+import pytest
+
+from conftest import synthetic_voice
+from speaker_embedding import CANONICAL_RATE, VAD_HANGOVER, SpeakerEmbeddingEngine, VoiceActivityDetector
+
+RATE = CANONICAL_RATE
+VOICE = (125, (690, 1250, 2450))
+
+def room_noise(seconds, level=0.002, seed=0):
+    return (level * np.random.default_rng(seed).standard_normal(int(seconds * RATE))).astype(np.float32)
+
+def tone(seconds, frequency, amplitude):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+@pytest.fixture(scope='module')
+def engine():
+    return SpeakerEmbeddingEngine()
+
+@pytest.fixture
+def vad():
+    return VoiceActivityDetector(RATE)
+
+def test_silence_around_speech_is_trimmed_to_the_hangover(vad):
+    speech = tone(1.0, 220, 0.3)
+    clip = np.concatenate([room_noise(1.5, seed=1), speech, room_noise(1.5, seed=2)])
+
+    trimmed = vad.trim(clip)
+
+    # The speech plus the hangover on both sides, give or take a frame at each edge
+    expected = len(speech) + 2 * VAD_HANGOVER * RATE
+    assert abs(len(trimmed) - expected) <= 2 * vad.frame_length
+
+def test_pauses_between_words_are_dropped(vad):
+    word = tone(0.5, 180, 0.3)
+    clip = np.concatenate([room_noise(0.5, seed=3), word, room_noise(2.0, seed=4), word, room_noise(0.5, seed=5)])
+
+    assert len(vad.trim(clip)) < len(clip) / 2
+
+def test_quiet_fricatives_are_kept_but_a_hum_of_the_same_energy_is_not(vad):
+    rng = np.random.default_rng(6)
+    # 6 dB over the noise floor, between half the margin and the margin. White noise crosses
+    # zero about every other sample, as an "s" does; the mains hum hardly ever
+    hiss = (0.008 * rng.standard_normal(int(0.4 * RATE))).astype(np.float32)
+    hum = tone(0.4, 50, 0.008 * np.sqrt(2))
+    vowel = tone(0.4, 220, 0.3)
+    quiet = room_noise(1.0, level=0.004, seed=7)
+
+    frames = lambda samples: len(vad.trim(samples)) // vad.frame_length
+    with_hiss = frames(np.concatenate([quiet, vowel, quiet, hiss, quiet]))
+    with_hum = frames(np.concatenate([quiet, vowel, quiet, hum, quiet]))
+
+    assert with_hiss - with_hum >= 0.3 / 0.02
+
+def test_clips_without_enough_speech_are_refused(engine):
+    with pytest.raises(ValueError, match='Not enough speech'):
+        engine.embed(room_noise(3.0, seed=8), RATE)
+
+    # Loud enough relative to its own noise floor, but below the absolute floor
+    faint = np.concatenate([np.zeros(RATE, dtype=np.float32), tone(1.0, 200, 0.001), np.zeros(RATE, dtype=np.float32)])
+    with pytest.raises(ValueError, match='Not enough speech'):
+        engine.embed(faint, RATE)
+
+def test_leading_and_trailing_silence_do_not_move_the_embedding(engine):
+    voice = synthetic_voice(*VOICE, seconds=1.5, seed=9)
+    padded = np.concatenate([room_noise(2.0, seed=10), voice, room_noise(3.0, seed=11)])
+
+    score = engine.cosine_score(engine.embed(padded, RATE), engine.embed(voice, RATE))
+
+    assert score > 0.95
+
+def test_other_sample_rates_are_analysed_at_the_canonical_rate(engine):
+    voice = synthetic_voice(*VOICE, seconds=1.5, seed=12)
+    upsampled = SpeakerEmbeddingEngine.resample(voice, RATE, 44100)
+
+    assert len(upsampled) == round(len(voice) * 44100 / RATE)
+    assert engine.cosine_score(engine.embed(upsampled, 44100), engine.embed(voice, RATE)) > 0.95
@@ -0,0 +1,111 @@
+"""Batch voice verification: shared extraction pool, one scoring operation, per-sample failures"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+import voice_recognition_service as voice_module
+from conftest import synthetic_voice, wav_bytes
+from database_service import DatabaseService
+from speaker_embedding import SCORE_FLOOR, SpeakerEmbeddingEngine
+from voice_storage import VoiceSampleStore
+
+VOICES = {
+    'B1': (110, (730, 1090, 2440)),
+    'B2': (160, (560, 1800, 2600)),
+    'B3': (230, (400, 2200, 3100))
+}
+
+@pytest.fixture(scope='module')
+def service(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('batch')
+    db = DatabaseService(str(data_dir / 'attendance.db'))
+    db.init_db()
+    service = voice_module.VoiceRecognitionService(db, VoiceSampleStore(str(data_dir / 'voices')))
+    service.transcriber = None
+    return service
+
+@pytest.fixture(scope='module')
+def ids(service):
+    """Enrolled students' ids by student code"""
+    ids = {}
+    for code, voice in VOICES.items():
+        ids[code] = service.db_service.add_student({
+            'student_id': code, 'name': code, 'email': f'{code.lower()}@example.edu',
+            'course': 'Acoustics', 'registration_date': '2024-01-01', 'status': 'active'
+        })
+        service.process_voice_sample(wav_bytes(synthetic_voice(*voice, seed=1)), ids[code])
+    return ids
+
+def sample(code, seed):
+    return wav_bytes(synthetic_voice(*VOICES[code], seed=seed))
+
+def test_einsum_scores_match_pairwise_cosines():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((12, 40)).astype(np.float32)
+    # Half the references near their embedding, half unrelated, so both sides of the floor are covered
+    references = np.concatenate([embeddings[:6] + 0.1 * rng.standard_normal((6, 40)), rng.standard_normal((6, 40))])
+
+    batch = SpeakerEmbeddingEngine.cosine_scores(embeddings, references)
+
+    expected = []
+    for embedding, reference in zip(embeddings, references):
+        cosine = embedding @ reference / (np.linalg.norm(embedding) * np.linalg.norm(reference))
+        expected.append(max(0.0, (cosine - SCORE_FLOOR) / (1 - SCORE_FLOOR)))
+    np.testing.assert_allclose(batch, expected, atol=1e-5)
+    assert (batch[:6] > 0).all() and (batch[6:] == 0).all()
+
+def test_batch_agrees_with_one_at_a_time(service, ids):
+    samples = [(ids['B1'], sample('B1', 2)), (ids['B2'], sample('B3', 3)), (ids['B3'], sample('B3', 4))]
+
+    batch = service.verify_batch(samples)
+    single = [service.verify_voice(audio, student_id) for student_id, audio in samples]
+
+    assert [result['student_id'] for result in batch] == [student_id for student_id, _ in samples]
+    assert [result['match'] for result in batch] == [True, False, True]
+    assert [result['score'] for result in batch] == [result['score'] for result in single]
+
+def test_samples_are_scored_in_one_operation(service, ids, monkeypatch):
+    calls = []
+    cosine_scores = service.engine.cosine_scores
+    monkeypatch.setattr(service.engine, 'cosine_scores', lambda e, r: calls.append(len(e)) or cosine_scores(e, r))
+
+    service.verify_batch([(ids[code], sample(code, 5)) for code in VOICES] * 2)
+
+    assert calls == [6]
+
+def test_a_bad_sample_fails_only_itself(service, ids):
+    results = service.verify_batch([
+        (ids['B1'], sample('B1', 6)),
+        (ids['B2'], b'not audio at all'),
+        (999999, sample('B2', 7)),
+        (ids['B2'], io.BytesIO(sample('B2', 8)))
+    ])
+
+    assert [result['match'] for result in results] == [True, False, False, True]
+    assert 'Error during verification' in results[1]['message']
+    assert results[2]['message'] == 'No voice sample found for this student'
+
+def test_outdated_enrolments_ask_for_a_new_recording(service, ids):
+    stale = json.dumps({'embedding': [0.0] * 40, 'engine': 'mfcc-stats-v1'})
+    service.db_service.save_voice_embedding(ids['B3'], stale)
+    service.load_voice_embeddings()
+    try:
+        [result] = service.verify_batch([(ids['B3'], sample('B3', 9))])
+        assert result['message'] == 'Voice sample needs to be re-recorded for this student'
+    finally:
+        service.process_voice_sample(wav_bytes(synthetic_voice(*VOICES['B3'], seed=1)), ids['B3'])
+
+def test_oversized_batches_are_refused(service, ids):
+    audio = sample('B1', 10)
+    with pytest.raises(ValueError, match=str(voice_module.BATCH_MAX_SAMPLES)):
+        service.verify_batch([(ids['B1'], audio)] * (voice_module.BATCH_MAX_SAMPLES + 1))
+
+def test_route_needs_an_id_per_sample(client):
+    response = client.post('/api/recognition/verify-voice/batch', data={
+        'student_id': ['1', '2'],
+        'voice_sample': [(io.BytesIO(sample('B1', 11)), 'blob', 'audio/wav')]
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+"""verify-voice decodes uploads from memory: no temporary files, any source type, no shared paths"""
+import io
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+import werkzeug.formparser
+
+from conftest import synthetic_voice, wav_bytes
+from speaker_embedding import SpeakerEmbeddingEngine
+
+SPEAKER = (115, (720, 1150, 2550))
+STRANGER = (220, (380, 2100, 3000))
+
+@pytest.fixture(scope='module')
+def enrolled(backend_app):
+    """A student with an enrolled voice, registered straight through the services"""
+    storage = backend_app.services.get('storage')
+    student_id = storage.add_student({
+        'student_id': 'MEM1', 'name': 'Memory Test', 'email': 'mem1@example.edu',
+        'course': 'Acoustics', 'registration_date': '2024-01-01T00:00:00', 'status': 'active'
+    })
+    backend_app.services.get('voice').process_voice_sample(wav_bytes(synthetic_voice(*SPEAKER, seed=10)), student_id)
+    return student_id
+
+@pytest.fixture
+def no_temp_files(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError('a temporary file was created')
+    for name in ('TemporaryFile', 'NamedTemporaryFile', 'SpooledTemporaryFile', 'mkstemp', 'mkdtemp'):
+        monkeypatch.setattr(tempfile, name, refuse)
+    # werkzeug's default upload streams import these by name
+    for name in ('TemporaryFile', 'SpooledTemporaryFile'):
+        monkeypatch.setattr(werkzeug.formparser, name, refuse, raising=False)
+
+def test_read_audio_takes_paths_streams_and_bytes(tmp_path):
+    audio = wav_bytes(synthetic_voice(*SPEAKER, seconds=0.5))
+    path = tmp_path / 'sample.wav'
+    path.write_bytes(audio)
+    engine = SpeakerEmbeddingEngine()
+
+    from_path, rate = engine.read_audio(str(path))
+    from_stream, _ = engine.read_audio(io.BytesIO(audio))
+    from_bytes, _ = engine.read_audio(audio)
+
+    assert rate == 16000
+    np.testing.assert_array_equal(from_path, from_stream)
+    np.testing.assert_array_equal(from_path, from_bytes)
+
+def test_large_upload_verifies_without_touching_tmp(client, enrolled, no_temp_files):
+    # A 48 kHz stereo recording is well past the size werkzeug would normally spool to disk
+    voice = synthetic_voice(*SPEAKER, seconds=3, rate=48000, seed=11)
+    audio = wav_bytes(np.stack([voice, voice], axis=1), rate=48000)
+    assert len(audio) > 500 * 1024
+
+    response = client.post('/api/recognition/verify-voice', data={
+        'student_id': str(enrolled),
+        'voice_sample': (io.BytesIO(audio), 'blob', 'audio/wav')
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.json['success'] is True
+
+def test_concurrent_verifications_of_one_student_keep_their_own_audio(backend_app, enrolled):
+    voice_service = backend_app.services.get('voice')
+    samples = [(wav_bytes(synthetic_voice(*(SPEAKER if index % 2 == 0 else STRANGER), seed=20 + index)), index % 2 == 0)
+               for index in range(8)]
+    results = [None] * len(samples)
+
+    def verify(index):
+        results[index] = voice_service.verify_voice(samples[index][0], enrolled)['match']
+
+    threads = [threading.Thread(target=verify, args=(index,)) for index in range(len(samples))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # With one shared temp path per student, threads would score each other's recordings
+    assert results == [expected for _, expected in samples]
@@ -0,0 +1,128 @@
+"""Enrolment recordings kept as FLAC: lossless round trip, races with new uploads, the worker"""
+import io
+import os
+import json
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import voice_storage
+from conftest import synthetic_voice
+from database_service import DatabaseService
+from speaker_embedding import ENGINE_VERSION
+from voice_recognition_service import VoiceRecognitionService
+from voice_storage import VoiceSampleStore
+
+def recording(subtype='PCM_16', seconds=1.0, seed=0):
+    buffer = io.BytesIO()
+    sf.write(buffer, synthetic_voice(140, (650, 1500, 2500), seconds=seconds, seed=seed), 16000,
+             format='WAV', subtype=subtype)
+    return buffer.getvalue()
+
+def samples_of(audio, dtype):
+    return sf.read(io.BytesIO(audio), dtype=dtype, always_2d=True)[0]
+
+def files(store):
+    return sorted(os.listdir(store.voice_dir))
+
+@pytest.fixture
+def store(tmp_path):
+    return VoiceSampleStore(str(tmp_path / 'voices'))
+
+@pytest.mark.parametrize('subtype, dtype', [('PCM_16', 'int16'), ('PCM_24', 'int32')])
+def test_flac_decodes_to_the_uploaded_samples(store, subtype, dtype):
+    upload = recording(subtype)
+    store.save(7, upload)
+
+    store.transcode('7')
+
+    assert files(store) == ['7.flac']
+    stored = store.read(7)
+    assert stored[:4] == b'fLaC'
+    np.testing.assert_array_equal(samples_of(stored, dtype), samples_of(upload, dtype))
+
+    stats = store.get_stats()
+    assert stats['transcoded'] == 1
+    assert 0 < stats['bytes_saved'] < len(upload)
+    assert stats['disk'] == {'wav_files': 0, 'wav_bytes': 0, 'flac_files': 1, 'flac_bytes': len(stored)}
+
+def test_float_recordings_are_kept_as_uploaded(store):
+    upload = recording('FLOAT')
+    store.save(8, upload)
+
+    store.transcode('8')
+
+    assert files(store) == ['8.wav']
+    assert store.read(8) == upload
+    assert store.get_stats()['skipped'] == 1
+
+def test_upload_saved_during_a_transcode_wins(store, monkeypatch):
+    first, second = recording(seed=1), recording(seed=2)
+    store.save(9, first)
+
+    # The student re-records while the worker is still encoding the first upload
+    write = sf.write
+    def write_then_reupload(*args, **kwargs):
+        write(*args, **kwargs)
+        store.save(9, second)
+    monkeypatch.setattr(voice_storage.sf, 'write', write_then_reupload)
+
+    store.transcode('9')
+
+    assert files(store) == ['9.wav']
+    assert store.read(9) == second
+    assert store.get_stats()['transcoded'] == 0
+
+def test_new_upload_replaces_an_earlier_flac(store):
+    store.save(10, recording(seed=3))
+    store.transcode('10')
+
+    replacement = recording(seed=4)
+    store.save(10, io.BytesIO(replacement))
+
+    assert files(store) == ['10.wav']
+    assert store.read(10) == replacement
+
+def test_worker_compresses_old_and_new_recordings_until_stopped(tmp_path):
+    voice_dir = tmp_path / 'voices'
+    voice_dir.mkdir()
+    # Left behind by a version that stored WAV only
+    (voice_dir / '1.wav').write_bytes(recording(seed=5))
+
+    store = VoiceSampleStore(str(voice_dir))
+    store.start()
+    store.save(2, recording(seed=6))
+    store.stop()
+
+    assert files(store) == ['1.flac', '2.flac']
+    stats = store.get_stats()
+    assert (stats['transcoded'], stats['pending'], stats['running']) == (2, 0, False)
+    assert stats['percent_saved'] > 0
+
+def test_delete_removes_every_format(store):
+    store.save(11, recording(seed=7))
+    store.transcode('11')
+    store.save(12, recording(seed=8))
+
+    store.delete(11)
+    store.delete(12)
+
+    assert files(store) == []
+    assert store.read(11) is None
+
+def test_outdated_enrolment_is_re_embedded_from_the_flac(store, tmp_path):
+    db = DatabaseService(str(tmp_path / 'attendance.db'))
+    db.init_db()
+    student_id = db.add_student({'student_id': 'F1', 'name': 'Flac Test', 'email': 'f1@example.edu',
+                                 'course': 'Acoustics', 'registration_date': '2024-01-01', 'status': 'active'})
+    db.save_voice_embedding(student_id, '{"embedding": [0.5, 0.5], "engine": "mfcc-stats-v1"}')
+    store.save(student_id, recording(seconds=2.0, seed=9))
+    store.transcode(str(student_id))
+    service = VoiceRecognitionService(db, store)
+
+    reference = service.get_reference(student_id)
+
+    assert reference['engine'] == ENGINE_VERSION
+    assert json.loads(db.get_voice_embeddings()[0]['embedding_data'])['engine'] == ENGINE_VERSION
+    assert files(store) == [f'{student_id}.flac']
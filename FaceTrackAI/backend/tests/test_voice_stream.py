@@ -0,0 +1,87 @@
+"""Streaming voice verification, with and without the spoken phrase checked"""
+import numpy as np
+import pytest
+
+from conftest import synthetic_voice, wav_bytes
+from database_service import DatabaseService
+from transcription_service import StubTranscriptionBackend, TranscriptionQueue
+from voice_recognition_service import VoiceRecognitionService
+from voice_storage import VoiceSampleStore
+
+SPEAKER = (140, (650, 1250, 2550))
+SESSION_ID = 7
+
+@pytest.fixture
+def voices(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRANSCRIPTION_BACKEND', 'none')
+    storage = DatabaseService(str(tmp_path / 'attendance.db'))
+    storage.init_db()
+    service = VoiceRecognitionService(storage, VoiceSampleStore(str(tmp_path / 'voices')))
+    service.process_voice_sample(wav_bytes(synthetic_voice(*SPEAKER, seconds=3.0, seed=1)), 1)
+    # Running scores of the synthetic voice settle lower than whole-file ones
+    service.update_threshold(0.4)
+    return service
+
+def hear(service, text):
+    """Check phrases with a transcriber that hears `text` in every recording"""
+    service.transcriber = TranscriptionQueue(StubTranscriptionBackend(text))
+
+def stream(service, samples, chunk_seconds=0.25):
+    """Feed samples to a streaming verification; returns (result, seconds sent)"""
+    verification = service.start_verification(1, session_id=SESSION_ID)
+    chunk = int(16000 * chunk_seconds)
+    for start in range(0, len(samples), chunk):
+        result = verification.add_chunk(samples[start:start + chunk])
+        if result is not None:
+            return result, (start + chunk) / 16000
+    return verification.finish(), len(samples) / 16000
+
+def test_without_transcription_a_match_is_decided_early(voices):
+    samples = synthetic_voice(*SPEAKER, seconds=6.0, seed=2)
+
+    result, sent = stream(voices, samples)
+
+    assert result['match'] and result['early']
+    assert sent < len(samples) / 16000
+    assert 'phrase' not in result
+
+def test_session_phrase_is_accepted_after_the_whole_recording(voices):
+    phrase = voices.get_session_phrases(SESSION_ID)[0]
+    hear(voices, phrase)
+    samples = synthetic_voice(*SPEAKER, seconds=6.0, seed=2)
+
+    result, sent = stream(voices, samples)
+
+    assert result['match'] and not result['early']
+    assert sent == len(samples) / 16000
+    assert result['phrase'] == phrase
+
+def test_phrase_from_another_session_is_refused(voices):
+    session_phrases = set(voices.get_session_phrases(SESSION_ID))
+    replayed = next(phrase for phrase in voices.verification_phrases if phrase not in session_phrases)
+    hear(voices, replayed)
+
+    result, _ = stream(voices, synthetic_voice(*SPEAKER, seconds=6.0, seed=2))
+
+    assert not result['match']
+    assert result['message'] == 'Voice verification failed. Please say the attendance phrase.'
+
+def test_another_voice_is_still_rejected_early_while_phrases_are_checked(voices):
+    phrase = voices.get_session_phrases(SESSION_ID)[0]
+    hear(voices, phrase)
+    samples = synthetic_voice(230, (350, 2200, 3000), seconds=8.0, seed=3)
+
+    result, sent = stream(voices, samples)
+
+    assert not result['match'] and result['early']
+    assert sent < len(samples) / 16000
+    # Rejected voices are never sent for transcription
+    assert voices.transcriber.get_stats()['submitted'] == 0
+
+def test_stream_for_a_student_without_a_voice_is_not_found(client):
+    response = client.post('/api/recognition/verify-voice/stream',
+                           query_string={'student_id': 999999, 'session_id': SESSION_ID},
+                           data=np.zeros(1600, dtype='<i2').tobytes())
+
+    assert response.status_code == 404
+    assert response.json['message'] == 'No voice sample found for this student'
@@ -0,0 +1,73 @@
+"""Voice uploads in the format the kiosk pages send, through the Flask app"""
+import io
+import base64
+
+from PIL import Image
+
+from conftest import synthetic_voice, wav_bytes
+
+# The start of a MediaRecorder WebM/Opus recording: an EBML header naming the webm doctype
+WEBM_RECORDING = bytes.fromhex('1a45dfa39f4286810142f7810142f2810442f381084282847765626d42878104428581021853806701') + bytes(512)
+
+def face_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 160, 140)).save(buffer, format='JPEG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def register(client, student_id, audio):
+    return client.post('/api/students/register', data={
+        'student_id': student_id,
+        'name': f'Student {student_id}',
+        'email': f'{student_id.lower()}@example.edu',
+        'course': 'Acoustics',
+        'face_image': face_image(),
+        'voice_sample': (io.BytesIO(audio), 'blob', 'audio/wav')
+    }, content_type='multipart/form-data')
+
+def verify(client, student_id, audio, session_id=1):
+    return client.post('/api/recognition/verify-voice', data={
+        'student_id': str(student_id),
+        'session_id': str(session_id),
+        'voice_sample': (io.BytesIO(audio), 'blob', 'audio/wav')
+    }, content_type='multipart/form-data')
+
+def test_wav_recording_enrols_and_verifies(client):
+    voice = (120, (700, 1200, 2600))
+    registered = register(client, 'V100', wav_bytes(synthetic_voice(*voice, seed=1)))
+    assert registered.status_code == 200, registered.json
+    student_id = registered.json['student_id']
+
+    same = verify(client, student_id, wav_bytes(synthetic_voice(*voice, seed=2)))
+    other = verify(client, student_id, wav_bytes(synthetic_voice(210, (400, 2000, 2900), seed=3)))
+
+    assert same.json['success'] is True
+    assert other.json['success'] is False
+
+def test_webm_recording_is_refused_before_registering(client):
+    response = register(client, 'V101', WEBM_RECORDING)
+
+    assert response.status_code == 415
+    assert 'WebM' in response.json['message']
+    assert client.get('/api/students', query_string={'query': 'V101'}).json['total'] == 0
+
+def test_webm_verification_is_refused(client):
+    registered = register(client, 'V102', wav_bytes(synthetic_voice(150, (600, 1700, 2500), seed=4)))
+
+    response = verify(client, registered.json['student_id'], WEBM_RECORDING)
+
+    assert response.status_code == 415
+
+def test_webm_in_a_batch_refuses_the_whole_batch(client):
+    registered = register(client, 'V103', wav_bytes(synthetic_voice(130, (650, 1100, 2400), seed=5)))
+    student_id = str(registered.json['student_id'])
+
+    response = client.post('/api/recognition/verify-voice/batch', data={
+        'student_id': [student_id, student_id],
+        'session_id': '1',
+        'voice_sample': [
+            (io.BytesIO(wav_bytes(synthetic_voice(130, (650, 1100, 2400), seed=6))), 'blob', 'audio/wav'),
+            (io.BytesIO(WEBM_RECORDING), 'blob', 'audio/wav')
+        ]
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 415
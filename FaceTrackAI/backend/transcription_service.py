@@ -0,0 +1,283 @@
+import io
+import os
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Backends create_transcriber can build, selected by TRANSCRIPTION_BACKEND
+TRANSCRIPTION_BACKENDS = ['none', 'stub', 'whisper-api', 'local-whisper']
+
+# Transcriptions run at once; a slow one only holds up its own worker
+TRANSCRIPTION_WORKERS = 2
+
+# Jobs queued or running before new audio is turned away
+TRANSCRIPTION_MAX_PENDING = 32
+
+# Seconds a backend may spend on one transcription
+TRANSCRIPTION_TIMEOUT = 15.0
+
+# Transcriptions kept by audio hash, so a retried upload is not sent again
+TRANSCRIPTION_CACHE_SIZE = 1024
+
+class TranscriptionBackend(ABC):
+    """Turns a recording into text; implementations must be safe to call from several threads"""
+
+    name = None
+
+    @abstractmethod
+    def transcribe(self, audio, timeout):
+        """
+        Return the lower-case text spoken in `audio` (bytes of an audio file)
+
+        Raises:
+            TimeoutError if the work is abandoned after `timeout` seconds
+        """
+
+class StubTranscriptionBackend(TranscriptionBackend):
+    """Offline stand-in that hears the same text in every recording"""
+
+    name = 'stub'
+
+    def __init__(self, text, delay=0.0):
+        self.text = text
+        self.delay = delay
+
+    def transcribe(self, audio, timeout):
+        if self.delay:
+            time.sleep(min(self.delay, timeout))
+            if self.delay > timeout:
+                raise TimeoutError(f"Transcription abandoned after {timeout}s")
+        return self.text
+
+class WhisperApiBackend(TranscriptionBackend):
+    """OpenAI's hosted Whisper model"""
+
+    name = 'whisper-api'
+
+    def __init__(self, model='whisper-1'):
+        # Import lazily so the openai package is only needed when this backend is used
+        import openai
+
+        if not os.environ.get('OPENAI_API_KEY'):
+            raise RuntimeError("OPENAI_API_KEY not found in environment variables")
+
+        # Directly use openai API instead of client to avoid proxies error
+        openai.api_key = os.environ.get('OPENAI_API_KEY')
+        self.openai = openai
+        self.model = model
+
+    def transcribe(self, audio, timeout):
+        try:
+            result = self.openai.audio.transcriptions.create(
+                model=self.model,
+                file=('sample.wav', audio),
+                timeout=timeout
+            )
+        except self.openai.APITimeoutError as e:
+            raise TimeoutError(f"Transcription abandoned after {timeout}s") from e
+        return result.text.strip().lower()
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """Whisper run on this host with faster-whisper, for kiosks without network access"""
+
+    name = 'local-whisper'
+
+    def __init__(self, model_size='base'):
+        # Import lazily; faster-whisper is an optional dependency
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_size, device='cpu', compute_type='int8')
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, timeout):
+        # Time spent waiting for the model counts against the deadline
+        deadline = time.monotonic() + timeout
+
+        # One model instance is not safe to run from several threads
+        with self.lock:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Transcription abandoned after {timeout}s")
+            segments, _ = self.model.transcribe(io.BytesIO(audio), language='en')
+
+            # Segments are decoded as they are iterated, so the job can be
+            # abandoned between them and the model freed for the next one
+            texts = []
+            for segment in segments:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Transcription abandoned after {timeout}s")
+                texts.append(segment.text.strip())
+            return ' '.join(texts).lower()
+
+class TranscriptionQueue:
+    def __init__(self, backend, workers=TRANSCRIPTION_WORKERS, max_pending=TRANSCRIPTION_MAX_PENDING,
+                 timeout=TRANSCRIPTION_TIMEOUT, cache_size=TRANSCRIPTION_CACHE_SIZE):
+        """
+        Initialize the transcription job queue
+
+        Jobs run on a bounded pool of worker threads, so request threads only
+        wait for a result when they need it, and only as long as they choose.
+        Audio is keyed by its SHA-256: a recording already being transcribed
+        joins that job instead of starting another, and finished results are
+        kept in an LRU cache.
+
+        Args:
+            backend: TranscriptionBackend doing the work
+            workers: Jobs run at once
+            max_pending: Jobs queued or running before submit refuses more
+            timeout: Seconds the backend may spend on one job
+            cache_size: Results kept
+        """
+        self.backend = backend
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cache_size = cache_size
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcription')
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.cache = OrderedDict()
+        # timeouts counts both waits that gave up and jobs abandoned at their deadline
+        self.stats = {
+            'submitted': 0, 'coalesced': 0, 'cache_hits': 0, 'completed': 0,
+            'failed': 0, 'rejected': 0, 'timeouts': 0, 'busy_seconds': 0.0
+        }
+
+    def submit(self, audio):
+        """
+        Start transcribing audio, or join the job already transcribing it
+
+        Returns:
+            A Future resolving to the text
+
+        Raises:
+            RuntimeError if max_pending jobs are already waiting
+        """
+        key = hashlib.sha256(audio).hexdigest()
+
+        with self.lock:
+            self.stats['submitted'] += 1
+
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+
+            if key in self.jobs:
+                self.stats['coalesced'] += 1
+                return self.jobs[key]
+
+            if len(self.jobs) >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise RuntimeError("Transcription queue is full")
+
+            # The job cannot finish and remove itself before it is registered; it needs the lock
+            future = self.executor.submit(self.run_job, key, audio)
+            self.jobs[key] = future
+            return future
+
+    def run_job(self, key, audio):
+        """Transcribe on a worker thread and cache the result"""
+        started = time.perf_counter()
+        try:
+            text = self.backend.transcribe(audio, self.timeout)
+        except TimeoutError:
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise
+        except Exception:
+            with self.lock:
+                self.stats['failed'] += 1
+            raise
+        else:
+            with self.lock:
+                self.cache[key] = text
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                self.stats['completed'] += 1
+            return text
+        finally:
+            with self.lock:
+                self.jobs.pop(key, None)
+                self.stats['busy_seconds'] += time.perf_counter() - started
+
+    def wait(self, future, timeout):
+        """
+        Wait up to `timeout` seconds for a submitted job
+
+        Raises:
+            TimeoutError if it has not finished; the job keeps running and
+            its result is still cached for the next request
+        """
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Also the builtin TimeoutError on Python 3.11+; a job abandoned at its deadline was already counted
+            if future.done():
+                raise
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise TimeoutError("Timed out waiting for transcription")
+
+    def transcribe(self, audio, timeout=None):
+        """Transcribe audio and wait for the text"""
+        return self.wait(self.submit(audio), self.timeout if timeout is None else timeout)
+
+    def shutdown(self):
+        """Stop accepting jobs and wait for running ones"""
+        self.executor.shutdown(wait=True)
+
+    def get_stats(self):
+        """Get job counters and the queue's current depth"""
+        with self.lock:
+            return {
+                **self.stats,
+                'busy_seconds': round(self.stats['busy_seconds'], 3),
+                'pending': len(self.jobs),
+                'cached': len(self.cache),
+                'backend': self.backend.name
+            }
+
+def create_transcriber(config=None, default_text=''):
+    """
+    Build the transcription queue selected by configuration
+
+    Args:
+        config: Mapping read for TRANSCRIPTION_BACKEND (one of
+            TRANSCRIPTION_BACKENDS), TRANSCRIPTION_WORKERS,
+            TRANSCRIPTION_TIMEOUT and WHISPER_MODEL; defaults to the
+            environment
+        default_text: Text the stub backend hears
+
+    Returns:
+        A TranscriptionQueue, or None when transcription is disabled or its
+        backend cannot be loaded
+    """
+    config = os.environ if config is None else config
+    backend = config.get('TRANSCRIPTION_BACKEND', 'none')
+
+    try:
+        if backend == 'none':
+            return None
+        elif backend == 'stub':
+            transcription_backend = StubTranscriptionBackend(default_text)
+        elif backend == 'whisper-api':
+            transcription_backend = WhisperApiBackend(config.get('WHISPER_MODEL', 'whisper-1'))
+        elif backend == 'local-whisper':
+            transcription_backend = LocalWhisperBackend(config.get('WHISPER_MODEL', 'base'))
+        else:
+            raise ValueError(f"Unknown transcription backend '{backend}', expected one of {', '.join(TRANSCRIPTION_BACKENDS)}")
+    except (ImportError, RuntimeError) as e:
+        print(f"Transcription backend '{backend}' unavailable, phrases will not be checked: {e}")
+        return None
+
+    print(f"Using {backend} transcription backend")
+    return TranscriptionQueue(
+        transcription_backend,
+        workers=int(config.get('TRANSCRIPTION_WORKERS', TRANSCRIPTION_WORKERS)),
+        timeout=float(config.get('TRANSCRIPTION_TIMEOUT', TRANSCRIPTION_TIMEOUT))
+    )
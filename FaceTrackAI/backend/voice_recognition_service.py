@@ -1,173 +1,254 @@
+import io
 import os
 import json
-import tempfile
-import sys
+import time
+import numpy as np
+import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from speaker_embedding import SpeakerEmbeddingEngine, ENGINE_VERSION, CANONICAL_RATE
+from transcription_service import create_transcriber
+from phrase_index import PhraseIndex, load_rotation_secret
+from storage_backend import DEFAULT_SETTINGS
+from voice_storage import VoiceSampleStore
 
-# Set to True if we have a working API connection
-USE_WHISPER_API = False
+# Seconds verification waits for the transcription once the voice is scored;
+# past it the phrase is not checked and the job finishes into the cache
+TRANSCRIPTION_WAIT = 3.0
 
-try:
-    import openai
-    print("Successfully imported OpenAI module")
-    # Import successful, but we'll check later if API key is valid
-    HAS_OPENAI = True
-except ImportError:
-    print("WARNING: OpenAI module not found, falling back to simplified mode")
-    HAS_OPENAI = False
+# Share of a verification phrase's words the transcription must contain
+PHRASE_THRESHOLD = 0.5
+
+# Threads decoding and embedding the samples of a batch verification (no
+# more than the host has CPUs), and the most samples one batch may hold
+BATCH_WORKERS = 4
+BATCH_MAX_SAMPLES = 20
+
+# Streaming verification decides early once the score clears the threshold by
+# this margin, after at least the given seconds of audio and for this many
+# consecutive updates; it always decides by STREAM_MAX_DURATION
+STREAM_DECISION_MARGIN = 0.15
+STREAM_MIN_ACCEPT_DURATION = 1.0
+STREAM_MIN_REJECT_DURATION = 2.0
+STREAM_STABLE_UPDATES = 3
+STREAM_MAX_DURATION = 10.0
 
 class VoiceRecognitionService:
-    def __init__(self, db_service):
+    def __init__(self, db_service, sample_store=None):
         """
         Initialize the Voice Recognition Service
         
         Args:
             db_service: Database service for persistence
+            sample_store: VoiceSampleStore keeping enrolment recordings; one
+                over voice_db_dir, without background compression, by default
         """
         self.db_service = db_service
-        self.voice_db_dir = 'data/voices'
+        self.voice_db_dir = sample_store.voice_dir if sample_store is not None else 'data/voices'
+        self.sample_store = sample_store if sample_store is not None else VoiceSampleStore(self.voice_db_dir)
         self.threshold = 0.5  # Default similarity threshold
         self.voice_embeddings_db = {}
         
-        # Create voices directory if it doesn't exist
-        os.makedirs(self.voice_db_dir, exist_ok=True)
-        
-        # Set to False initially - will be set to True if API is verified to work
-        self.api_available = False
-        self.client = None
-        
-        # Try to initialize OpenAI client if the module is available
-        if HAS_OPENAI:
-            # Check for OpenAI API key
-            if not os.environ.get("OPENAI_API_KEY"):
-                print("Warning: OPENAI_API_KEY not found in environment variables")
-                print("Falling back to simplified mode")
-            else:
-                try:
-                    # Directly use openai API instead of client to avoid proxies error
-                    openai.api_key = os.environ.get("OPENAI_API_KEY")
-                    print("OpenAI API key set successfully")
-                    self.api_available = USE_WHISPER_API  # Only use if specifically enabled
-                except Exception as e:
-                    print(f"Error initializing OpenAI: {e}")
-        else:
-            print("OpenAI module not available, using simplified voice recognition")
+        # Local speaker embeddings; verification needs no network access
+        self.engine = SpeakerEmbeddingEngine()
+        self.batch_pool = ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, os.cpu_count() or 1), thread_name_prefix='voice-batch')
         
-        # Verification phrases - used for voice authentication
-        self.verification_phrases = [
-            "i am present today for the class",
-            "confirming my attendance for today's session",
-            "recording my presence for this class"
-        ]
+        # Verification phrases - used for voice authentication; configurable in settings
+        self.verification_phrases = list(DEFAULT_SETTINGS['verification_phrases'])
+        rotation_secret = load_rotation_secret(
+            os.path.join(os.path.dirname(self.voice_db_dir), 'phrase_rotation_secret'),
+            os.environ.get('PHRASE_ROTATION_SECRET')
+        )
+        self.phrase_index = PhraseIndex(self.verification_phrases, rotation_secret)
+        
+        # Spoken phrases are checked only when a transcription backend is configured
+        self.transcriber = create_transcriber(default_text=self.verification_phrases[0])
         
         # Load voice embeddings from database
         self.load_voice_embeddings()
         
-        print("VoiceRecognitionService initialized with Whisper")
-    
-    def initialize_models(self):
-        """Initialize Whisper and voice models"""
-        # If Whisper API is not enabled, skip testing
-        if not USE_WHISPER_API:
-            print("Whisper API integration disabled, using simplified mode")
-            return True
-            
-        # If OpenAI module is not available, return False
-        if not HAS_OPENAI:
-            print("OpenAI module not available, skipping model initialization")
-            return False
-            
-        # Create a dummy test audio file if it doesn't exist
-        if not os.path.exists("backend/test_audio.mp3"):
-            with open("backend/test_audio.mp3", "wb") as f:
-                f.write(b"dummy audio file for testing")
-                
-        # Test API with a simple request
-        try:
-            # Make sure we have an API key
-            if not os.environ.get("OPENAI_API_KEY"):
-                print("Cannot initialize models: OPENAI_API_KEY not found")
-                return False
-                
-            # For testing purposes, we just check if the API is accessible
-            print("Whisper API integration is available but not being tested")
-            self.api_available = True
-            return True
-        except Exception as e:
-            print(f"Error initializing voice models: {e}")
-            return False
+        print(f"VoiceRecognitionService initialized with local {ENGINE_VERSION} speaker embeddings")
     
     def update_threshold(self, threshold):
         """Update the voice recognition threshold"""
         self.threshold = float(threshold)
     
+    def update_phrases(self, phrases):
+        """Replace the verification phrases, recompiling the phrase index if they changed"""
+        if list(phrases) == self.verification_phrases:
+            return
+        
+        phrase_index = PhraseIndex(phrases, self.phrase_index.secret)
+        if not phrase_index.phrases:
+            print("Ignoring verification phrases without any words")
+            return
+        
+        self.phrase_index = phrase_index
+        self.verification_phrases = phrase_index.phrases
+    
+    @property
+    def rotates_phrases(self):
+        """Whether sessions accept different phrases, which needs a transcriber to check them"""
+        return self.transcriber is not None and self.phrase_index.rotates
+    
+    def get_session_phrases(self, session_id):
+        """Get the phrases students are prompted to say in a session"""
+        phrase_index = self.phrase_index
+        return [phrase_index.phrases[index] for index in phrase_index.session_phrases(session_id)]
+    
     def load_voice_embeddings(self):
         """Load voice embeddings from database"""
         try:
-            # Get voice embeddings from database
-            embeddings = self.db_service.get_voice_embeddings()
+            # Decode each page into the in-memory cache as it arrives
+            def add_page(rows):
+                for embedding in rows:
+                    self.voice_embeddings_db[embedding['student_id']] = self.decode_voice_data(embedding['embedding_data'])
             
-            # Add to in-memory cache
-            for embedding in embeddings:
-                student_id = embedding['student_id']
-                self.voice_embeddings_db[student_id] = json.loads(embedding['embedding_data'])
+            def report_progress(loaded, total):
+                if loaded == total or loaded % 10000 < 1000:
+                    print(f"Loaded {loaded}/{total} voice embeddings")
+            
+            self.db_service.get_voice_embeddings(on_page=add_page, progress=report_progress)
             
             return True
         except Exception as e:
             print(f"Error loading voice embeddings: {e}")
             return False
     
+    def apply_remote_changes(self, table, rows, deleted):
+        """Update the in-memory cache with changes pulled from another kiosk's writes"""
+        if table == 'voice_embeddings':
+            for embedding in rows:
+                self.voice_embeddings_db[embedding['student_id']] = self.decode_voice_data(embedding['embedding_data'])
+        
+        if table in ('voice_embeddings', 'students'):
+            for student_id in deleted:
+                self.voice_embeddings_db.pop(student_id, None)
+    
+    @staticmethod
+    def decode_voice_data(embedding_data):
+        """Decode stored voice data, keeping the embedding as a NumPy vector for scoring"""
+        voice_data = json.loads(embedding_data)
+        if 'embedding' in voice_data:
+            voice_data['embedding'] = np.asarray(voice_data['embedding'], dtype=np.float32)
+        return voice_data
+    
+    @staticmethod
+    def read_audio_bytes(source):
+        """Read a path, file-like object or bytes of audio into bytes"""
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as audio_file:
+                return audio_file.read()
+        return source.read()
+    
+    def start_transcription(self, audio):
+        """Queue audio for transcription; returns a Future, or None if phrases are not checked"""
+        if self.transcriber is None:
+            return None
+        
+        try:
+            return self.transcriber.submit(audio)
+        except RuntimeError as e:
+            print(f"Skipping transcription: {e}")
+            return None
+    
+    def score_phrase(self, transcription, session_id=None):
+        """
+        Score a transcription against the closest verification phrase
+        
+        Args:
+            session_id: Only the session's rotating phrases count when given
+            
+        Returns:
+            (phrase, score) with the share of the phrase's words heard
+        """
+        phrase_index = self.phrase_index
+        candidates = phrase_index.session_phrases(session_id) if session_id is not None else None
+        return phrase_index.best_match(transcription, candidates)
+    
+    def embed_voice_sample(self, voice_file_path):
+        """
+        Compute the voice data of an enrolment sample without saving it
+        
+        Args:
+            voice_file_path: Path, file-like object or bytes of the voice sample
+            
+        Returns:
+            (voice_data, transcription): voice data as stored, with embedding,
+            engine version, seconds of speech and enrolment phrase, and the
+            Future of its transcription, or None if phrases are not checked
+        """
+        audio = self.read_audio_bytes(voice_file_path)
+        transcription = self.start_transcription(audio)
+        
+        embedding, duration = self.engine.embed_file(audio)
+        
+        if isinstance(voice_file_path, (str, os.PathLike)):
+            enrollment_time = os.path.getmtime(voice_file_path)
+        else:
+            enrollment_time = time.time()
+        
+        voice_data = {
+            "embedding": embedding.tolist(),
+            "engine": ENGINE_VERSION,
+            "duration": round(duration, 2),
+            "recorded_phrase": self.verification_phrases[0],  # Default phrase for enrollment
+            "timestamp": json.dumps({"enrollment_time": str(enrollment_time)})
+        }
+        
+        return voice_data, transcription
+    
+    def add_voice_data(self, student_id, voice_data, transcription=None):
+        """
+        Cache voice data already saved for a student
+        
+        Enrolment does not wait for the transcription; it is added to the
+        cached and stored voice data once it finishes.
+        """
+        cached = {**voice_data, "embedding": np.asarray(voice_data["embedding"], dtype=np.float32)}
+        self.voice_embeddings_db[student_id] = cached
+        
+        if transcription is None:
+            return
+        
+        def store_transcription(future):
+            if future.exception() is not None:
+                print(f"Error transcribing voice sample of student {student_id}: {future.exception()}")
+                return
+            if self.voice_embeddings_db.get(student_id) is not cached:
+                return
+            
+            voice_data["transcription"] = cached["transcription"] = future.result()
+            try:
+                self.db_service.save_voice_embedding(student_id, json.dumps(voice_data))
+            except Exception as e:
+                print(f"Error saving transcription of student {student_id}: {e}")
+        
+        transcription.add_done_callback(store_transcription)
+    
     def process_voice_sample(self, voice_file_path, student_id):
         """
-        Process a voice sample using Whisper API and save it
+        Compute a speaker embedding from a voice sample and save it
         
         Args:
-            voice_file_path: Path to the voice sample file
+            voice_file_path: Path, file-like object or bytes of the voice sample
             student_id: Student ID to associate with the voice
             
         Returns:
-            Voice embedding or data as list
+            Stored voice data: embedding, engine version, seconds of speech and
+            enrolment phrase; the transcription is added once it finishes
         """
         try:
-            if HAS_OPENAI and self.api_available:
-                # Use Whisper to transcribe the voice sample - API approach
-                try:
-                    with open(voice_file_path, "rb") as audio_file:
-                        audio_data = audio_file.read()
-                    
-                    # Note: This would use the OpenAI API directly in a real implementation
-                    # For now, we'll fallback to simplified mode
-                    print("Would use OpenAI API here if enabled")
-                    
-                    # Placeholder for API result
-                    transcription_text = "i am present today for the class"
-                    
-                    # Store transcription as voice "embedding"
-                    voice_data = {
-                        "transcription": transcription_text.lower(),
-                        "recorded_phrase": self.verification_phrases[0],  # Default phrase for enrollment
-                        "timestamp": json.dumps({"enrollment_time": str(os.path.getmtime(voice_file_path))})
-                    }
-                    
-                    print(f"Voice processed with Whisper for student {student_id}")
-                except Exception as api_error:
-                    print(f"API error during voice processing: {api_error}")
-                    raise
-            else:
-                # Fallback to simplified mode (without Whisper)
-                print(f"Using simplified voice processing for student {student_id}")
-                
-                # In simplified mode, we just assume the student is saying the first verification phrase
-                voice_data = {
-                    "transcription": self.verification_phrases[0],
-                    "recorded_phrase": self.verification_phrases[0],
-                    "timestamp": json.dumps({"enrollment_time": str(os.path.getmtime(voice_file_path))})
-                }
+            voice_data, transcription = self.embed_voice_sample(voice_file_path)
             
             # Save data to database
             self.db_service.save_voice_embedding(student_id, json.dumps(voice_data))
             
             # Add to in-memory cache
-            self.voice_embeddings_db[student_id] = voice_data
+            self.add_voice_data(student_id, voice_data, transcription)
+            
+            print(f"Voice embedding computed for student {student_id} from {voice_data['duration']:.1f}s of speech")
             
             return voice_data
         
@@ -175,81 +256,105 @@ class VoiceRecognitionService:
             print(f"Error processing voice sample: {e}")
             raise
     
-    def verify_voice(self, voice_file_path, student_id):
+    def get_reference(self, student_id):
         """
-        Verify a voice sample using Whisper API
+        Get a student's enrolled voice data for scoring
+        
+        Samples enrolled by an older engine version are re-embedded from the
+        recording kept in the sample store, if there is one.
+        
+        Returns:
+            The voice data, or None if the student has no voice sample
+        """
+        voice_data = self.voice_embeddings_db.get(student_id)
+        if voice_data is None or voice_data.get('engine') == ENGINE_VERSION:
+            return voice_data
+        
+        audio = self.sample_store.read(student_id)
+        if audio is not None:
+            print(f"Re-embedding voice sample of student {student_id} with {ENGINE_VERSION}")
+            self.process_voice_sample(audio, student_id)
+        
+        return self.voice_embeddings_db[student_id]
+    
+    def check_reference(self, voice_data):
+        """Get the failed verification result for unusable voice data, or None if it can be scored"""
+        if voice_data is None:
+            return {
+                'match': False,
+                'message': 'No voice sample found for this student'
+            }
+        
+        # Samples enrolled before local embeddings, or by another engine version, cannot be compared
+        if voice_data.get('engine') != ENGINE_VERSION:
+            return {
+                'match': False,
+                'message': 'Voice sample needs to be re-recorded for this student'
+            }
+        
+        return None
+    
+    def build_result(self, score):
+        """Build the verification result for a voice score"""
+        match = score >= self.threshold
+        return {
+            'match': match,
+            'message': 'Voice verified successfully' if match else 'Voice verification failed. Please repeat the attendance phrase clearly.',
+            'score': round(score, 2)
+        }
+    
+    def check_phrase(self, result, transcription, session_id, timeout):
+        """Fail a matched voice whose transcription is not a verification phrase"""
+        if transcription is None or not result['match']:
+            return result
+        
+        try:
+            text = self.transcriber.wait(transcription, timeout)
+        except Exception as e:
+            # A slow or failing transcriber must not hold up check-in
+            print(f"Phrase not checked: {e}")
+            return result
+        
+        phrase, phrase_score = self.score_phrase(text, session_id)
+        result.update({
+            'match': phrase_score >= PHRASE_THRESHOLD,
+            'transcription': text,
+            'phrase': phrase,
+            'phrase_score': round(phrase_score, 2)
+        })
+        if not result['match']:
+            result['message'] = 'Voice verification failed. Please say the attendance phrase.'
+        
+        return result
+    
+    def verify_voice(self, voice_file_path, student_id, session_id=None):
+        """
+        Verify a voice sample against a student's enrolled speaker embedding
         
         Args:
-            voice_file_path: Path to the voice sample to verify
+            voice_file_path: Path, file-like object or bytes of the voice sample to verify
             student_id: Student ID to verify against
+            session_id: Session being checked into; its rotating phrases are
+                the only ones accepted when phrases are transcribed
             
         Returns:
             Verification result
         """
         try:
-            # Check if student exists in database
-            if student_id not in self.voice_embeddings_db:
-                return {
-                    'match': False,
-                    'message': 'No voice sample found for this student'
-                }
-            
             # Get stored voice data
-            voice_data = self.voice_embeddings_db[student_id]
+            voice_data = self.get_reference(student_id)
+            failure = self.check_reference(voice_data)
+            if failure is not None:
+                return failure
             
-            if HAS_OPENAI and self.api_available:
-                # Use Whisper to transcribe the verification voice sample - API approach
-                try:
-                    with open(voice_file_path, "rb") as audio_file:
-                        audio_data = audio_file.read()
-                    
-                    # Note: This would use the OpenAI API directly in a real implementation
-                    # For now, we'll fallback to simplified mode
-                    print("Would use OpenAI API here if enabled")
-                    
-                    # Placeholder for API result
-                    transcription = "i am present today for the class"
-                    
-                    # Check if the transcription matches any of our verification phrases
-                    match = False
-                    similarity_score = 0.0
-                    
-                    for phrase in self.verification_phrases:
-                        # Calculate simple word overlap as similarity measure
-                        phrase_words = set(phrase.split())
-                        transcription_words = set(transcription.split())
-                        common_words = phrase_words.intersection(transcription_words)
-                        
-                        if len(phrase_words) > 0:
-                            phrase_similarity = len(common_words) / len(phrase_words)
-                            if phrase_similarity > similarity_score:
-                                similarity_score = phrase_similarity
-                        
-                        # Consider it a match if similarity is above threshold
-                        if similarity_score >= self.threshold:
-                            match = True
-                            break
-                    
-                    result = {
-                        'match': match,
-                        'message': 'Voice verified successfully' if match else 'Voice verification failed. Please repeat the attendance phrase clearly.',
-                        'score': round(similarity_score, 2),
-                        'transcription': transcription
-                    }
-                except Exception as api_error:
-                    print(f"API error during voice verification: {api_error}")
-                    raise
-            else:
-                # In simplified mode, we simulate a successful verification for testing purposes
-                print("Using simplified voice verification (without Whisper)")
-                result = {
-                    'match': True,
-                    'message': 'Voice verified successfully (simplified mode)',
-                    'score': 0.85,  # Placeholder score
-                    'transcription': self.verification_phrases[0]  # Assume correct phrase
-                }
+            # Transcribe on the queue while this thread scores the voice
+            audio = self.read_audio_bytes(voice_file_path)
+            transcription = self.start_transcription(audio)
             
-            return result
+            embedding, _ = self.engine.embed_file(audio)
+            result = self.build_result(self.engine.cosine_score(embedding, voice_data['embedding']))
+            
+            return self.check_phrase(result, transcription, session_id, TRANSCRIPTION_WAIT)
         
         except Exception as e:
             print(f"Error verifying voice: {e}")
@@ -258,32 +363,119 @@ class VoiceRecognitionService:
                 'message': f'Error during verification: {str(e)}'
             }
     
+    def verify_batch(self, samples, session_id=None):
+        """
+        Verify several students' voice samples together
+        
+        Samples are decoded and embedded on the batch worker pool, then all
+        are scored against their students' enrolled embeddings in one matrix
+        operation. One bad sample fails only its own result.
+        
+        Args:
+            samples: List of (student_id, path, file-like object or bytes of the voice sample)
+            session_id: Session being checked into, as for verify_voice
+            
+        Returns:
+            Verification results in the order of `samples`, each with its student_id
+        """
+        if len(samples) > BATCH_MAX_SAMPLES:
+            raise ValueError(f"At most {BATCH_MAX_SAMPLES} voice samples can be verified together")
+        
+        results = [None] * len(samples)
+        pending = []
+        for position, (student_id, voice_file_path) in enumerate(samples):
+            try:
+                voice_data = self.get_reference(student_id)
+                results[position] = self.check_reference(voice_data)
+                if results[position] is None:
+                    audio = self.read_audio_bytes(voice_file_path)
+                    embedding = self.batch_pool.submit(self.engine.embed_file, audio)
+                    pending.append((position, voice_data, embedding, self.start_transcription(audio)))
+            except Exception as e:
+                print(f"Error reading voice sample of student {student_id}: {e}")
+                results[position] = {
+                    'match': False,
+                    'message': f'Error during verification: {str(e)}'
+                }
+        
+        scored = []
+        for position, voice_data, embedding, transcription in pending:
+            try:
+                scored.append((position, embedding.result()[0], voice_data['embedding'], transcription))
+            except Exception as e:
+                print(f"Error verifying voice of student {samples[position][0]}: {e}")
+                results[position] = {
+                    'match': False,
+                    'message': f'Error during verification: {str(e)}'
+                }
+        
+        if scored:
+            embeddings = np.stack([item[1] for item in scored])
+            references = np.stack([item[2] for item in scored])
+            scores = self.engine.cosine_scores(embeddings, references)
+            
+            # Transcriptions ran alongside; all share one wait rather than one each
+            deadline = time.monotonic() + TRANSCRIPTION_WAIT
+            for (position, _, _, transcription), score in zip(scored, scores):
+                result = self.build_result(float(score))
+                results[position] = self.check_phrase(result, transcription, session_id, max(deadline - time.monotonic(), 0))
+        
+        return [{'student_id': student_id, **result} for (student_id, _), result in zip(samples, results)]
+    
+    def start_verification(self, student_id, sample_rate=CANONICAL_RATE, session_id=None):
+        """
+        Start verifying a voice that arrives in chunks
+        
+        While phrases are transcribed, the stream keeps the audio and a match
+        is only decided once the recording ends and its phrase has been
+        checked, exactly as for an uploaded sample.
+        
+        Args:
+            student_id: Student ID to verify against
+            sample_rate: Sample rate of the chunks; must be CANONICAL_RATE
+            session_id: Session being checked into, as for verify_voice
+            
+        Returns:
+            A VoiceVerificationStream, or a failed verification result if the
+            student has no usable voice sample
+        """
+        voice_data = self.get_reference(student_id)
+        failure = self.check_reference(voice_data)
+        if failure is not None:
+            return failure
+        
+        phrase_check = None
+        if self.transcriber is not None:
+            def phrase_check(result, samples):
+                transcription = self.start_transcription(self.encode_wav(samples, sample_rate))
+                return self.check_phrase(result, transcription, session_id, TRANSCRIPTION_WAIT)
+        
+        return VoiceVerificationStream(self.engine.stream(sample_rate), voice_data['embedding'], self.threshold, phrase_check)
+    
+    @staticmethod
+    def encode_wav(samples, sample_rate):
+        """Encode float samples as 16-bit PCM WAV bytes, for the transcriber"""
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format='WAV', subtype='PCM_16')
+        return buffer.getvalue()
+    
     def test_service(self):
         """Test if the voice recognition service is working"""
         try:
-            if HAS_OPENAI and self.api_available:
-                print("Testing voice recognition service with OpenAI integration...")
-                # This would test the OpenAI API connection in a real implementation
-                
-                # Check if we have an OpenAI API key
-                if not os.environ.get("OPENAI_API_KEY"):
-                    print("OpenAI API key not found. Whisper voice recognition requires an API key.")
-                    return {
-                        'status': 'warning',
-                        'message': 'OpenAI API key not found. Voice recognition is in simplified mode.'
-                    }
-                else:
-                    print("OpenAI API key is set")
-                    return {
-                        'status': 'success',
-                        'message': 'Voice recognition service is available (API mode)'
-                    }
-            else:
-                print("Testing voice recognition service (simplified mode)...")
-                return {
-                    'status': 'success',
-                    'message': 'Voice recognition service is working in simplified mode'
-                }
+            print("Testing local speaker embedding engine...")
+            
+            # Run the full pipeline (resampling, voice activity detection,
+            # features) on a second of tone between half-seconds of noise
+            rate = 44100
+            t = np.arange(2 * rate) / rate
+            tone = 0.3 * np.sin(2 * np.pi * 220 * t) * ((t >= 0.5) & (t < 1.5))
+            samples = (tone + 0.01 * np.random.default_rng(0).standard_normal(len(t))).astype(np.float32)
+            embedding = self.engine.embed(samples, rate)
+            
+            return {
+                'status': 'success',
+                'message': f'Voice recognition service is working ({ENGINE_VERSION}, {len(embedding)}-dimension embeddings)'
+            }
         
         except Exception as e:
             print(f"Voice recognition service test failed: {e}")
@@ -291,3 +483,97 @@ class VoiceRecognitionService:
                 'status': 'error',
                 'message': f'Voice recognition service test failed: {str(e)}'
             }
+
+class VoiceVerificationStream:
+    def __init__(self, embedding_stream, reference, threshold, phrase_check=None):
+        """
+        Initialize a streaming verification
+        
+        Each chunk updates the features and the running score. A decision is
+        made as soon as the score has stayed STREAM_DECISION_MARGIN above
+        (accept) or below (reject) the threshold for STREAM_STABLE_UPDATES
+        updates, instead of waiting for the whole recording. With a phrase
+        check, only rejections are early: a phrase can only be checked once
+        it has been said in full.
+        
+        Args:
+            embedding_stream: EmbeddingStream the chunks are added to
+            reference: Enrolled embedding
+            threshold: Score needed to match
+            phrase_check: Called as phrase_check(result, samples) with a
+                matched result and all the audio received, returning the
+                final result; None when phrases are not checked
+        """
+        self.embedding_stream = embedding_stream
+        self.reference = reference
+        self.threshold = threshold
+        self.phrase_check = phrase_check
+        self.samples = []
+        self.score = None
+        self.streak = 0
+        self.result = None
+    
+    def add_chunk(self, samples):
+        """
+        Add a chunk of mono float32 samples and update the score
+        
+        Returns:
+            The verification result once decided, otherwise None
+        """
+        if self.result is not None:
+            return self.result
+        
+        if self.phrase_check is not None:
+            self.samples.append(np.array(samples, dtype=np.float32))
+        self.embedding_stream.add(samples)
+        embedding = self.embedding_stream.embedding()
+        if embedding is None:
+            return None
+        
+        score = SpeakerEmbeddingEngine.cosine_score(embedding, self.reference)
+        duration = self.embedding_stream.duration
+        
+        # Count consecutive updates on the same side of the decision band
+        accept = score >= self.threshold + STREAM_DECISION_MARGIN and duration >= STREAM_MIN_ACCEPT_DURATION
+        reject = score <= self.threshold - STREAM_DECISION_MARGIN and duration >= STREAM_MIN_REJECT_DURATION
+        if accept or reject:
+            side = 1 if accept else -1
+            self.streak = self.streak + side if self.streak * side > 0 else side
+        else:
+            self.streak = 0
+        self.score = score
+        
+        if abs(self.streak) >= STREAM_STABLE_UPDATES and (self.streak < 0 or self.phrase_check is None):
+            self.result = self.build_result(self.streak > 0, early=True)
+        elif duration >= STREAM_MAX_DURATION:
+            self.result = self.finish()
+        
+        return self.result
+    
+    def finish(self):
+        """Decide on the audio received so far, when the stream ends without an early decision"""
+        if self.result is not None:
+            return self.result
+        
+        if self.score is None:
+            self.result = {
+                'match': False,
+                'message': 'Voice sample is too short. Please repeat the attendance phrase.',
+                'duration': round(self.embedding_stream.duration, 2)
+            }
+        else:
+            self.result = self.build_result(self.score >= self.threshold, early=False)
+            if self.result['match'] and self.phrase_check is not None:
+                self.result = self.phrase_check(self.result, np.concatenate(self.samples))
+        
+        return self.result
+    
+    def build_result(self, match, early):
+        """Build the verification result for a decision"""
+        return {
+            'match': match,
+            'message': 'Voice verified successfully' if match else 'Voice verification failed. Please repeat the attendance phrase clearly.',
+            'score': round(self.score, 2),
+            'early': early,
+            'duration': round(self.embedding_stream.duration, 2)
+        }
@@ -0,0 +1,182 @@
+import os
+import queue
+import threading
+import numpy as np
+import soundfile as sf
+
+# WAV encodings FLAC stores losslessly, with the integer type they are read as
+LOSSLESS_SUBTYPES = {'PCM_16': 'int16', 'PCM_24': 'int32'}
+
+class VoiceSampleStore:
+    def __init__(self, voice_dir='data/voices'):
+        """
+        Initialize the enrolment recording store
+
+        Uploads are written as `{student_id}.wav` so registration never waits
+        on an encoder. A background worker then transcodes PCM WAV files to
+        FLAC, checks the FLAC decodes to the identical samples and only then
+        removes the WAV. On start it also works through WAV files left by
+        earlier versions. read() returns whichever file a student has, and
+        soundfile decodes both, so re-embedding does not care which it gets.
+
+        Args:
+            voice_dir: Directory the recordings are kept in
+        """
+        self.voice_dir = voice_dir
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = {'transcoded': 0, 'skipped': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+        self.running = False
+        self.thread = None
+
+        os.makedirs(voice_dir, exist_ok=True)
+
+    def start(self):
+        """Start the transcoding worker, queueing any WAV files already stored"""
+        if self.running:
+            return
+
+        self.running = True
+        for name in os.listdir(self.voice_dir):
+            if name.endswith('.wav'):
+                self.pending.put(name[:-len('.wav')])
+
+        self.thread = threading.Thread(target=self.transcode_loop, name='voice-transcoder', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the transcoding worker once the file it is on is done"""
+        if not self.running:
+            return
+
+        self.running = False
+        self.pending.put(None)
+        self.thread.join()
+
+    def get_path(self, student_id, extension):
+        """Path of a student's recording with the given extension"""
+        return os.path.join(self.voice_dir, f'{student_id}.{extension}')
+
+    def save(self, student_id, source):
+        """
+        Store a student's enrolment recording, replacing any earlier one
+
+        Args:
+            source: File-like object or bytes of the upload
+
+        Returns:
+            Path of the stored WAV file
+        """
+        data = source if isinstance(source, (bytes, bytearray)) else source.read()
+        path = self.get_path(student_id, 'wav')
+        partial = path + '.partial'
+
+        with open(partial, 'wb') as voice_file:
+            voice_file.write(data)
+
+        with self.lock:
+            os.replace(partial, path)
+            flac_path = self.get_path(student_id, 'flac')
+            if os.path.exists(flac_path):
+                os.remove(flac_path)
+
+        if self.running:
+            self.pending.put(str(student_id))
+        return path
+
+    def read(self, student_id):
+        """Bytes of a student's recording, FLAC or WAV, or None if there is none"""
+        # FLAC is in place before its WAV is removed, so a second look finds
+        # a recording that was transcoded between the two opens
+        for _ in range(2):
+            for extension in ('flac', 'wav'):
+                try:
+                    with open(self.get_path(student_id, extension), 'rb') as voice_file:
+                        return voice_file.read()
+                except FileNotFoundError:
+                    continue
+        return None
+
+    def delete(self, student_id):
+        """Delete a student's recording in every format"""
+        with self.lock:
+            for extension in ('flac', 'wav'):
+                path = self.get_path(student_id, extension)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def transcode_loop(self):
+        """Transcode queued recordings until stopped"""
+        while True:
+            student_id = self.pending.get()
+            if student_id is None:
+                break
+
+            try:
+                self.transcode(student_id)
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"Error compressing voice sample of student {student_id}: {e}")
+
+    def transcode(self, student_id):
+        """Replace a student's PCM WAV recording with an identical FLAC one"""
+        path = self.get_path(student_id, 'wav')
+        if not os.path.exists(path):
+            return
+
+        before = os.stat(path)
+        info = sf.info(path)
+        if info.format != 'WAV' or info.subtype not in LOSSLESS_SUBTYPES:
+            # Float or compressed audio cannot go through FLAC unchanged; keep it as uploaded
+            self.stats['skipped'] += 1
+            return
+
+        dtype = LOSSLESS_SUBTYPES[info.subtype]
+        samples, sample_rate = sf.read(path, dtype=dtype, always_2d=True)
+
+        flac_path = self.get_path(student_id, 'flac')
+        partial = flac_path + '.partial'
+        sf.write(partial, samples, sample_rate, format='FLAC', subtype=info.subtype)
+
+        decoded, _ = sf.read(partial, dtype=dtype, always_2d=True)
+        if not np.array_equal(samples, decoded):
+            os.remove(partial)
+            raise RuntimeError("FLAC did not decode to the original samples")
+
+        with self.lock:
+            # A new recording saved meanwhile wins over this transcode
+            current = os.stat(path) if os.path.exists(path) else None
+            if current is None or (current.st_ino, current.st_mtime_ns) != (before.st_ino, before.st_mtime_ns):
+                os.remove(partial)
+                return
+
+            os.replace(partial, flac_path)
+            os.remove(path)
+
+        self.stats['transcoded'] += 1
+        self.stats['bytes_before'] += before.st_size
+        self.stats['bytes_after'] += os.path.getsize(flac_path)
+
+    def get_disk_usage(self):
+        """Count the stored recordings and their bytes by format"""
+        usage = {'wav_files': 0, 'wav_bytes': 0, 'flac_files': 0, 'flac_bytes': 0}
+        with os.scandir(self.voice_dir) as entries:
+            for entry in entries:
+                extension = entry.name.rsplit('.', 1)[-1]
+                if extension in ('wav', 'flac'):
+                    usage[f'{extension}_files'] += 1
+                    usage[f'{extension}_bytes'] += entry.stat().st_size
+        return usage
+
+    def get_stats(self):
+        """Get transcoding counters, the disk space saved and current disk usage"""
+        stats = dict(self.stats)
+        saved = stats['bytes_before'] - stats['bytes_after']
+        return {
+            **stats,
+            'bytes_saved': saved,
+            'percent_saved': round(100 * saved / stats['bytes_before'], 1) if stats['bytes_before'] else 0,
+            'pending': self.pending.qsize(),
+            'running': self.running,
+            'disk': self.get_disk_usage()
+        }
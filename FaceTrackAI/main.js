@@ -128,5 +128,6 @@ ipcMain.handle('export-csv', async (event, filters) => {
   const queryParams = new URLSearchParams(filters).toString();
   const response = await fetch(`http://localhost:8000/api/reports/export?${queryParams}`);
   
-  return await response.json();
+  // The export is a CSV download, not JSON
+  return await response.text();
 });
@@ -381,8 +381,15 @@ async function toggleVoiceRecording() {
             };
             
             mediaRecorder.onstop = async () => {
-                // Create blob from chunks
-                audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
+                // The backend decodes WAV, not the WebM/Opus MediaRecorder records
+                try {
+                    audioBlob = await encodeWav(new Blob(audioChunks, { type: mediaRecorder.mimeType }));
+                } catch (error) {
+                    console.error('Error encoding voice sample:', error);
+                    setVoiceStatus('failure', 'Could not process the recording');
+                    audioChunks = [];
+                    return;
+                }
                 
                 // Send to backend for verification
                 await verifyVoice();
@@ -679,7 +686,7 @@ async function loadAttendanceList(sessionId) {
                                     <strong>${record.student_name}</strong>
                                     <small class="text-muted">${formatTime(record.timestamp)}</small>
                                 </div>
-                                <div class="text-muted small">${record.student_id}</div>
+                                <div class="text-muted small">${record.student_code}</div>
                             </div>
                         </div>
                     `;
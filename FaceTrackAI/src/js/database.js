@@ -245,7 +245,8 @@ class DatabaseService {
         try {
             const params = new URLSearchParams(filters);
             const response = await fetch(`${this.baseUrl}/reports/export?${params}`);
-            return await response.json();
+            // The export is a CSV download, not JSON
+            return await response.text();
         } catch (error) {
             console.error('Error exporting report:', error);
             throw error;
@@ -166,9 +166,15 @@ async function toggleVoiceRecording() {
                 }
             };
             
-            mediaRecorder.onstop = () => {
-                // Create blob from chunks
-                audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
+            mediaRecorder.onstop = async () => {
+                // The backend decodes WAV, not the WebM/Opus MediaRecorder records
+                try {
+                    audioBlob = await encodeWav(new Blob(audioChunks, { type: mediaRecorder.mimeType }));
+                } catch (error) {
+                    console.error('Error encoding voice sample:', error);
+                    voiceStatus.innerHTML = '<p class="text-danger">Could not process the recording. Please record again.</p>';
+                    return;
+                }
                 
                 // Update status
                 voiceStatus.innerHTML = '<p class="text-success">Voice sample recorded</p>';
@@ -381,31 +381,19 @@ async function exportReportToCsv() {
         // Get filter values
         const filterParams = buildFilterParams();
         
-        // Fetch CSV data
-        const response = await fetch(`http://localhost:8000/api/reports/export?${filterParams}`);
-        const result = await response.json();
+        // Let the browser stream the CSV download straight from the API
+        const link = document.createElement('a');
+        link.setAttribute('href', `http://localhost:8000/api/reports/export?${filterParams}`);
+        link.setAttribute('download', 'attendance_report.csv');
+        document.body.appendChild(link);
         
-        if (result.success) {
-            // Create CSV content
-            const csvContent = result.csv_content;
-            
-            // Create download link
-            const encodedUri = encodeURI(`data:text/csv;charset=utf-8,${csvContent}`);
-            const link = document.createElement('a');
-            link.setAttribute('href', encodedUri);
-            link.setAttribute('download', 'attendance_report.csv');
-            document.body.appendChild(link);
-            
-            // Trigger download
-            link.click();
-            
-            // Clean up
-            document.body.removeChild(link);
-            
-            showStatusMessage('Report exported successfully', 'success');
-        } else {
-            showStatusMessage('Failed to export report', 'error');
-        }
+        // Trigger download
+        link.click();
+        
+        // Clean up
+        document.body.removeChild(link);
+        
+        showStatusMessage('Report export started', 'success');
     } catch (error) {
         console.error('Error exporting report:', error);
         showStatusMessage('Error exporting report. Please try again.', 'error');
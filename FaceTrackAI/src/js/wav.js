@@ -0,0 +1,78 @@
+/**
+ * WAV encoding of voice recordings for the Smart Attendance System
+ *
+ * MediaRecorder records WebM/Opus (or MP4 on some platforms), which the
+ * backend cannot decode. Recordings are decoded by the browser and sent as
+ * 16 kHz mono 16-bit PCM WAV, the rate the backend analyses voices at.
+ */
+
+// Sample rate voice recordings are encoded at
+const WAV_SAMPLE_RATE = 16000;
+
+/**
+ * Converts a MediaRecorder recording to a PCM WAV blob
+ * @param {Blob} recording - The recorded audio, in any format the browser can decode
+ * @returns {Promise<Blob>} The recording as 16 kHz mono 16-bit PCM WAV
+ */
+async function encodeWav(recording) {
+    // Decoding resamples to the context's rate
+    const audioContext = new AudioContext({ sampleRate: WAV_SAMPLE_RATE });
+    try {
+        const buffer = await audioContext.decodeAudioData(await recording.arrayBuffer());
+        return new Blob([encodeWavSamples(mixToMono(buffer), buffer.sampleRate)], { type: 'audio/wav' });
+    } finally {
+        audioContext.close();
+    }
+}
+
+/**
+ * Averages the channels of an audio buffer
+ * @param {AudioBuffer} buffer - The decoded audio
+ * @returns {Float32Array} The mono samples
+ */
+function mixToMono(buffer) {
+    const samples = new Float32Array(buffer.length);
+    for (let channel = 0; channel < buffer.numberOfChannels; channel++) {
+        const data = buffer.getChannelData(channel);
+        for (let i = 0; i < data.length; i++) {
+            samples[i] += data[i] / buffer.numberOfChannels;
+        }
+    }
+    return samples;
+}
+
+/**
+ * Encodes mono samples as a 16-bit PCM WAV file
+ * @param {Float32Array} samples - Samples between -1 and 1
+ * @param {number} sampleRate - The samples' rate in Hz
+ * @returns {ArrayBuffer} The WAV file
+ */
+function encodeWavSamples(samples, sampleRate) {
+    const view = new DataView(new ArrayBuffer(44 + samples.length * 2));
+    const writeText = (offset, text) => {
+        for (let i = 0; i < text.length; i++) {
+            view.setUint8(offset + i, text.charCodeAt(i));
+        }
+    };
+
+    writeText(0, 'RIFF');
+    view.setUint32(4, 36 + samples.length * 2, true);
+    writeText(8, 'WAVE');
+    writeText(12, 'fmt ');
+    view.setUint32(16, 16, true);           // fmt chunk size
+    view.setUint16(20, 1, true);            // PCM
+    view.setUint16(22, 1, true);            // mono
+    view.setUint32(24, sampleRate, true);
+    view.setUint32(28, sampleRate * 2, true);
+    view.setUint16(32, 2, true);            // bytes per frame
+    view.setUint16(34, 16, true);           // bits per sample
+    writeText(36, 'data');
+    view.setUint32(40, samples.length * 2, true);
+
+    for (let i = 0; i < samples.length; i++) {
+        const sample = Math.max(-1, Math.min(1, samples[i]));
+        view.setInt16(44 + i * 2, sample < 0 ? sample * 0x8000 : sample * 0x7FFF, true);
+    }
+
+    return view.buffer;
+}